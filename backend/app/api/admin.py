@@ -8,6 +8,7 @@ from app.models.project import Project
 from app.models.audit_log import AuditLog
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
+import sys
 
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
@@ -107,3 +108,32 @@ async def manage_templates(
     """Manage college-specific templates (placeholder)"""
     # TODO: Implement template management
     raise HTTPException(status_code=501, detail="Template management not yet implemented")
+
+
+@router.get("/runtime-metrics")
+async def get_runtime_metrics(
+    user_data: tuple = Depends(require_role(["platform_admin"]))
+):
+    """In-process performance counters of this worker"""
+    from app.services.embedding_cache import embedding_cache, feature_hash_cache
+    from app.services.warmup import startup_metrics
+    from app.services.http_client import http_client_pool
+    from app.services.generation_cache import generation_cache
+    from app.services.groq_client import groq_client
+
+    metrics: Dict[str, Any] = {
+        "startup": startup_metrics,
+        "embedding_cache": embedding_cache.stats(),
+        "feature_hash_cache": feature_hash_cache.stats(),
+        "llm_http": http_client_pool.metrics(),
+        "generation_cache": generation_cache.stats(),
+        "llm_retries": groq_client.retry_policy.stats(),
+        "llm_pool": groq_client.pool.stats()
+    }
+
+    # Only report the batcher if this worker already loaded sentence-transformers
+    embeddings = sys.modules.get("app.services.embeddings")
+    batcher = getattr(getattr(embeddings, "model_service", None), "batcher", None)
+    metrics["embedding_batcher"] = batcher.stats() if batcher is not None else None
+
+    return metrics
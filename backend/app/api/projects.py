@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from app.core.database import get_db, SessionLocal
-from app.core.security import get_current_user_id
+from app.core.security import get_current_user_id, create_stream_token, decode_token
 from app.core.config import settings
 from app.models.user import User
 from app.models.project import Project
@@ -12,13 +12,24 @@ from app.schemas.project import (
     ProjectDownloadResponse,
     ProjectHistoryItem
 )
-from typing import List
+from app.services.progress import progress_tracker, TERMINAL_STAGES
+from app.services.circuit_breaker import CircuitOpenError, circuit_open_cause
+from app.services.llm_pool import llm_pool
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import asyncio
+import json
 import uuid
 import io
 
 
 router = APIRouter(prefix="/api/projects", tags=["Projects"])
 
+# Jobs in this process waiting for the LLM circuit to close (queue mode)
+queued_jobs = 0
+
 
 def run_project_generation_sync(
     job_id: str,
@@ -36,11 +47,12 @@ def run_project_generation_sync(
     from app.services.zip_bundler import zip_bundler
     from app.services.minio_client import minio_client
     from app.services.plagiarism_checker import plagiarism_checker
+    from app.core.event_loop import run_sync
     from datetime import datetime
-    import asyncio
     import re
     
     db = SessionLocal()
+    project = None
     
     try:
         # Get project
@@ -49,6 +61,11 @@ def run_project_generation_sync(
             print(f"Project not found: {job_id}")
             return
         
+        # LLM circuit still open (a queued job that waited LLM_QUEUE_MAX_WAIT,
+        # or it opened after the job was accepted): fail, credit refunded
+        if llm_pool.is_open():
+            raise CircuitOpenError(llm_pool.name, llm_pool.retry_after())
+        
         # Update status to processing
         project.status = "processing"
         db.commit()
@@ -56,7 +73,7 @@ def run_project_generation_sync(
         print(f"Starting project generation for job: {job_id}")
         
         # Generate project with AI
-        project_data = asyncio.run(
+        project_data = run_sync(
             rag_pipeline.generate_project(
                 subject=subject,
                 semester=semester,
@@ -83,6 +100,7 @@ def run_project_generation_sync(
         print(f"Project data generated: {project.title}")
         
         # Generate DOCX
+        progress_tracker.publish(job_id, "rendering")
         docx_bytes = docx_generator.generate_report(project_data)
         
         # Generate PPTX
@@ -92,8 +110,15 @@ def run_project_generation_sync(
         zip_bytes = zip_bundler.create_bundle(project_data, docx_bytes, pptx_bytes)
         
         # Plagiarism check
-        plagiarism_result = asyncio.run(
-            plagiarism_checker.check_plagiarism(project_data, db)
+        progress_tracker.publish(job_id, "plagiarism")
+        fingerprint = plagiarism_checker.build_fingerprint(project_data)
+        plagiarism_result = run_sync(
+            plagiarism_checker.check_plagiarism(
+                project_data,
+                db,
+                fingerprint=fingerprint,
+                scope=plagiarism_checker.scope_for(project)
+            )
         )
         
         project.plagiarism_score = plagiarism_result['plagiarism_score']
@@ -101,6 +126,7 @@ def run_project_generation_sync(
         db.commit()
         
         # Upload to MinIO
+        progress_tracker.publish(job_id, "uploading")
         zip_filename = f"projects/{user_id}/{job_id}/bundle.zip"
         minio_client.upload_bytes(zip_bytes, zip_filename, "application/zip")
         
@@ -113,8 +139,12 @@ def run_project_generation_sync(
         project.zip_url = zip_url
         project.status = "completed"
         project.completed_at = datetime.utcnow()
+        
+        # Store the fingerprint with the completion so later checks reuse it
+        plagiarism_checker.save_fingerprint(project.id, fingerprint, db)
         db.commit()
         
+        progress_tracker.publish(job_id, "completed", title=project.title)
         print(f"Project generation completed: {job_id}")
         
     except Exception as e:
@@ -122,11 +152,42 @@ def run_project_generation_sync(
         if project:
             project.status = "failed"
             project.error_message = str(e)
+            # Failed because the LLM was unavailable (circuit open), not
+            # because of the request, so the credit is given back
+            if circuit_open_cause(e):
+                user = db.query(User).filter(User.id == user_id).first()
+                if user:
+                    user.credits += 1
             db.commit()
+        progress_tracker.publish(job_id, "failed", error=str(e))
     finally:
         db.close()
 
 
+async def run_project_generation(queued: bool = False, **job):
+    """
+    Run a generation job in the threadpool
+
+    A job queued behind an open LLM circuit first waits here on the event
+    loop, polling the breaker, so it holds no threadpool thread while it
+    waits (at most LLM_QUEUE_MAX_WAIT seconds).
+    """
+    global queued_jobs
+    if queued:
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.LLM_QUEUE_MAX_WAIT
+            await run_in_threadpool(
+                progress_tracker.publish, job['job_id'], "queued", retry_after=round(llm_pool.retry_after(), 1)
+            )
+            while loop.time() < deadline and await run_in_threadpool(llm_pool.is_open):
+                await asyncio.sleep(min(5.0, max(0.5, llm_pool.retry_after()), max(0.0, deadline - loop.time())))
+        finally:
+            queued_jobs -= 1
+
+    await run_in_threadpool(run_project_generation_sync, **job)
+
+
 @router.post("/generate")
 async def generate_project(
     request: ProjectGenerateRequest,
@@ -148,6 +209,21 @@ async def generate_project(
             detail="Insufficient credits. Please purchase more credits."
         )
     
+    # Fail fast (before charging a credit) while the LLM is down, unless
+    # jobs are configured to queue until it recovers and the queue has room.
+    # is_open may read the shared breaker state from Redis, so it runs off
+    # the event loop.
+    global queued_jobs
+    circuit_open = await run_in_threadpool(llm_pool.is_open)
+    queue = settings.LLM_BREAKER_OPEN_MODE == "queue" and queued_jobs < settings.LLM_QUEUE_MAX_JOBS
+    if circuit_open and not queue:
+        retry_after = max(1, int(llm_pool.retry_after() + 0.999))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI service is temporarily unavailable. Please retry in {retry_after} seconds.",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
     # Create job
     job_id = str(uuid.uuid4())
     
@@ -170,9 +246,14 @@ async def generate_project(
     db.commit()
     db.refresh(project)
     
+    # Reserve the queue slot now; run_project_generation releases it
+    if circuit_open:
+        queued_jobs += 1
+    
     # Use FastAPI BackgroundTasks instead of Celery for local development
     background_tasks.add_task(
-        run_project_generation_sync,
+        run_project_generation,
+        queued=circuit_open,
         job_id=job_id,
         user_id=user_id,
         subject=request.subject,
@@ -218,6 +299,92 @@ async def get_project_status(
     )
 
 
+@router.post("/{job_id}/progress-token")
+async def create_progress_token(
+    job_id: str,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """Short-lived token for opening the progress stream of one job (EventSource cannot send headers)"""
+    
+    project = db.query(Project).filter(
+        Project.job_id == job_id,
+        Project.user_id == user_id
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return {
+        "token": create_stream_token(user_id, job_id),
+        "expires_in": settings.PROGRESS_TOKEN_EXPIRE_SECONDS
+    }
+
+
+@router.get("/{job_id}/progress")
+async def get_project_progress(
+    job_id: str,
+    after: int = 0,
+    stream: bool = True,
+    stream_token: str = None,  # from POST /progress-token; EventSource cannot send headers
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    db: Session = Depends(get_db)
+):
+    """
+    Live generation progress
+    
+    Streams progress events (stage changes and each project section as soon
+    as the model finishes it) as server-sent events until the job completes
+    or fails. Resume with `after` (the next event id); `stream=false`
+    returns the events so far as JSON for polling clients. Authenticate
+    with the bearer header or a stream_token for this job; access tokens
+    are never accepted in the URL, where they would reach access logs.
+    """
+    if credentials is not None:
+        user_id = await get_current_user_id(credentials)
+    else:
+        payload = decode_token(stream_token or "")
+        if payload.get("type") != "stream" or payload.get("job") != job_id or not payload.get("sub"):
+            raise HTTPException(status_code=401, detail="Invalid stream token")
+        user_id = payload["sub"]
+    
+    project = db.query(Project).filter(
+        Project.job_id == job_id,
+        Project.user_id == user_id
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not stream:
+        events = await run_in_threadpool(progress_tracker.events, job_id, after)
+        return {"job_id": job_id, "status": project.status, "events": events, "next": after + len(events)}
+    
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        cursor = after
+        deadline = loop.time() + settings.PROGRESS_STREAM_TIMEOUT
+        last_sent = loop.time()
+        while loop.time() < deadline:
+            events = await run_in_threadpool(progress_tracker.events, job_id, cursor)
+            for event in events:
+                yield f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+                cursor = event['id'] + 1
+                last_sent = loop.time()
+                if event['stage'] in TERMINAL_STAGES:
+                    return
+            if loop.time() - last_sent > 15:
+                yield ": keep-alive\n\n"
+                last_sent = loop.time()
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{job_id}/preview", response_model=ProjectPreviewResponse)
 async def get_project_preview(
     job_id: str,
@@ -234,20 +401,28 @@ async def get_project_preview(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if project.status != "completed":
+    if project.status in ("pending", "processing"):
+        # Fill the preview from the sections streamed so far
+        events = await run_in_threadpool(progress_tracker.events, job_id)
+        project_data = {event['section']: event['data'] for event in events if event['stage'] == 'section'}
+        if not project_data:
+            raise HTTPException(status_code=400, detail="Project not yet completed")
+    elif project.status != "completed":
         raise HTTPException(status_code=400, detail="Project not yet completed")
-    
-    if not project.json_data:
+    elif not project.json_data:
         raise HTTPException(status_code=500, detail="Project data not available")
+    else:
+        project_data = project.json_data
     
     return ProjectPreviewResponse(
         job_id=project.job_id,
-        title=project.json_data.get('title', ''),
-        abstract=project.json_data.get('abstract', ''),
-        keywords=project.json_data.get('keywords', []),
-        modules=project.json_data.get('modules', []),
-        difficulty=project.json_data.get('difficulty', ''),
-        timeline_days=project.json_data.get('timeline_days', 0)
+        title=project_data.get('title', ''),
+        abstract=project_data.get('abstract', ''),
+        keywords=project_data.get('keywords', []),
+        modules=project_data.get('modules', []),
+        difficulty=project_data.get('difficulty', ''),
+        timeline_days=project_data.get('timeline_days', 0),
+        partial=project.status != "completed"
     )
 
 
@@ -285,9 +460,7 @@ async def download_project(
     )
 
 
-from fastapi.responses import StreamingResponse
 from app.services.minio_client import minio_client
-from app.core.security import decode_token
 from jose import JWTError
 import re
 
@@ -310,7 +483,7 @@ async def download_project_file(
     try:
         payload = decode_token(token)
         user_id = payload.get("sub")
-        if not user_id:
+        if payload.get("type") != "access" or not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
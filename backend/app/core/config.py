@@ -17,6 +17,9 @@ class Settings(BaseSettings):
     
     # Redis & Celery (use 127.0.0.1 for local dev, redis for Docker)
     REDIS_URL: str = "redis://127.0.0.1:6379/0"
+    PROGRESS_TTL: int = 3600  # Seconds generation progress events are kept
+    PROGRESS_STREAM_TIMEOUT: int = 600  # Seconds a /progress stream stays open
+    PROGRESS_TOKEN_EXPIRE_SECONDS: int = 60  # Lifetime of the single-job token used to open a /progress stream
     CELERY_BROKER_URL: str = "redis://127.0.0.1:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://127.0.0.1:6379/0"
     
@@ -32,6 +35,35 @@ class Settings(BaseSettings):
     GROQ_API_KEY: str = ""  # Allow empty default for validation, but required in production
     GROQ_API_URL: str = "https://api.groq.com/openai/v1/chat/completions"
     GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    GROQ_GENERATION_MODE: str = "single"  # single: one call for the whole schema, fanout: outline + concurrent section calls
+    GROQ_FANOUT_CONCURRENCY: int = 4  # Section calls in flight per project (fanout)
+    GROQ_SECTION_MAX_TOKENS: int = 4000  # Token budget per outline/section call (fanout)
+    GENERATION_CACHE_ENABLED: bool = False  # Reuse projects for requests without additional requirements
+    GENERATION_CACHE_VARIANTS: int = 3  # Distinct projects generated per request before reusing them round-robin
+    GENERATION_CACHE_TTL: int = 604800  # Seconds
+    GENERATION_CACHE_MAX_KEYS: int = 500  # In-process pools (without Redis)
+    GROQ_STREAMING: bool = False  # Stream completions and publish sections as they finish (JSON mode with stream=true is not verified for every provider)
+    GROQ_MAX_ATTEMPTS: int = 3  # Attempts per LLM call (retryable errors only)
+    GROQ_RETRY_BASE_DELAY: float = 1.0  # Seconds; decorrelated jitter grows from here
+    GROQ_RETRY_MAX_DELAY: float = 30.0  # Cap on a backoff wait (server-requested waits are honored)
+    GROQ_RETRY_DEADLINE: float = 300.0  # Seconds for all attempts of one call, waits included
+    GROQ_RPM_LIMIT: int = 30  # Account requests per minute shared by all workers (0 = unlimited)
+    GROQ_TPM_LIMIT: int = 0  # Account tokens per minute shared by all workers (0 = unlimited)
+    LLM_POOL_MEMBERS: str = ""  # JSON list of {name, url, key, model, weight, rpm, tpm}; empty = the GROQ_* endpoint only
+    LLM_BREAKER_ENABLED: bool = True  # Fail fast while the LLM is down
+    LLM_BREAKER_WINDOW: float = 60.0  # Seconds of calls the error and slow-call rates cover
+    LLM_BREAKER_MIN_CALLS: int = 5  # Calls in the window before the breaker may open
+    LLM_BREAKER_ERROR_RATE: float = 0.5  # Failure share that opens the breaker
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = 90.0  # Calls at least this slow count as slow
+    LLM_BREAKER_SLOW_CALL_RATE: float = 0.8  # Slow-call share that opens the breaker
+    LLM_BREAKER_OPEN_SECONDS: float = 30.0  # Fail-fast period before a trial call
+    LLM_BREAKER_OPEN_MODE: str = "fail"  # New jobs while open: fail (503, no credit charged) or queue (wait for recovery)
+    LLM_QUEUE_MAX_WAIT: float = 600.0  # Seconds a queued job waits for the breaker to close
+    LLM_QUEUE_MAX_JOBS: int = 20  # Queued jobs per API process; beyond this new jobs get 503
+    GROQ_HTTP2: bool = True  # Multiplex requests over one connection (needs the h2 package)
+    GROQ_MAX_CONNECTIONS: int = 20  # Per process and event loop
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    GROQ_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection is kept open
     
     # Security
     JWT_SECRET_KEY: str = "your-secret-key-change-in-production-min-32-chars"
@@ -51,9 +83,43 @@ class Settings(BaseSettings):
     
     # RAG Configuration
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_CACHE_BACKEND: str = "memory"  # Tier behind the in-process LRU for sentence-transformers: memory, disk or redis
+    EMBEDDING_CACHE_SIZE: int = 10000  # Vectors kept in the in-process LRU
+    EMBEDDING_CACHE_DIR: str = "./embedding_cache"  # SQLite file for the disk tier
+    EMBEDDING_CACHE_TTL: int = 2592000  # Seconds (Redis tier)
+    EMBEDDING_PREWARM: bool = True  # Load the model at startup (before fork under gunicorn/Celery)
+    EMBEDDING_BATCHING: bool = True  # Micro-batch concurrent sentence-transformers calls
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0  # How long the first request waits for company
+    EMBEDDING_BATCH_MAX_ITEMS: int = 64  # Texts per model call
     RAG_TOP_K: int = 6
-    VECTOR_STORE_TYPE: str = "chroma"  # or "pgvector"
+    VECTOR_STORE_TYPE: str = "simple"  # simple (BM25), chroma, hybrid (BM25 + dense) or pgvector
+    RAG_CANDIDATES: int = 30  # Hits taken from each retriever before hybrid fusion
+    RAG_DENSE_EMBEDDINGS: str = "sentence-transformers"  # Hybrid dense model: sentence-transformers or feature-hash
+    RAG_RERANK_MODEL: str = ""  # Optional cross-encoder for hybrid reranking, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+    RAG_RERANK_CANDIDATES: int = 20  # Fused hits scored by the reranker
     CHROMA_PERSIST_DIR: str = "./chroma_db"
+    RAG_QUANTIZATION: str = "none"  # Hybrid dense storage: none (float32), float16 or int8
+    RAG_SNAPSHOT_DIR: str = "./rag_snapshot"  # Versioned template index snapshots
+    PGVECTOR_INDEX: str = "hnsw"  # pgvector index type: hnsw or ivfflat
+    PGVECTOR_EF_SEARCH: int = 64  # HNSW candidate list size per query
+    PGVECTOR_PROBES: int = 10  # IVFFlat lists scanned per query
+    PGVECTOR_COPY_BATCH_SIZE: int = 1000  # Rows per COPY round trip
+    
+    # Plagiarism index
+    PLAGIARISM_INDEX_BACKEND: str = "ivf"  # exact, ivf or hnsw (needs hnswlib)
+    PLAGIARISM_INDEX_DIR: str = "./plagiarism_index"
+    PLAGIARISM_INDEX_NPROBE: int = 8  # IVF clusters scanned per query (recall vs latency)
+    PLAGIARISM_INDEX_LISTS: int = 0  # IVF clusters, 0 = sqrt(corpus size)
+    PLAGIARISM_INDEX_EF_SEARCH: int = 64  # HNSW candidate list size (recall vs latency)
+    PLAGIARISM_INDEX_QUANTIZATION: str = "int8"  # Index storage: none (float32), float16 or int8
+    PLAGIARISM_INDEX_RESCORE_FACTOR: int = 4  # Quantized hits re-scored exactly per result
+    PLAGIARISM_INDEX_SAVE_INTERVAL: int = 60  # Seconds between index snapshots
+    PLAGIARISM_SCAN_BATCH_SIZE: int = 1000  # Rows per keyset-paginated batch when streaming the corpus
+    PLAGIARISM_REFRESH_OVERLAP: int = 600  # Seconds re-scanned behind the index watermark (longest job transaction)
+    PLAGIARISM_PARTITION_KEYS: str = "college_id,subject"  # Fields scoping checks: college_id, subject, semester ("" = global)
+    PLAGIARISM_FALLBACK_GLOBAL: bool = False  # Search all projects when the scoped partition finds nothing similar
+    PLAGIARISM_MAX_PARTITIONS: int = 256  # Scoped partition indexes kept in memory (least recently used are dropped)
+    CODE_FINGERPRINT_MAX_DF: int = 50  # Ignore code fingerprints shared by more projects (boilerplate)
     
     # Free Tier
     FREE_PROJECTS_PER_MONTH: int = 2
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, tuple_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -25,3 +25,37 @@ def get_db():
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+
+
+def iter_keyset(query, key_columns, batch_size: int = 1000):
+    """
+    Stream a query in batches using keyset pagination
+
+    Each batch continues after the last key of the previous one instead of
+    using OFFSET, so memory stays bounded by batch_size and later pages
+    cost the same as the first.
+
+    Args:
+        query: Query selecting (at least) the key columns
+        key_columns: Columns forming a unique, ordered key
+        batch_size: Rows fetched per round trip
+
+    Yields:
+        Lists of rows
+    """
+    last_key = None
+
+    while True:
+        page = query
+        if last_key is not None:
+            page = page.filter(tuple_(*key_columns) > tuple_(*last_key))
+
+        rows = page.order_by(*key_columns).limit(batch_size).all()
+        if not rows:
+            break
+
+        yield rows
+
+        if len(rows) < batch_size:
+            break
+        last_key = [getattr(rows[-1], column.key) for column in key_columns]
@@ -0,0 +1,33 @@
+from typing import Any, Awaitable
+import asyncio
+import os
+import threading
+
+
+_local = threading.local()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop of the calling thread
+
+    A new loop is created after fork: a loop inherited from the parent
+    shares its selector with it.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed() or getattr(_local, "pid", None) != os.getpid():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+        _local.pid = os.getpid()
+    return loop
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine from synchronous code (Celery tasks, background threads)
+
+    Unlike asyncio.run, the loop is kept between calls, so loop-bound
+    resources such as pooled HTTP connections are reused by the next call
+    on the same thread.
+    """
+    return get_event_loop().run_until_complete(coro)
@@ -0,0 +1,48 @@
+from typing import Any, Dict
+from app.core.config import settings
+import threading
+import time
+
+
+class RedisConnection:
+    """
+    Lazily connected Redis client for one optional Redis-backed feature
+
+    Every feature (rate limiter, breaker, caches, progress) owns an
+    instance. Instances for the same URL share one client and connection
+    pool per process, but each keeps its own failure state: callers report
+    errors through failed(), and that feature alone skips Redis for
+    retry_after seconds, so a Redis outage costs it one timeout, not one
+    per call, and it falls back to its in-process state meanwhile.
+    """
+
+    _clients: Dict[str, Any] = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, url: str = None, retry_after: float = 60.0):
+        self.url = url or settings.REDIS_URL
+        self.retry_after = retry_after
+        self._client = None
+        self._down_until = 0.0
+
+    def client(self):
+        """Redis client, or None while backing off after an error"""
+        if time.monotonic() < self._down_until:
+            return None
+        if self._client is None:
+            with self._clients_lock:
+                client = self._clients.get(self.url)
+                if client is None:
+                    import redis
+                    client = redis.Redis.from_url(self.url, socket_connect_timeout=0.5, socket_timeout=0.5)
+                    self._clients[self.url] = client
+            self._client = client
+        return self._client
+
+    def failed(self, error: Exception, tag: str = "Redis"):
+        print(f"[{tag}] Redis unavailable ({error}), using in-process state for {self.retry_after:.0f}s")
+        self._down_until = time.monotonic() + self.retry_after
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
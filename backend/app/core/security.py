@@ -46,6 +46,13 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
     return encoded_jwt
 
 
+def create_stream_token(user_id: str, job_id: str) -> str:
+    """Create a short-lived token that only opens the progress stream of one job"""
+    expire = datetime.utcnow() + timedelta(seconds=settings.PROGRESS_TOKEN_EXPIRE_SECONDS)
+    to_encode = {"sub": user_id, "job": job_id, "exp": expire, "type": "stream"}
+    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
 def decode_token(token: str) -> Dict[str, Any]:
     """Decode and validate JWT token"""
     try:
@@ -1,9 +1,12 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.database import init_db
 from app.api import auth, projects, admin, payments
-from app.services.vector_store_simple import vector_store
+from app.services.retriever import vector_store
+from app.services import warmup
+from app.services.http_client import http_client_pool
 from contextlib import asynccontextmanager
 
 
@@ -13,18 +16,26 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting SubmitWise API...")
     
+    # Load the embedding model unless the gunicorn master already did before forking
+    if not warmup.is_ready():
+        warmup.warm_up_in_background()
+    
     # Initialize database
     init_db()
     print("Database initialized")
     
-    # Seed vector store
+    # Seed vector store (loads the template snapshot unless templates changed)
     vector_store.seed_templates()
-    print("Vector store seeded")
+    print("Vector store ready")
+    
+    # Open the pooled LLM HTTP client
+    await http_client_pool.startup()
     
     yield
     
     # Shutdown
     print("Shutting down SubmitWise API...")
+    await http_client_pool.aclose()
 
 
 # Create FastAPI app
@@ -69,6 +80,17 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: fails until the embedding model is warmed up"""
+    if not warmup.is_ready():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "startup": warmup.startup_metrics}
+        )
+    return {"status": "ready", "startup": warmup.startup_metrics}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
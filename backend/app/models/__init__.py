@@ -2,7 +2,10 @@
 from app.models.user import User
 from app.models.college import College
 from app.models.project import Project
+from app.models.project_fingerprint import ProjectFingerprint
+from app.models.project_section_signature import ProjectSectionSignature
+from app.models.code_fingerprint import CodeFingerprint
 from app.models.payment import Payment
 from app.models.audit_log import AuditLog
 
-__all__ = ["User", "College", "Project", "Payment", "AuditLog"]
+__all__ = ["User", "College", "Project", "ProjectFingerprint", "ProjectSectionSignature", "CodeFingerprint", "Payment", "AuditLog"]
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.core.database import Base
+
+
+class CodeFingerprint(Base):
+    """Inverted index of winnowed code fingerprints: hash -> (project, file)"""
+    __tablename__ = "code_fingerprints"
+    __table_args__ = (
+        Index("ix_code_fingerprints_hash_project", "hash", "project_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hash = Column(BigInteger, nullable=False)
+    project_id = Column(String, ForeignKey("projects.id"), index=True, nullable=False)
+    filename = Column(String, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    project = relationship("Project", back_populates="code_fingerprints")
@@ -39,3 +39,6 @@ class Project(Base):
     
     # Relationships
     user = relationship("User", back_populates="projects")
+    fingerprint = relationship("ProjectFingerprint", back_populates="project", uselist=False)
+    section_signatures = relationship("ProjectSectionSignature", back_populates="project")
+    code_fingerprints = relationship("CodeFingerprint", back_populates="project")
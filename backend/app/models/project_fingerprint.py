@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.core.database import Base
+
+
+class ProjectFingerprint(Base):
+    __tablename__ = "project_fingerprints"
+
+    id = Column(String, primary_key=True, index=True)
+    project_id = Column(String, ForeignKey("projects.id"), unique=True, index=True, nullable=False)
+
+    # Source of the embedding
+    text_hash = Column(String(64), nullable=False)  # sha256 of the embedded text
+    embedding_model = Column(String, nullable=False, index=True)
+    dimensions = Column(Integer, nullable=False)
+
+    # Partition keys, copied from the project and its owner so scoped checks filter on indexed columns
+    college_id = Column(String, nullable=True, index=True)
+    subject = Column(String, nullable=True, index=True)  # Trimmed, lower-cased Project.subject
+    semester = Column(Integer, nullable=True)
+
+    # Packed float32 vector
+    embedding = Column(LargeBinary, nullable=False)
+
+    # Versions of the per-section MinHash signatures and code fingerprints stored for this project
+    minhash_version = Column(String, nullable=True)
+    winnow_version = Column(String, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    project = relationship("Project", back_populates="fingerprint")
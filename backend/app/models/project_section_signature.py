@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.core.database import Base
+
+
+class ProjectSectionSignature(Base):
+    __tablename__ = "project_section_signatures"
+    __table_args__ = (
+        UniqueConstraint("project_id", "section", name="uq_project_section_signature"),
+    )
+
+    id = Column(String, primary_key=True, index=True)
+    project_id = Column(String, ForeignKey("projects.id"), index=True, nullable=False)
+
+    # Section details
+    section = Column(String, nullable=False, index=True)  # introduction, system_study, methodology, conclusion
+
+    # Packed uint32 MinHash signature
+    minhash_version = Column(String, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Relationships
+    project = relationship("Project", back_populates="section_signatures")
@@ -29,6 +29,7 @@ class ProjectPreviewResponse(BaseModel):
     modules: List[Dict[str, Any]]
     difficulty: str
     timeline_days: int
+    partial: bool = False  # Sections streamed so far while generation is still running
 
 
 class ProjectDownloadResponse(BaseModel):
@@ -0,0 +1,33 @@
+"""
+Backfill plagiarism fingerprints for completed projects
+
+Usage:
+    python -m app.scripts.backfill_fingerprints [--batch-size 1000]
+"""
+import argparse
+from app.core.database import SessionLocal, init_db
+from app.services.plagiarism_checker import plagiarism_checker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill plagiarism fingerprints")
+    parser.add_argument("--batch-size", type=int, default=None, help="Projects per batch (default: PLAGIARISM_SCAN_BATCH_SIZE)")
+    args = parser.parse_args()
+
+    # Make sure the fingerprint table exists
+    init_db()
+
+    db = SessionLocal()
+    try:
+        written = plagiarism_checker.backfill_fingerprints(db, batch_size=args.batch_size)
+        print(f"Backfilled {written} fingerprints")
+
+        # Rebuild the ANN index snapshot so workers start from the full corpus
+        plagiarism_checker.refresh_and_save(db)
+        print("Plagiarism index snapshot saved")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
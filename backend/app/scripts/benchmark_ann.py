@@ -0,0 +1,131 @@
+"""
+Recall vs. latency benchmark for the plagiarism ANN index
+
+Compares each backend/knob setting against an exact scan over the same
+vectors and prints recall@k and mean query latency, then memory and
+recall of each quantization mode with and without exact re-scoring.
+
+Usage:
+    python -m app.scripts.benchmark_ann [--size 100000] [--dim 384] [--queries 200]
+    python -m app.scripts.benchmark_ann --from-db   # use stored fingerprints
+"""
+import argparse
+import time
+import numpy as np
+from app.services.ann_index import ExactIndex, create_index
+from app.services.quantization import QUANTIZATION_MODES
+
+
+def synthetic_corpus(size: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Clustered vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=size)
+    noise = rng.normal(scale=2.0, size=(size, dim)).astype(np.float32)
+    return centers[labels] + noise
+
+
+def load_fingerprints() -> np.ndarray:
+    """Stored fingerprint vectors of the current embedding model"""
+    from app.core.database import SessionLocal
+    from app.models.project_fingerprint import ProjectFingerprint
+    from app.services.embeddings_simple import embedding_service
+
+    db = SessionLocal()
+    try:
+        rows = db.query(ProjectFingerprint.embedding).filter(
+            ProjectFingerprint.embedding_model == embedding_service.model_name
+        ).all()
+        return np.stack([np.frombuffer(row.embedding, dtype=np.float32) for row in rows])
+    finally:
+        db.close()
+
+
+def run(index, queries: np.ndarray, truth, top_k: int, **search_options):
+    """Return (recall@k, mean latency in ms)"""
+    hits = 0
+    start = time.perf_counter()
+    results = [index.search(query, top_k=top_k, **search_options) for query in queries]
+    elapsed = time.perf_counter() - start
+
+    for result, expected in zip(results, truth):
+        hits += len({item_id for item_id, _, _ in result} & expected)
+
+    return hits / (len(queries) * top_k), elapsed * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plagiarism ANN index")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--from-db", action="store_true", help="Benchmark stored fingerprints")
+    args = parser.parse_args()
+
+    if args.from_db:
+        vectors = load_fingerprints()
+    else:
+        vectors = synthetic_corpus(args.size, args.dim, args.clusters)
+
+    ids = [str(i) for i in range(len(vectors))]
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + rng.normal(scale=0.1, size=queries.shape).astype(np.float32)
+
+    exact = ExactIndex()
+    exact.add(ids, vectors)
+    truth = [{item_id for item_id, _, _ in exact.search(q, top_k=args.top_k)} for q in queries]
+    _, exact_ms = run(exact, queries, truth, args.top_k)
+
+    print(f"Corpus: {len(vectors)} x {vectors.shape[1]}, queries: {len(queries)}, k={args.top_k}")
+    print(f"{'backend':<10}{'setting':<18}{'build s':>10}{'recall':>10}{'ms/query':>10}")
+    print(f"{'exact':<10}{'-':<18}{'-':>10}{1.0:>10.3f}{exact_ms:>10.3f}")
+
+    settings_to_try = [('ivf', {'nprobe': n}) for n in (1, 4, 8, 16, 32, 64)]
+    settings_to_try += [('hnsw', {'ef_search': ef}) for ef in (16, 32, 64, 128, 256)]
+
+    built = {}
+    for backend, options in settings_to_try:
+        index = built.get(backend)
+        build_s = 0.0
+        if index is None:
+            index = create_index(backend, **options)
+            if index.backend != backend:
+                print(f"{backend:<10}skipped (optional dependency missing)")
+                built[backend] = False
+                continue
+            start = time.perf_counter()
+            index.add(ids, vectors)
+            build_s = time.perf_counter() - start
+            built[backend] = index
+        elif index is False:
+            continue
+
+        for name, value in options.items():
+            setattr(index, name, value)
+
+        recall, ms = run(index, queries, truth, args.top_k)
+        setting = ", ".join(f"{k}={v}" for k, v in options.items())
+        build = f"{build_s:.2f}" if build_s else "-"
+        print(f"{backend:<10}{setting:<18}{build:>10}{recall:>10.3f}{ms:>10.3f}")
+
+    print()
+    print(f"{'quantization':<14}{'MB':>10}{'bytes/vec':>11}{'recall':>10}{'rescored':>10}{'ms/query':>10}")
+    rescore = lambda item_ids: vectors[[int(item_id) for item_id in item_ids]]
+    for mode in QUANTIZATION_MODES:
+        index = ExactIndex(quantization=mode)
+        index.add(ids, vectors)
+        stats = index.memory_stats()
+
+        recall, _ = run(index, queries, truth, args.top_k)
+        rescored, ms = run(index, queries, truth, args.top_k, rescore=rescore)
+        print(
+            f"{mode:<14}{stats['bytes'] / 2**20:>10.1f}{stats['bytes'] // max(stats['vectors'], 1):>11}"
+            f"{recall:>10.3f}{rescored:>10.3f}{ms:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
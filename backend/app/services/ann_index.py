@@ -0,0 +1,445 @@
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from app.services.similarity_engine import SimilarityEngine
+from app.services.quantization import ScalarQuantizer
+import numpy as np
+import json
+import os
+import uuid
+
+
+class ExactIndex(SimilarityEngine):
+    """Brute-force index: exact results, cost linear in corpus size"""
+
+    backend = "exact"
+
+    def _state(self) -> Dict[str, Any]:
+        """Arrays and settings written to disk"""
+        count = len(self.ids)
+        return {
+            'matrix': self.matrix[:count] if count else np.zeros((0, self.dimensions or 0), dtype=np.float32),
+            'scales': self.scales[:count] if count else np.zeros(0, dtype=np.float32),
+            'quantization': self.quantizer.mode,
+            'ids': np.array(self.ids, dtype=str),
+            'payloads': json.dumps(self.payloads),
+        }
+
+    def _restore(self, state: Dict[str, Any]):
+        """Rebuild in-memory structures from a saved state, re-quantizing if the mode changed"""
+        ids = [str(item_id) for item_id in state['ids']]
+        if not ids:
+            return
+
+        saved = ScalarQuantizer(str(state['quantization']) if 'quantization' in state else "none")
+        scales = state['scales'] if 'scales' in state else np.ones(len(ids), dtype=np.float32)
+        self.add(ids, saved.decode(state['matrix'], scales), json.loads(str(state['payloads'])))
+
+    def save(self, path: str, metadata: Optional[Dict[str, Any]] = None):
+        """Atomically write the index to path (a .npz file)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Writers share the index volume, so each one stages its own temp file
+        tmp_path = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    backend=self.backend,
+                    metadata=json.dumps(metadata or {}, default=str),
+                    **self._state()
+                )
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load(self, path: str) -> Dict[str, Any]:
+        """
+        Load an index saved with save()
+
+        Returns:
+            The metadata dict stored alongside the vectors
+        """
+        with np.load(path, allow_pickle=False) as state:
+            if str(state['backend']) != self.backend:
+                raise ValueError(f"Index at {path} was built with backend {state['backend']}")
+            self._restore({key: state[key] for key in state.files})
+            return json.loads(str(state['metadata']))
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index in pure NumPy
+
+    Vectors are clustered with spherical k-means; a query only scores the
+    vectors in its `nprobe` closest clusters. Raising nprobe trades latency
+    for recall (nprobe == n_lists is an exact scan). Below `min_train_size`
+    vectors the index stays untrained and scans exactly.
+    """
+
+    backend = "ivf"
+
+    def __init__(
+        self,
+        n_lists: int = 0,
+        nprobe: int = 8,
+        min_train_size: int = 1000,
+        kmeans_iterations: int = 10,
+        seed: int = 42,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.n_lists = n_lists  # 0 = sqrt(corpus size) at training time
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._assignments: List[int] = []
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _nearest_lists(self, vectors: np.ndarray) -> np.ndarray:
+        """Cluster id of each (normalized) vector"""
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def train(self):
+        """Cluster the current corpus and rebuild the inverted lists"""
+        count = len(self.ids)
+        if count == 0:
+            return
+
+        n_lists = self.n_lists or int(np.sqrt(count))
+        n_lists = max(1, min(n_lists, count))
+        data = self.vectors(slice(0, count))
+
+        rng = np.random.default_rng(self.seed)
+        centroids = data[rng.choice(count, size=n_lists, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            counts = np.bincount(assignments, minlength=n_lists)
+
+            # Empty clusters keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = self.normalize(sums[filled])
+
+        self.centroids = centroids.astype(np.float32)
+        self.trained_size = count
+        self._assignments = self._nearest_lists(data).tolist()
+        self._lists = [[] for _ in range(n_lists)]
+        for position, list_id in enumerate(self._assignments):
+            self._lists[list_id].append(position)
+        self._list_arrays = {}
+
+    def add(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Insert vectors, assigning them to their nearest cluster"""
+        first_new = len(self.ids)
+        super().add(ids, vectors, payloads)
+
+        if not self.is_trained:
+            if len(self.ids) >= self.min_train_size:
+                self.train()
+            return
+
+        # Retrain once the corpus outgrows the clustering by 4x
+        if len(self.ids) > 4 * self.trained_size:
+            self.train()
+            return
+
+        positions = [self._positions[item_id] for item_id in ids]
+        lists = self._nearest_lists(self.vectors(positions))
+
+        for position, list_id in zip(positions, lists.tolist()):
+            if position < first_new:
+                old_list = self._assignments[position]
+                if old_list == list_id:
+                    continue
+                self._lists[old_list].remove(position)
+                self._list_arrays.pop(old_list, None)
+                self._assignments[position] = list_id
+            else:
+                self._assignments.append(list_id)
+            self._lists[list_id].append(position)
+            self._list_arrays.pop(list_id, None)
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = np.array(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 5,
+        rescore: Optional[Callable[[List[str]], np.ndarray]] = None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Score only the vectors in the nprobe clusters closest to the query"""
+        if not self.is_trained:
+            return super().search(query, top_k, rescore)
+
+        count = len(self.ids)
+        if count == 0 or top_k <= 0:
+            return []
+
+        query = self.normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        nprobe = max(1, min(self.nprobe, len(self._lists)))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidates = np.concatenate([self._list_array(list_id) for list_id in probe])
+        if candidates.size == 0:
+            return []
+
+        return self._rank(candidates, query, top_k, rescore)
+
+    def _state(self) -> Dict[str, Any]:
+        state = super()._state()
+        state['settings'] = json.dumps({
+            'n_lists': self.n_lists,
+            'min_train_size': self.min_train_size,
+            'trained_size': self.trained_size,
+        })
+        if self.is_trained:
+            state['centroids'] = self.centroids
+            state['assignments'] = np.array(self._assignments, dtype=np.int32)
+        return state
+
+    def _restore(self, state: Dict[str, Any]):
+        # Rows are loaded without retraining, then clusters are restored as saved
+        min_train_size = self.min_train_size
+        self.min_train_size = float('inf')
+        super()._restore(state)
+        self.min_train_size = min_train_size
+
+        if 'centroids' in state:
+            self.centroids = state['centroids'].astype(np.float32)
+            self.trained_size = json.loads(str(state['settings']))['trained_size']
+            self._assignments = state['assignments'].tolist()
+            self._lists = [[] for _ in range(self.centroids.shape[0])]
+            for position, list_id in enumerate(self._assignments):
+                self._lists[list_id].append(position)
+            self._list_arrays = {}
+
+
+class HNSWIndex:
+    """
+    Graph index backed by the optional compiled `hnswlib` package
+
+    `ef_search` is the recall/latency knob: larger values explore more of
+    the graph per query.
+    """
+
+    backend = "hnsw"
+
+    def __init__(
+        self,
+        ef_search: int = 64,
+        ef_construction: int = 200,
+        m: int = 16,
+        dimensions: Optional[int] = None,
+        initial_capacity: int = 1024
+    ):
+        import hnswlib  # Optional dependency
+
+        self._hnswlib = hnswlib
+        self.ef_search = ef_search
+        self.ef_construction = ef_construction
+        self.m = m
+        self.dimensions = dimensions
+        self.index = None
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._initial_capacity = initial_capacity
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._positions
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Approximate bytes of vectors plus graph links"""
+        count = len(self.ids)
+        dimensions = self.dimensions or 0
+        return {
+            'quantization': 'none',
+            'vectors': count,
+            'bytes': count * (dimensions * 4 + self.m * 2 * 4),
+            'float32_bytes': count * dimensions * 4
+        }
+
+    def _ensure_index(self, rows: int):
+        if self.index is None:
+            self.index = self._hnswlib.Index(space='cosine', dim=self.dimensions)
+            self.index.init_index(
+                max_elements=max(self._initial_capacity, rows),
+                ef_construction=self.ef_construction,
+                M=self.m
+            )
+        elif rows > self.index.get_max_elements():
+            self.index.resize_index(max(rows, self.index.get_max_elements() * 2))
+        self.index.set_ef(self.ef_search)
+
+    def add(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ):
+        if not ids:
+            return
+
+        vectors = SimilarityEngine.normalize(np.atleast_2d(vectors))
+        if self.dimensions is None:
+            self.dimensions = vectors.shape[1]
+        if payloads is None:
+            payloads = [{} for _ in ids]
+
+        labels = []
+        for item_id, payload in zip(ids, payloads):
+            position = self._positions.get(item_id)
+            if position is None:
+                position = len(self.ids)
+                self._positions[item_id] = position
+                self.ids.append(item_id)
+                self.payloads.append(payload)
+            else:
+                self.payloads[position] = payload
+            labels.append(position)
+
+        self._ensure_index(len(self.ids))
+        self.index.add_items(vectors, np.array(labels, dtype=np.int64))
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 5,
+        rescore: Optional[Callable[[List[str]], np.ndarray]] = None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """hnswlib keeps float32 vectors, so results are already exact (rescore is unused)"""
+        count = len(self.ids)
+        if count == 0 or top_k <= 0:
+            return []
+
+        self.index.set_ef(max(self.ef_search, top_k))
+        query = SimilarityEngine.normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))
+        labels, distances = self.index.knn_query(query, k=min(top_k, count))
+
+        return [
+            (self.ids[label], float(1.0 - distance), self.payloads[label])
+            for label, distance in zip(labels[0].tolist(), distances[0].tolist())
+        ]
+
+    def save(self, path: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Write the graph next to a .npz sidecar holding ids and payloads
+
+        Each save writes a uniquely named graph file and records its name in
+        the sidecar, so replacing the sidecar swaps both files in one step.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        previous_graph = self._graph_path(path)
+        token = f"{os.getpid()}-{uuid.uuid4().hex}"
+        graph_path = f"{path}.{token}.graph"
+        tmp_path = f"{path}.tmp-{token}"
+        try:
+            self.index.save_index(graph_path)
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    backend=self.backend,
+                    dimensions=self.dimensions,
+                    graph=os.path.basename(graph_path),
+                    ids=np.array(self.ids, dtype=str),
+                    payloads=json.dumps(self.payloads),
+                    metadata=json.dumps(metadata or {}, default=str)
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            for leftover in (graph_path, tmp_path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+
+        if previous_graph and previous_graph != graph_path and os.path.exists(previous_graph):
+            os.remove(previous_graph)
+
+    @staticmethod
+    def _graph_path(path: str) -> Optional[str]:
+        """Graph file referenced by the sidecar at path, if there is one"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as state:
+                if 'graph' not in state.files:
+                    return f"{path}.graph"
+                return os.path.join(os.path.dirname(path), str(state['graph']))
+        except (OSError, ValueError):
+            return None
+
+    def load(self, path: str) -> Dict[str, Any]:
+        with np.load(path, allow_pickle=False) as state:
+            if str(state['backend']) != self.backend:
+                raise ValueError(f"Index at {path} was built with backend {state['backend']}")
+            self.dimensions = int(state['dimensions'])
+            self.ids = [str(item_id) for item_id in state['ids']]
+            self.payloads = json.loads(str(state['payloads']))
+            metadata = json.loads(str(state['metadata']))
+            graph_path = (
+                os.path.join(os.path.dirname(path), str(state['graph']))
+                if 'graph' in state.files else f"{path}.graph"
+            )
+
+        self._positions = {item_id: i for i, item_id in enumerate(self.ids)}
+        self.index = self._hnswlib.Index(space='cosine', dim=self.dimensions)
+        self.index.load_index(graph_path, max_elements=max(self._initial_capacity, len(self.ids)))
+        self.index.set_ef(self.ef_search)
+        return metadata
+
+
+def create_index(backend: str, **options):
+    """
+    Build an empty index for the given backend
+
+    Args:
+        backend: "exact", "ivf" or "hnsw" (falls back to "ivf" if hnswlib is missing)
+        options: Backend-specific knobs (nprobe, n_lists, ef_search, quantization, ...)
+    """
+    if backend == "hnsw":
+        try:
+            return HNSWIndex(**{k: v for k, v in options.items() if k in ('ef_search', 'ef_construction', 'm')})
+        except ImportError:
+            print("[ANN] hnswlib not installed, falling back to IVF index")
+            backend = "ivf"
+
+    if backend == "ivf":
+        return IVFIndex(**{
+            k: v for k, v in options.items()
+            if k in ('n_lists', 'nprobe', 'min_train_size', 'quantization', 'rescore_factor')
+        })
+
+    if backend == "exact":
+        return ExactIndex(**{k: v for k, v in options.items() if k in ('quantization', 'rescore_factor')})
+
+    raise ValueError(f"Unknown ANN index backend: {backend}")
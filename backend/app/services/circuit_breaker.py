@@ -0,0 +1,242 @@
+from typing import Dict, Any, List, Optional
+from collections import deque
+from app.core.config import settings
+from app.core.redis_client import RedisConnection
+import json
+import threading
+import time
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+EVENTS_CHANNEL = "events:circuit_breaker"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker driven by the rolling error rate and slow-call rate
+
+    Calls from the last `window` seconds are kept. Once at least min_calls
+    are in the window and either the failure rate reaches error_rate or the
+    share of calls slower than slow_call_seconds reaches slow_call_rate,
+    the circuit opens: calls fail fast for open_seconds. It then goes
+    half-open and lets a single trial call through; success closes it,
+    failure opens it again.
+
+    The opening is shared through Redis (circuit:<name>), so the API
+    process sees a circuit opened by Celery workers, and every state change
+    is published on the events:circuit_breaker channel.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 60.0,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 90.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        connection: RedisConnection = None
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.connection = connection or RedisConnection()
+        self._calls: deque = deque()  # (finished_at, failed, slow)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_until = 0.0  # wall-clock time, comparable across processes
+        self._trial_running = False
+        self.events: deque = deque(maxlen=50)
+
+    @property
+    def _shared_key(self) -> str:
+        return f"circuit:{self.name}"
+
+    def _shared_open_until(self) -> float:
+        client = self.connection.client()
+        if client is None:
+            return 0.0
+        try:
+            value = client.get(self._shared_key)
+            return float(value) if value else 0.0
+        except Exception as e:
+            self.connection.failed(e, "CircuitBreaker")
+            return 0.0
+
+    def _transition(self, state: str, reason: str = ""):
+        """Change state (lock held) and publish the change"""
+        if state == self._state:
+            return
+        event = {
+            'breaker': self.name,
+            'from': self._state,
+            'to': state,
+            'reason': reason,
+            'at': round(time.time(), 3)
+        }
+        self._state = state
+        self.events.append(event)
+        print(f"[CircuitBreaker] {self.name}: {event['from']} -> {state} {reason}".rstrip())
+
+        client = self.connection.client()
+        if client is not None:
+            try:
+                if state == OPEN:
+                    client.set(self._shared_key, self._opened_until, ex=max(1, int(self.open_seconds) + 1))
+                elif state == CLOSED:
+                    client.delete(self._shared_key)
+                client.publish(EVENTS_CHANNEL, json.dumps(event))
+            except Exception as e:
+                self.connection.failed(e, "CircuitBreaker")
+
+    def state(self, shared_until: Optional[float] = None) -> str:
+        """
+        Current state, also considering an opening by another process
+
+        Args:
+            shared_until: The shared open-until already read (see
+                shared_open_until); read from Redis when omitted
+        """
+        if shared_until is None:
+            shared_until = self._shared_open_until()
+        with self._lock:
+            now = time.time()
+            if shared_until > now and self._state != OPEN:
+                self._opened_until = max(self._opened_until, shared_until)
+                self._transition(OPEN, "(opened by another worker)")
+            if self._state == OPEN and now >= self._opened_until:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a trial call through"""
+        return max(0.0, self._opened_until - time.time())
+
+    def is_open(self) -> bool:
+        return self.state() == OPEN
+
+    def before_call(self, shared_until: Optional[float] = None):
+        """Raise CircuitOpenError unless a call may go ahead now"""
+        state = self.state(shared_until)
+        with self._lock:
+            if state == OPEN or (state == HALF_OPEN and self._trial_running):
+                raise CircuitOpenError(self.name, self.retry_after())
+            if state == HALF_OPEN:
+                self._trial_running = True
+
+    def release(self):
+        """Give back a call allowed by before_call that never reached the dependency"""
+        with self._lock:
+            self._trial_running = False
+
+    def record(self, failed: bool, duration: float):
+        """Outcome of a call allowed by before_call"""
+        now = time.time()
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_running = False
+                if failed or slow:
+                    self._open(now, "(trial call failed)" if failed else "(trial call slow)")
+                else:
+                    self._calls.clear()
+                    self._transition(CLOSED, "(trial call succeeded)")
+                return
+
+            self._calls.append((now, failed, slow))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+
+            total = len(self._calls)
+            if self._state != CLOSED or total < self.min_calls:
+                return
+            failures = sum(1 for _, call_failed, _ in self._calls if call_failed)
+            slow_calls = sum(1 for _, _, call_slow in self._calls if call_slow)
+            if failures / total >= self.error_rate:
+                self._open(now, f"(error rate {failures}/{total})")
+            elif slow_calls / total >= self.slow_call_rate:
+                self._open(now, f"(slow calls {slow_calls}/{total})")
+
+    def _open(self, now: float, reason: str):
+        self._opened_until = now + self.open_seconds
+        self._calls.clear()
+        self._transition(OPEN, reason)
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state()
+        with self._lock:
+            total = len(self._calls)
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            return {
+                'state': state,
+                'retry_after_seconds': round(self.retry_after(), 1) if state == OPEN else 0.0,
+                'window_calls': total,
+                'window_error_rate': round(failures / total, 3) if total else 0.0,
+                'recent_events': list(self.events)
+            }
+
+
+def circuit_open_cause(error: BaseException) -> Optional[CircuitOpenError]:
+    """The CircuitOpenError behind an error, if any (callers wrap it in their own messages)"""
+    while error is not None:
+        if isinstance(error, CircuitOpenError):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def shared_open_until(breakers: List[CircuitBreaker]) -> List[float]:
+    """
+    Shared open-until time of several breakers, with one MGET per Redis client
+
+    Blocking; async callers run it in a thread and pass the values to
+    state() / before_call().
+    """
+    values = [0.0] * len(breakers)
+    groups: Dict[int, List[int]] = {}
+    clients: Dict[int, Any] = {}
+    for i, breaker in enumerate(breakers):
+        client = breaker.connection.client()
+        if client is not None:
+            groups.setdefault(id(client), []).append(i)
+            clients[id(client)] = client
+
+    for key, positions in groups.items():
+        try:
+            stored = clients[key].mget([breakers[i]._shared_key for i in positions])
+        except Exception as e:
+            for i in positions:
+                breakers[i].connection.failed(e, "CircuitBreaker")
+            continue
+        for i, value in zip(positions, stored):
+            values[i] = float(value) if value else 0.0
+    return values
+
+
+# Breaker around the LLM dependency
+llm_breaker = CircuitBreaker(
+    "llm",
+    window=settings.LLM_BREAKER_WINDOW,
+    min_calls=settings.LLM_BREAKER_MIN_CALLS,
+    error_rate=settings.LLM_BREAKER_ERROR_RATE,
+    slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+    slow_call_rate=settings.LLM_BREAKER_SLOW_CALL_RATE,
+    open_seconds=settings.LLM_BREAKER_OPEN_SECONDS
+)
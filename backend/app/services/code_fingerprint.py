@@ -0,0 +1,127 @@
+from typing import Dict, Any, List, Optional, Set, Tuple
+import re
+import zlib
+
+
+# Keywords kept verbatim; every other identifier is normalized to "V"
+KEYWORDS = {
+    # Python
+    "and", "as", "assert", "async", "await", "break", "class", "continue", "def", "del",
+    "elif", "else", "except", "finally", "for", "from", "global", "if", "import", "in",
+    "is", "lambda", "nonlocal", "not", "or", "pass", "raise", "return", "try", "while",
+    "with", "yield", "None", "True", "False", "self",
+    # C-family / Java / JavaScript
+    "auto", "bool", "boolean", "case", "catch", "char", "const", "default", "do", "double",
+    "enum", "extends", "final", "float", "function", "implements", "include", "int", "interface",
+    "let", "long", "new", "null", "package", "private", "protected", "public", "short",
+    "static", "struct", "super", "switch", "this", "throw", "throws", "typedef", "unsigned",
+    "var", "void", "volatile", "true", "false", "undefined", "export", "require",
+    # SQL
+    "select", "insert", "update", "delete", "where", "join", "create", "table", "values",
+}
+
+# One left-to-right scan: a comment marker inside a string literal is part
+# of the string, and C preprocessor lines are code, not "#" comments
+TOKEN_PATTERN = re.compile(
+    r"(?P<comment>/\*.*?\*/"                                  # C-style block comments
+    r"|//[^\n]*"                                              # C++/Java/JS line comments
+    r"|<!--.*?-->"                                            # HTML comments
+    r"|#(?!\s*(?:include|define|undef|ifn?def|if|elif|else|endif|pragma|error)\b)[^\n]*)"  # Python/shell comments
+    r"|(?P<string>\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')"
+    r"|(?P<number>\b\d+(?:\.\d+)?\b)"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<symbol>[^\s\w])",
+    re.DOTALL
+)
+
+
+class CodeFingerprinter:
+    """
+    MOSS-style winnowing fingerprints for source files
+
+    Code is normalized (comments dropped, identifiers/strings/numbers
+    replaced by placeholders), hashed as k-grams of tokens, and winnowed:
+    the minimum hash of every window of `window` consecutive k-gram hashes
+    is kept. Any shared run of at least k + window - 1 normalized tokens is
+    guaranteed to produce a shared fingerprint.
+    """
+
+    def __init__(self, k: int = 5, window: int = 4):
+        self.k = k
+        self.window = window
+        self.version = f"winnow-v2-{k}x{window}"
+
+    def normalize(self, code: str) -> List[str]:
+        """Normalized token stream of a source file"""
+        tokens = []
+        for match in TOKEN_PATTERN.finditer(code):
+            kind = match.lastgroup
+            if kind == "comment":
+                continue
+            if kind == "string":
+                tokens.append("S")
+            elif kind == "number":
+                tokens.append("N")
+            elif kind == "word":
+                word = match.group()
+                tokens.append(word if word in KEYWORDS else "V")
+            else:
+                tokens.append(match.group())
+        return tokens
+
+    def kgram_hashes(self, tokens: List[str]) -> List[int]:
+        """32-bit hash of every k-gram of tokens"""
+        return [
+            zlib.crc32(" ".join(tokens[i:i + self.k]).encode("utf-8"))
+            for i in range(len(tokens) - self.k + 1)
+        ]
+
+    def winnow(self, hashes: List[int]) -> Set[int]:
+        """Distinct minimum hashes over all windows of consecutive k-gram hashes"""
+        if not hashes:
+            return set()
+        if len(hashes) <= self.window:
+            return {min(hashes)}
+
+        selected = set()
+        for start in range(len(hashes) - self.window + 1):
+            window = hashes[start:start + self.window]
+            selected.add(min(window))
+        return selected
+
+    def fingerprint(self, code: str) -> Set[int]:
+        """Winnowed fingerprints of a source file"""
+        return self.winnow(self.kgram_hashes(self.normalize(code)))
+
+    @staticmethod
+    def code_snippets(project_data: Dict[str, Any]) -> List[Tuple[Optional[str], str]]:
+        """
+        (filename or None, content) of every generated source snippet
+
+        Reads `code_snippets` with `content` or the Groq schema's
+        `code_samples` with `code`, with markdown fences removed. Empty
+        snippets are kept; the ZIP bundler exports them as they are.
+        """
+        snippets = project_data.get('code_snippets') or project_data.get('code_samples') or []
+        if not isinstance(snippets, list):
+            return []
+
+        extracted = []
+        for snippet in snippets:
+            if not isinstance(snippet, dict):
+                continue
+            content = snippet.get('content') or snippet.get('code') or ''
+            if content.startswith('```'):
+                lines = content.split('\n')
+                content = '\n'.join(lines[1:-1]) if len(lines) > 2 else content
+            extracted.append((snippet.get('filename') or None, content))
+        return extracted
+
+    @staticmethod
+    def code_files(project_data: Dict[str, Any]) -> Dict[str, str]:
+        """Non-empty generated source files keyed by filename"""
+        files = {}
+        for idx, (filename, content) in enumerate(CodeFingerprinter.code_snippets(project_data), 1):
+            if content.strip():
+                files[filename or f"code_{idx}.txt"] = content
+        return files
@@ -0,0 +1,164 @@
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import Future
+from collections import defaultdict
+from app.core.config import settings
+import numpy as np
+import os
+import queue
+import threading
+import time
+
+
+HISTOGRAM_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def length_bucket(text: str) -> int:
+    """Power-of-two bucket of the word count, so a batch pads to similar lengths"""
+    return min(len(text.split()).bit_length(), 9)
+
+
+class EmbeddingBatcher:
+    """
+    Thread-based micro-batcher in front of an embedding model
+
+    Concurrent callers (request threads, Celery tasks) enqueue texts and
+    block on a future. A background worker thread collects requests for up
+    to max_wait_ms or max_items texts, groups them by length bucket and runs
+    one model call per bucket, then resolves each caller's future with its
+    own rows.
+    """
+
+    def __init__(self, service, max_wait_ms: float = 5.0, max_items: int = 64):
+        self.service = service
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._pending = 0
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.items = 0
+        self.histogram: Dict[str, int] = defaultdict(int)
+
+    def _ensure_worker(self) -> queue.Queue:
+        """Start the worker thread (again after a fork, which drops threads)"""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pending = 0
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts; the future resolves to a (len(texts), dimensions) array"""
+        future: Future = Future()
+        work = self._ensure_worker()
+        with self._lock:
+            self._pending += len(texts)
+            self.max_queue_depth = max(self.max_queue_depth, self._pending)
+        work.put((list(texts), future))
+        return future
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    def _collect(self, work: queue.Queue) -> List[Tuple[List[str], Future]]:
+        """Block for one request, then gather more until the batch is full or the wait expires"""
+        requests = [work.get()]
+        count = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_items:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = work.get(timeout=remaining)
+            except queue.Empty:
+                break
+            requests.append(request)
+            count += len(request[0])
+        return requests
+
+    def _record(self, size: int):
+        self.batches += 1
+        self.items += size
+        bound = next((b for b in HISTOGRAM_BOUNDS if size <= b), None)
+        self.histogram[f"<={bound}" if bound else f">{HISTOGRAM_BOUNDS[-1]}"] += 1
+
+    def _run(self):
+        work = self._queue
+        while True:
+            requests = self._collect(work)
+            texts = [text for request_texts, _ in requests for text in request_texts]
+            with self._lock:
+                self._pending -= len(texts)
+
+            try:
+                buckets: Dict[int, List[int]] = defaultdict(list)
+                for i, text in enumerate(texts):
+                    buckets[length_bucket(text)].append(i)
+
+                vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+                for positions in buckets.values():
+                    for start in range(0, len(positions), self.max_items):
+                        chunk = positions[start:start + self.max_items]
+                        embedded = self.service.embed_batch([texts[i] for i in chunk])
+                        for i, vector in zip(chunk, embedded):
+                            vectors[i] = vector
+                        self._record(len(chunk))
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for request_texts, future in requests:
+                rows = vectors[offset:offset + len(request_texts)]
+                offset += len(request_texts)
+                future.set_result(np.stack(rows).astype(np.float32, copy=False))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self._pending,
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'batch_size_histogram': dict(self.histogram)
+        }
+
+
+class BatchedEmbeddingService:
+    """
+    Embedding service that routes small requests through an EmbeddingBatcher
+
+    Batches of at least max_items texts are already efficient and go to the
+    model directly.
+    """
+
+    def __init__(self, service, max_wait_ms: float = None, max_items: int = None):
+        self.service = service
+        self.batcher = EmbeddingBatcher(
+            service,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms,
+            max_items=max_items or settings.EMBEDDING_BATCH_MAX_ITEMS
+        )
+
+    def __getattr__(self, name: str):
+        return getattr(self.service, name)
+
+    @property
+    def model_name(self) -> str:
+        return self.service.model_name
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        if not texts or len(texts) >= self.batcher.max_items:
+            return self.service.embed_batch(texts)
+        return self.batcher.embed_batch(texts)
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
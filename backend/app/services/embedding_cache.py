@@ -0,0 +1,219 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.redis_client import RedisConnection
+import numpy as np
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+class RedisTier:
+    """Shared cache tier in Redis; skipped for a while after connection errors"""
+
+    def __init__(self, connection: RedisConnection, ttl: int):
+        self.connection = connection
+        self.ttl = ttl
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        client = self.connection.client()
+        if client is None:
+            return [None] * len(keys)
+        try:
+            return client.mget(keys)
+        except Exception as e:
+            self.connection.failed(e, "EmbeddingCache")
+            return [None] * len(keys)
+
+    def put_many(self, items: Dict[str, bytes]):
+        client = self.connection.client()
+        if client is None:
+            return
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipeline.set(key, value, ex=self.ttl)
+            pipeline.execute()
+        except Exception as e:
+            self.connection.failed(e, "EmbeddingCache")
+
+
+class DiskTier:
+    """Cache tier in a local SQLite file, shared by the processes of one host"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(
+            os.path.join(directory, "embeddings.sqlite3"),
+            check_same_thread=False,
+            timeout=5
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def put_many(self, items: Dict[str, bytes]):
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, value) VALUES (?, ?)",
+                    list(items.items())
+                )
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache
+
+    Entries are keyed by model name + sha256 of the text, so a model change
+    never serves stale vectors. Lookups go to an in-process LRU first, then
+    to an optional shared tier (Redis or an on-disk SQLite file).
+    """
+
+    def __init__(self, max_items: int = 10000, tier=None):
+        self.max_items = max_items
+        self.tier = tier
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.tier_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return f"emb:{model_name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors (None for misses)"""
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        remote = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    remote.append(i)
+
+        if remote and self.tier is not None:
+            values = self.tier.get_many([keys[i] for i in remote])
+            with self._lock:
+                for i, value in zip(remote, values):
+                    if value is not None:
+                        results[i] = np.frombuffer(value, dtype=np.float32)
+                        self._remember(keys[i], results[i])
+                        self.tier_hits += 1
+
+        with self._lock:
+            self.misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        vectors = {key: np.asarray(vector, dtype=np.float32) for key, vector in items.items()}
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+        if self.tier is not None and vectors:
+            self.tier.put_many({key: vector.tobytes() for key, vector in vectors.items()})
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.tier_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'tier_hits': self.tier_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.tier_hits) / lookups, 4) if lookups else 0.0,
+            'entries': len(self._entries),
+            'tier': type(self.tier).__name__ if self.tier is not None else None
+        }
+
+
+class CachedEmbeddingService:
+    """
+    Wraps an embedding service so only uncached texts reach the model
+
+    Exposes the wrapped service's interface; embed_batch deduplicates the
+    misses of a batch and embeds them in one call.
+    """
+
+    def __init__(self, service, cache: EmbeddingCache):
+        self.service = service
+        self.cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self.service, name)
+
+    @property
+    def model_name(self) -> str:
+        return self.service.model_name
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        texts = [text or "" for text in texts]
+        keys = [self.cache.key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            embedded = np.asarray(self.service.embed_batch(list(missing.values())), dtype=np.float32)
+            fresh = dict(zip(missing.keys(), embedded))
+            self.cache.put_many(fresh)
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        if not vectors:
+            return np.asarray(self.service.embed_batch([]), dtype=np.float32)
+        return np.stack(vectors)
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+
+
+def create_embedding_cache() -> EmbeddingCache:
+    """Cache configured by EMBEDDING_CACHE_BACKEND (memory, disk or redis)"""
+    backend = settings.EMBEDDING_CACHE_BACKEND
+    tier = None
+    if backend == "redis":
+        tier = RedisTier(RedisConnection(), settings.EMBEDDING_CACHE_TTL)
+    elif backend == "disk":
+        try:
+            tier = DiskTier(settings.EMBEDDING_CACHE_DIR)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[EmbeddingCache] Disk tier unavailable ({e}), using in-process cache only")
+    elif backend != "memory":
+        print(f"[EmbeddingCache] Unknown EMBEDDING_CACHE_BACKEND {backend!r}, using in-process cache only")
+    return EmbeddingCache(max_items=settings.EMBEDDING_CACHE_SIZE, tier=tier)
+
+
+# Cache of the sentence-transformer service
+embedding_cache = create_embedding_cache()
+
+# In-process only: a feature-hash embedding takes microseconds, less than a
+# round-trip to a shared tier
+feature_hash_cache = EmbeddingCache(max_items=settings.EMBEDDING_CACHE_SIZE)
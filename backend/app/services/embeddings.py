@@ -2,6 +2,8 @@ from sentence_transformers import SentenceTransformer
 from typing import List
 import numpy as np
 from app.core.config import settings
+from app.services.embedding_cache import CachedEmbeddingService, embedding_cache
+from app.services.embedding_batcher import BatchedEmbeddingService
 
 
 class EmbeddingService:
@@ -16,17 +18,17 @@ class EmbeddingService:
         if self.model is None:
             self.model = SentenceTransformer(self.model_name)
     
-    def embed_text(self, text: str) -> List[float]:
-        """Generate embedding for a single text"""
+    def embed_text(self, text: str) -> np.ndarray:
+        """Generate embedding for a single text as a float32 array"""
         self.load_model()
         embedding = self.model.encode(text, convert_to_numpy=True)
-        return embedding.tolist()
+        return embedding.astype(np.float32, copy=False)
     
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts"""
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for multiple texts as a (len(texts), dimensions) float32 array"""
         self.load_model()
         embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings.tolist()
+        return embeddings.astype(np.float32, copy=False)
     
     def cosine_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Calculate cosine similarity between two embeddings"""
@@ -43,5 +45,8 @@ class EmbeddingService:
         return float(dot_product / (norm1 * norm2))
 
 
-# Singleton instance
-embedding_service = EmbeddingService()
+# Singleton instance, behind the shared embedding cache and (optionally) the micro-batcher
+model_service = EmbeddingService()
+if settings.EMBEDDING_BATCHING:
+    model_service = BatchedEmbeddingService(model_service)
+embedding_service = CachedEmbeddingService(model_service, embedding_cache)
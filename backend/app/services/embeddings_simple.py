@@ -1,41 +1,143 @@
-from typing import List
-import math
+from typing import List, Tuple
+from functools import lru_cache
+from collections import Counter
+from app.services.embedding_cache import CachedEmbeddingService, feature_hash_cache
+import numpy as np
+import hashlib
+import re
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+@lru_cache(maxsize=262144)
+def _feature_slot(feature: str, dimensions: int) -> Tuple[int, float]:
+    """
+    Stable (index, sign) for a feature
+
+    Uses blake2b instead of the built-in hash(), which is salted per process.
+    """
+    digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+    return digest % dimensions, (1.0 if digest >> 63 else -1.0)
+
+
+@lru_cache(maxsize=131072)
+def _word_slots(
+    word: str,
+    dimensions: int,
+    char_ngram_range: Tuple[int, int],
+    char_ngram_weight: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed columns and signed weights contributed by one word and its character n-grams"""
+    slots = [_feature_slot(f"w:{word}", dimensions) + (1.0,)]
+
+    padded = f"<{word}>"
+    low, high = char_ngram_range
+    for n in range(low, high + 1):
+        slots += [
+            _feature_slot(f"c:{padded[i:i + n]}", dimensions) + (char_ngram_weight,)
+            for i in range(len(padded) - n + 1)
+        ]
+
+    columns = np.array([column for column, _, _ in slots], dtype=np.int64)
+    values = np.array([sign * weight for _, sign, weight in slots], dtype=np.float32)
+    return columns, values
 
 
 class EmbeddingService:
-    """Simple mock embedding service for basic functionality"""
-    
-    def __init__(self):
-        pass
-    
-    def embed_text(self, text: str) -> List[float]:
-        """Generate a simple hash-based embedding"""
-        # Simple hash-based embedding (not real embeddings)
-        hash_val = hash(text.lower())
-        # Convert to a simple vector
-        embedding = []
-        for i in range(384):  # Standard embedding size
-            embedding.append(float((hash_val + i) % 1000) / 1000.0)
-        return embedding
-    
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a batch of texts"""
-        return [self.embed_text(text) for text in texts]
-    
-    def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
+    """
+    Dependency-free embeddings using signed feature hashing
+
+    Word unigrams, word bigrams and character n-grams are hashed into a
+    fixed-size float32 vector. The result only depends on the text, so the
+    same abstract embeds identically in every API/Celery process and across
+    restarts, and stored vectors stay comparable.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 384,
+        char_ngram_range: Tuple[int, int] = (3, 5),
+        char_ngram_weight: float = 0.5
+    ):
+        self.dimensions = dimensions
+        self.char_ngram_range = char_ngram_range
+        self.char_ngram_weight = char_ngram_weight
+        # Bump the version whenever feature extraction changes
+        self.model_name = f"feature-hash-v1-{dimensions}"
+
+    def _slots(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashed columns and signed weights of all features of a text"""
+        words = TOKEN_PATTERN.findall(text.lower())
+        columns, values = [], []
+
+        for word, count in Counter(words).items():
+            word_columns, word_values = _word_slots(
+                word, self.dimensions, self.char_ngram_range, self.char_ngram_weight
+            )
+            columns.append(word_columns)
+            values.append(word_values * count)
+
+        bigram_slots = [
+            _feature_slot(f"b:{a} {b}", self.dimensions) + (count,)
+            for (a, b), count in Counter(zip(words, words[1:])).items()
+        ]
+        if bigram_slots:
+            columns.append(np.array([column for column, _, _ in bigram_slots], dtype=np.int64))
+            values.append(np.array([sign * count for _, sign, count in bigram_slots], dtype=np.float32))
+
+        if not columns:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(columns), np.concatenate(values)
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for a batch of texts
+
+        All features of the batch are scattered into the output with a
+        single bincount.
+
+        Returns:
+            L2-normalized float32 array of shape (len(texts), dimensions)
+        """
+        flat_indexes, weights = [], []
+        for row, text in enumerate(texts):
+            columns, values = self._slots(text or "")
+            flat_indexes.append(columns + row * self.dimensions)
+            weights.append(values)
+
+        size = len(texts) * self.dimensions
+        if size == 0:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+
+        embeddings = np.bincount(
+            np.concatenate(flat_indexes),
+            weights=np.concatenate(weights),
+            minlength=size
+        ).astype(np.float32).reshape(len(texts), self.dimensions)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """Generate the embedding of a single text"""
+        return self.embed_batch([text])[0]
+
+    def cosine_similarity(self, vec1, vec2) -> float:
         """Calculate cosine similarity between two vectors"""
-        if len(vec1) != len(vec2):
+        vec1 = np.asarray(vec1, dtype=np.float32)
+        vec2 = np.asarray(vec2, dtype=np.float32)
+        if vec1.shape != vec2.shape:
             return 0.0
-        
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = math.sqrt(sum(a * a for a in vec1))
-        magnitude2 = math.sqrt(sum(a * a for a in vec2))
-        
-        if magnitude1 == 0 or magnitude2 == 0:
+
+        norm1 = np.linalg.norm(vec1)
+        norm2 = np.linalg.norm(vec2)
+        if norm1 == 0 or norm2 == 0:
             return 0.0
-        
-        return dot_product / (magnitude1 * magnitude2)
+
+        return float(np.dot(vec1, vec2) / (norm1 * norm2))
 
 
-# Singleton instance
-embedding_service = EmbeddingService()
\ No newline at end of file
+# Singleton instance, behind an in-process cache
+embedding_service = CachedEmbeddingService(EmbeddingService(), feature_hash_cache)
@@ -0,0 +1,165 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.redis_client import RedisConnection
+from app.services.rate_limiter import estimate_tokens
+from app.services.llm_pool import LLMPool, llm_pool
+import copy
+import hashlib
+import json
+import threading
+import time
+
+
+def cache_variant(project_data: Dict[str, Any]) -> Optional[int]:
+    """Variant index of a project served from the generation cache, else None"""
+    metadata = project_data.get('metadata') if isinstance(project_data, dict) else None
+    return metadata.get('cache_variant') if isinstance(metadata, dict) else None
+
+
+class GenerationCache:
+    """
+    Cache of generated projects for repeated, requirement-free requests
+
+    Keyed on the normalized (subject, semester, difficulty, language) plus
+    the prompt version and the LLM pool's models, so a prompt change or a
+    pool member with a different model starts fresh.
+    Each key holds a pool of up to GENERATION_CACHE_VARIANTS independently
+    generated projects: requests generate until the pool is full, then
+    receive the variants round-robin. Pools live in Redis (shared by all
+    workers, expiring after GENERATION_CACHE_TTL) or, without Redis, in an
+    in-process LRU of GENERATION_CACHE_MAX_KEYS pools.
+    """
+
+    def __init__(self, connection: RedisConnection = None):
+        self.connection = connection or RedisConnection()
+        self._pools: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def is_cacheable(additional_requirements: Optional[str]) -> bool:
+        return settings.GENERATION_CACHE_ENABLED and not (additional_requirements or "").strip()
+
+    @staticmethod
+    def key(
+        subject: str,
+        semester: int,
+        difficulty: str,
+        language: str,
+        prompt_version: str,
+        pool: LLMPool = None
+    ) -> str:
+        normalized = {
+            'subject': " ".join((subject or "").lower().split()),
+            'semester': int(semester),
+            'difficulty': (difficulty or "").strip().lower(),
+            'language': (language or "english").strip().lower(),
+            'prompt': prompt_version,
+            'model': (pool or llm_pool).model_version
+        }
+        digest = hashlib.sha256(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"gen:{digest}"
+
+    def _local_pool(self, key: str) -> Optional[Dict[str, Any]]:
+        pool = self._pools.get(key)
+        if pool is not None and time.monotonic() - pool['created'] > settings.GENERATION_CACHE_TTL:
+            del self._pools[key]
+            return None
+        if pool is not None:
+            self._pools.move_to_end(key)
+        return pool
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """
+        Next variant for the key, or None while the pool is still filling
+
+        Returns:
+            (deep copy of the cached project, variant index)
+        """
+        variants = settings.GENERATION_CACHE_VARIANTS
+        result = None
+
+        client = self.connection.client()
+        if client is not None:
+            try:
+                if client.llen(key) >= variants:
+                    index = (client.incr(f"{key}:turn") - 1) % variants
+                    raw = client.lindex(key, index)
+                    if raw is not None:
+                        result = (json.loads(raw), index)
+            except Exception as e:
+                self.connection.failed(e, "GenerationCache")
+
+        if result is None:
+            with self._lock:
+                pool = self._local_pool(key)
+                if pool is not None and len(pool['variants']) >= variants:
+                    index = pool['turn'] % variants
+                    pool['turn'] += 1
+                    result = (copy.deepcopy(pool['variants'][index]), index)
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.tokens_saved += result[0].get('metadata', {}).get('tokens', 0)
+        return result
+
+    def put(self, key: str, project_data: Dict[str, Any]):
+        """Add a freshly generated project to the key's pool unless it is full"""
+        entry = copy.deepcopy(project_data)
+        metadata = entry.setdefault('metadata', {})
+        for field in ('user_id', 'job_id', 'cache_variant'):
+            metadata.pop(field, None)
+        raw = json.dumps(entry, default=str)
+        metadata['tokens'] = estimate_tokens(raw)
+        raw = json.dumps(entry, default=str)
+
+        client = self.connection.client()
+        if client is not None:
+            try:
+                # Push and trim in one MULTI so concurrent workers cannot
+                # grow the pool past GENERATION_CACHE_VARIANTS
+                pipeline = client.pipeline(transaction=True)
+                pipeline.rpush(key, raw)
+                pipeline.ltrim(key, 0, settings.GENERATION_CACHE_VARIANTS - 1)
+                pipeline.expire(key, settings.GENERATION_CACHE_TTL)
+                pipeline.expire(f"{key}:turn", settings.GENERATION_CACHE_TTL)
+                length = pipeline.execute()[0]
+                if length <= settings.GENERATION_CACHE_VARIANTS:
+                    self.stores += 1
+                return
+            except Exception as e:
+                self.connection.failed(e, "GenerationCache")
+
+        with self._lock:
+            pool = self._local_pool(key)
+            if pool is None:
+                pool = {'variants': [], 'turn': 0, 'created': time.monotonic()}
+                self._pools[key] = pool
+            if len(pool['variants']) < settings.GENERATION_CACHE_VARIANTS:
+                pool['variants'].append(entry)
+                self.stores += 1
+            while len(self._pools) > settings.GENERATION_CACHE_MAX_KEYS:
+                self._pools.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': settings.GENERATION_CACHE_ENABLED,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'tokens_saved': self.tokens_saved,
+            'local_pools': len(self._pools)
+        }
+
+
+# Singleton instance
+generation_cache = GenerationCache()
@@ -1,16 +1,52 @@
 import httpx
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from app.core.config import settings
+from app.services.http_client import http_client_pool
+from app.services.json_stream import IncrementalJSONParser
+from app.services.retry_policy import RetryPolicy
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.rate_limiter import estimate_tokens
+from app.services.llm_pool import llm_pool, PoolMember
+import asyncio
+import hashlib
 import json
+import time
+
+
+# Fan-out generation (GROQ_GENERATION_MODE=fanout): the outline is generated
+# first, then each group of heavy sections in its own concurrent call
+OUTLINE_SECTIONS = (
+    "title", "abstract", "keywords", "introduction", "objectives", "scope",
+    "modules", "technology_stack", "difficulty", "timeline_days", "estimated_loc", "team_size"
+)
+SECTION_GROUPS = (
+    ("literature_survey", "references"),
+    ("system_study", "methodology"),
+    ("system_design", "database_design"),
+    ("implementation", "system_requirements", "project_structure"),
+    ("code_samples",),
+    ("testing", "screenshots"),
+    ("viva_questions",),
+    ("conclusion", "future_scope", "rubric", "ppt_slides"),
+)
 
 
 class GroqClient:
     """Client for Groq API - Using Llama 3.3 70B Versatile model"""
     
     def __init__(self):
-        self.api_url = settings.GROQ_API_URL
-        self.api_key = settings.GROQ_API_KEY
-        self.model = settings.GROQ_MODEL
+        # Requests are routed across the pool; these describe its primary member
+        self.pool = llm_pool
+        self.api_url = self.pool.primary.api_url
+        self.api_key = self.pool.primary.api_key
+        self.model = self.pool.primary.model
+        self.retry_policy = RetryPolicy(
+            max_attempts=settings.GROQ_MAX_ATTEMPTS,
+            base_delay=settings.GROQ_RETRY_BASE_DELAY,
+            max_delay=settings.GROQ_RETRY_MAX_DELAY,
+            deadline=settings.GROQ_RETRY_DEADLINE,
+            name="Groq"
+        )
         
         # System message as per requirements
         self.system_message = """You are ProjectGen — an expert AI assistant specialized in generating comprehensive, professional-grade semester projects for Indian diploma and engineering students following GTU (Gujarat Technological University), VTU (Visvesvaraya Technological University), AICTE, MAKAUT, and Government Polytechnic college standards.
@@ -423,12 +459,19 @@ Return ONLY the JSON object. No additional text, explanations, or markdown forma
 The 'title' field is MANDATORY and must always be present!
 """
     
+    @property
+    def prompt_version(self) -> str:
+        """Changes whenever the system prompt or generation mode changes (cache keys)"""
+        fingerprint = f"{settings.GROQ_GENERATION_MODE}\n{self.system_message}"
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:16]
+    
     async def generate_project(
         self,
         user_prompt: str,
         rag_context: Optional[List[Dict[str, Any]]] = None,
         user_id: str = "",
-        job_id: str = ""
+        job_id: str = "",
+        on_section: Optional[Callable[[str, Any], None]] = None
     ) -> Dict[str, Any]:
         """
         Generate project JSON using Groq Llama 3.3 70B Versatile
@@ -438,6 +481,9 @@ The 'title' field is MANDATORY and must always be present!
             rag_context: Retrieved RAG passages with scores
             user_id: User identifier
             job_id: Job identifier
+            on_section: Called with (name, value) for each top-level section,
+                as soon as it has streamed in with GROQ_STREAMING, otherwise
+                once the complete response is parsed
             
         Returns:
             Structured project JSON
@@ -456,110 +502,265 @@ The 'title' field is MANDATORY and must always be present!
                     "score": ctx.get('score', 0)
                 })
         
-        # Construct full prompt
-        full_prompt = f"""{context_text}
+        if settings.GROQ_GENERATION_MODE == "fanout":
+            project_data, created = await self._generate_fanout(context_text, user_prompt, on_section)
+        else:
+            # Construct full prompt
+            full_prompt = f"""{context_text}
 
 === USER REQUEST ===
 {user_prompt}
 
 Generate a complete project following the exact JSON schema. Include all required fields."""
+            
+            project_data, created = await self._request_json(full_prompt, on_section=on_section)
+        
+        # Add metadata
+        if "metadata" not in project_data:
+            project_data["metadata"] = {}
+        
+        project_data["metadata"]["user_id"] = user_id
+        project_data["metadata"]["job_id"] = job_id
+        project_data["metadata"]["generated_at"] = created
+        
+        # Add sources from RAG
+        if sources and "sources" not in project_data:
+            project_data["sources"] = sources
+        
+        print(f"[Groq] Successfully generated project: {project_data.get('title', 'Untitled')}")
+        return project_data
+    
+    async def _generate_fanout(
+        self,
+        context_text: str,
+        user_prompt: str,
+        on_section: Optional[Callable[[str, Any], None]] = None
+    ) -> Tuple[Dict[str, Any], Any]:
+        """
+        Generate the project as an outline call followed by concurrent section calls
+        
+        The outline (OUTLINE_SECTIONS) is generated first; every group in
+        SECTION_GROUPS is then generated from the outline in its own call, at
+        most GROQ_FANOUT_CONCURRENCY at a time. Each call gets a full token
+        budget, so long sections are not truncated, and latency follows the
+        slowest group rather than the sum of all sections.
+        
+        Returns:
+            (merged project JSON, created timestamp of the outline)
+        """
+        started = time.perf_counter()
+        outline_prompt = f"""{context_text}
+
+=== USER REQUEST ===
+{user_prompt}
+
+This is step 1 of a multi-step generation. Return ONLY a JSON object with these keys of the schema: {", ".join(OUTLINE_SECTIONS)}."""
+        
+        outline, created = await self._request_json(
+            outline_prompt,
+            max_tokens=settings.GROQ_SECTION_MAX_TOKENS,
+            on_section=on_section,
+            keys=OUTLINE_SECTIONS
+        )
+        if not outline.get("title"):
+            raise Exception("Invalid outline from Groq: missing title")
+        outline_ms = (time.perf_counter() - started) * 1000
+        
+        semaphore = asyncio.Semaphore(max(1, settings.GROQ_FANOUT_CONCURRENCY))
+        outline_json = json.dumps(outline, ensure_ascii=False)
+        
+        async def generate_group(keys: Tuple[str, ...]) -> Tuple[Dict[str, Any], float]:
+            async with semaphore:
+                group_started = time.perf_counter()
+                prompt = f"""{context_text}
+
+=== USER REQUEST ===
+{user_prompt}
+
+=== PROJECT OUTLINE (already generated) ===
+{outline_json}
+
+Continue this exact project. Return ONLY a JSON object with these keys of the schema: {", ".join(keys)}. Keep them consistent with the outline's title, modules and technology stack."""
+                sections, _ = await self._request_json(
+                    prompt,
+                    max_tokens=settings.GROQ_SECTION_MAX_TOKENS,
+                    on_section=on_section,
+                    keys=keys
+                )
+                return sections, (time.perf_counter() - group_started) * 1000
         
-        # Prepare API request
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+        results = await asyncio.gather(*(generate_group(keys) for keys in SECTION_GROUPS))
+        
+        project_data = dict(outline)
+        group_ms = {}
+        for keys, (sections, elapsed) in zip(SECTION_GROUPS, results):
+            project_data.update(sections)
+            group_ms["+".join(keys)] = round(elapsed, 2)
+        
+        project_data["metadata"] = {
+            "generation": {
+                "mode": "fanout",
+                "outline_ms": round(outline_ms, 2),
+                "sections_ms": group_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
         }
+        print(f"[Groq] Fan-out generation timings: {project_data['metadata']['generation']}")
+        return project_data, created
+    
+    async def _request_json(
+        self,
+        user_content: str,
+        max_tokens: int = 4000,
+        on_section: Optional[Callable[[str, Any], None]] = None,
+        keys: Optional[Tuple[str, ...]] = None
+    ) -> Tuple[Dict[str, Any], Any]:
+        """
+        One JSON-mode chat completion, with retries
         
+        Args:
+            user_content: User message (the system message is always the schema)
+            max_tokens: Completion token budget
+            on_section: Streaming callback, see generate_project
+            keys: Top-level keys to keep; anything else the model returns is dropped
+            
+        Returns:
+            (parsed JSON object, created timestamp)
+        """
         payload = {
-            "model": self.model,
             "messages": [
                 {"role": "system", "content": self.system_message},
-                {"role": "user", "content": full_prompt}
+                {"role": "user", "content": user_content}
             ],
             "temperature": 0.7,
-            "max_tokens": 4000,
+            "max_tokens": max_tokens,
             "response_format": {"type": "json_object"}  # Force JSON mode
         }
         
-        # Make API call with retries
-        max_retries = 3
-        last_error = None
+        if on_section is not None:
+            requested_callback = on_section
+            published: Dict[str, Any] = {}
+            
+            def on_section(name: str, value: Any):
+                # A retried attempt streams every section again; only pass on
+                # sections that are new or differ from what was published
+                if keys is not None and name not in keys:
+                    return
+                if name in published and published[name] == value:
+                    return
+                published[name] = value
+                requested_callback(name, value)
+        
+        prompt_tokens = estimate_tokens(self.system_message + user_content)
         
-        for attempt in range(max_retries):
-            try:
-                # Configure httpx with better network settings
-                transport = httpx.AsyncHTTPTransport(retries=2)
-                async with httpx.AsyncClient(
-                    timeout=httpx.Timeout(120.0, connect=30.0),
-                    transport=transport,
-                    trust_env=True,  # Use system proxy settings
-                    follow_redirects=True
-                ) as client:
-                    print(f"[Groq] Attempt {attempt + 1}: Calling API at {self.api_url}")
-                    
+        async def attempt(number: int) -> Tuple[Dict[str, Any], Any]:
+            async def send(member: PoolMember) -> Tuple[Tuple[str, Any], int]:
+                headers = {
+                    "Authorization": f"Bearer {member.api_key}",
+                    "Content-Type": "application/json"
+                }
+                body = {"model": member.model, **payload}
+                
+                # Shared keep-alive client; connections are reused across attempts and jobs
+                client = http_client_pool.get()
+                print(f"[Groq] Attempt {number}: Calling {member.name} at {member.api_url}")
+                
+                if on_section is not None and settings.GROQ_STREAMING:
+                    content, created = await self._stream_content(client, member.api_url, headers, body, on_section)
+                else:
                     response = await client.post(
-                        self.api_url,
+                        member.api_url,
                         headers=headers,
-                        json=payload
+                        json=body
                     )
                     response.raise_for_status()
                     
                     result = response.json()
                     content = result["choices"][0]["message"]["content"]
-                    
-                    # Parse JSON response
-                    project_data = json.loads(content)
-                    
-                    # Add metadata
-                    if "metadata" not in project_data:
-                        project_data["metadata"] = {}
-                    
-                    project_data["metadata"]["user_id"] = user_id
-                    project_data["metadata"]["job_id"] = job_id
-                    project_data["metadata"]["generated_at"] = result.get("created", "")
-                    
-                    # Add sources from RAG
-                    if sources and "sources" not in project_data:
-                        project_data["sources"] = sources
-                    
-                    print(f"[Groq] Successfully generated project: {project_data.get('title', 'Untitled')}")
-                    return project_data
-                    
-            except httpx.ConnectError as e:
-                last_error = f"Connection failed - could not reach Groq API. Check internet connection and firewall settings. Error: {str(e)}"
-                print(f"[Groq] Connection error on attempt {attempt + 1}: {last_error}")
-                if attempt < max_retries - 1:
-                    import asyncio
-                    await asyncio.sleep(2)  # Wait before retry
-                continue
-                
-            except httpx.TimeoutException as e:
-                last_error = f"Request timed out. The API took too long to respond. Error: {str(e)}"
-                print(f"[Groq] Timeout on attempt {attempt + 1}: {last_error}")
-                continue
-                    
-            except httpx.HTTPStatusError as e:
-                last_error = f"Groq API error: {e.response.status_code} - {e.response.text}"
-                print(f"[Groq] HTTP error on attempt {attempt + 1}: {last_error}")
-                if attempt == max_retries - 1:
-                    raise Exception(last_error)
-                continue
+                    created = result.get("created", "")
+                return (content, created), estimate_tokens(content)
+            
+            # Least-loaded available member, failing over to the others
+            content, created = await self.pool.call(send, prompt_tokens, max_tokens)
+            
+            # Parse JSON response
+            data = json.loads(content)
+            if keys is not None:
+                data = {key: value for key, value in data.items() if key in keys}
+            return data, created
+        
+        try:
+            data, created = await self.retry_policy.run(attempt)
+        except Exception as e:
+            raise Exception(self._describe_error(e)) from e
+        
+        # Without streaming nothing has been published yet; after a stream
+        # this only passes on sections the stream did not deliver intact
+        if on_section is not None:
+            for name, value in data.items():
+                on_section(name, value)
+        return data, created
+    
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        """User-facing message for the error that ended a generation call"""
+        if isinstance(error, CircuitOpenError):
+            return f"AI service is temporarily unavailable. Please retry in {error.retry_after:.0f} seconds."
+        if isinstance(error, httpx.ConnectError):
+            return f"Connection failed - could not reach Groq API. Check internet connection and firewall settings. Error: {str(error)}"
+        if isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError)):
+            return f"Request timed out. The API took too long to respond. Error: {str(error)}"
+        if isinstance(error, httpx.HTTPStatusError):
+            return f"Groq API error: {error.response.status_code} - {error.response.text}"
+        if isinstance(error, json.JSONDecodeError):
+            return f"Invalid JSON response from Groq: {str(error)}"
+        return f"Groq API call failed: {str(error)}"
+    
+    async def _stream_content(
+        self,
+        client: httpx.AsyncClient,
+        api_url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        on_section: Callable[[str, Any], None]
+    ) -> Tuple[str, Any]:
+        """
+        Consume a streamed (SSE) completion
+        
+        Content deltas are fed to an incremental JSON parser, and every
+        top-level section is handed to on_section the moment it closes.
+        
+        Returns:
+            (complete content, created timestamp)
+        """
+        parser = IncrementalJSONParser()
+        parts = []
+        created = ""
+        
+        async with client.stream("POST", api_url, headers=headers, json={**payload, "stream": True}) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
                 
-            except json.JSONDecodeError as e:
-                last_error = f"Invalid JSON response from Groq: {str(e)}"
-                print(f"[Groq] JSON error on attempt {attempt + 1}: {last_error}")
-                if attempt == max_retries - 1:
-                    raise Exception(last_error)
-                continue
+                chunk = json.loads(data)
+                created = chunk.get("created", created)
+                choices = chunk.get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if not delta:
+                    continue
                 
-            except Exception as e:
-                last_error = f"Groq API call failed: {str(e)}"
-                print(f"[Groq] Error on attempt {attempt + 1}: {last_error}")
-                if attempt == max_retries - 1:
-                    raise Exception(last_error)
-                continue
+                parts.append(delta)
+                for name, value in parser.feed(delta):
+                    on_section(name, value)
         
-        raise Exception(f"Failed to generate project after {max_retries} retries. Last error: {last_error}")
+        return "".join(parts), created
 
 
 # Singleton instance
@@ -0,0 +1,109 @@
+from typing import Dict, Any, Optional
+from app.core.config import settings
+import asyncio
+import threading
+import weakref
+import httpx
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport that counts requests served on new vs kept-alive connections"""
+
+    def __init__(self, stats: Dict[str, int], **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        connected = False
+        previous_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            nonlocal connected
+            if event_name == "connection.connect_tcp.complete":
+                connected = True
+            if previous_trace is not None:
+                await previous_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        response = await super().handle_async_request(request)
+
+        self.stats['requests'] += 1
+        self.stats['new_connections' if connected else 'reused_connections'] += 1
+        return response
+
+
+class HTTPClientPool:
+    """
+    Long-lived httpx clients with keep-alive connection pooling
+
+    An AsyncClient is bound to the event loop it is used on, so there is one
+    client per loop: the API's loop, and the per-thread loops Celery tasks and
+    background jobs run on (app.core.event_loop.run_sync). Clients are
+    created on startup or on first use and closed on shutdown.
+    """
+
+    def __init__(self):
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'requests': 0, 'new_connections': 0, 'reused_connections': 0, 'clients_created': 0}
+        self.http2 = settings.GROQ_HTTP2
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("[HTTP] h2 not installed, using HTTP/1.1 keep-alive")
+                self.http2 = False
+
+    def _create(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY
+        )
+        transport = CountingTransport(
+            self.stats,
+            http2=self.http2,
+            limits=limits,
+            retries=2,
+            trust_env=True  # Use system proxy settings
+        )
+        self.stats['clients_created'] += 1
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=30.0),
+            transport=transport,
+            follow_redirects=True
+        )
+
+    def get(self) -> httpx.AsyncClient:
+        """Pooled client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = self._create()
+                self._clients[loop] = client
+            return client
+
+    async def startup(self):
+        self.get()
+
+    async def aclose(self):
+        """Close the client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client: Optional[httpx.AsyncClient] = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def metrics(self) -> Dict[str, Any]:
+        reused = self.stats['reused_connections']
+        return {
+            **self.stats,
+            'open_clients': len(self._clients),
+            'http2': self.http2,
+            'reuse_ratio': round(reused / self.stats['requests'], 4) if self.stats['requests'] else 0.0
+        }
+
+
+# Singleton instance
+http_client_pool = HTTPClientPool()
@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Tuple
+import json
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a streamed top-level JSON object
+
+    feed() accepts arbitrary chunks of the text and returns the top-level
+    members ((key, value) pairs) completed by that chunk, so a member is
+    available as soon as its closing comma or brace arrives. Only string,
+    escape and nesting state is tracked per character; each member is
+    decoded with json once it is complete, and consumed text is dropped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0  # Next character of the buffer to scan
+        self._member_start = None  # Buffer index where the current member starts
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.done = False
+        self.result: Dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        completed = []
+        self._buffer += chunk
+        buffer = self._buffer
+        i = self._position
+
+        while i < len(buffer) and not self.done:
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed += self._finish_member(buffer, i)
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                completed += self._finish_member(buffer, i)
+                self._member_start = i + 1
+            i += 1
+
+        # Drop text that belongs to members already decoded
+        if self._member_start is not None and self._member_start > 0:
+            self._buffer = buffer[self._member_start:]
+            i -= self._member_start
+            self._member_start = 0
+        self._position = i
+        return completed
+
+    def _finish_member(self, buffer: str, end: int) -> List[Tuple[str, Any]]:
+        text = buffer[self._member_start:end].strip()
+        if not text:
+            return []
+        member = json.loads("{" + text + "}")
+        self.result.update(member)
+        return list(member.items())
@@ -0,0 +1,303 @@
+from typing import Dict, Any, List, Optional, Awaitable, Callable, Tuple, TypeVar
+from collections import Counter, deque
+from app.core.config import settings
+from app.services.retry_policy import classify
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN, llm_breaker, shared_open_until
+from app.services.rate_limiter import TokenBucketLimiter, groq_rate_limiter
+import asyncio
+import json
+import threading
+import time
+import httpx
+
+
+T = TypeVar("T")
+
+# Reasons (see retry_policy.classify) that mean the member itself is unusable
+# right now: they count against its circuit breaker
+MEMBER_FAILURES = ("timeout", "connect_error", "connection_dropped", "http_401", "http_403")
+
+
+def is_member_failure(error: BaseException) -> bool:
+    """Errors that count against a member's circuit breaker (not throttling or bad requests)"""
+    if isinstance(error, asyncio.CancelledError):
+        return True  # cut off by the retry deadline: the call hung
+    retryable, reason = classify(error)
+    return reason in MEMBER_FAILURES or reason.startswith("http_5")
+
+
+def should_fail_over(error: BaseException) -> bool:
+    """Errors another member may not have (outages, throttling, a rejected key)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status in (401, 403, 429) or status >= 500
+    return is_member_failure(error)
+
+
+class PoolMember:
+    """One OpenAI-compatible endpoint and key, with its own quota and breaker"""
+
+    def __init__(
+        self,
+        name: str,
+        api_url: str,
+        api_key: str,
+        model: str,
+        weight: float = 1.0,
+        limiter: TokenBucketLimiter = None,
+        breaker: CircuitBreaker = None
+    ):
+        self.name = name
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.weight = max(0.01, float(weight))
+        self.limiter = limiter or TokenBucketLimiter(f"llm:{name}", settings.GROQ_RPM_LIMIT, settings.GROQ_TPM_LIMIT)
+        self.breaker = breaker or CircuitBreaker(
+            f"llm:{name}",
+            window=settings.LLM_BREAKER_WINDOW,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            error_rate=settings.LLM_BREAKER_ERROR_RATE,
+            slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate=settings.LLM_BREAKER_SLOW_CALL_RATE,
+            open_seconds=settings.LLM_BREAKER_OPEN_SECONDS
+        )
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.errors: Counter = Counter()
+        self.latency_ewma_ms = 0.0
+        self.latencies_ms: deque = deque(maxlen=200)
+        self.last_error = ""
+
+    def load(self) -> float:
+        """Weighted load if one more request were sent here"""
+        return (self.in_flight + 1) / self.weight
+
+    def available(self, shared_until: Optional[float] = None) -> bool:
+        return not settings.LLM_BREAKER_ENABLED or self.breaker.state(shared_until) != OPEN
+
+    def record_success(self, duration: float):
+        latency_ms = duration * 1000
+        self.successes += 1
+        self.latencies_ms.append(latency_ms)
+        self.latency_ewma_ms = latency_ms if self.successes == 1 else 0.8 * self.latency_ewma_ms + 0.2 * latency_ms
+
+    def record_error(self, error: BaseException):
+        retryable, reason = classify(error) if isinstance(error, Exception) else (False, type(error).__name__)
+        self.errors[reason] += 1
+        self.last_error = f"{reason}: {error}"[:200]
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+
+        def percentile(fraction: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 2) if latencies else 0.0
+
+        errors = sum(self.errors.values())
+        return {
+            'api_url': self.api_url,
+            'model': self.model,
+            'weight': self.weight,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'successes': self.successes,
+            'errors': dict(self.errors),
+            'error_rate': round(errors / self.requests, 4) if self.requests else 0.0,
+            'latency_ewma_ms': round(self.latency_ewma_ms, 2),
+            'latency_p50_ms': percentile(0.5),
+            'latency_p95_ms': percentile(0.95),
+            'last_error': self.last_error,
+            'rate_limit': self.limiter.stats(),
+            'breaker': self.breaker.stats()
+        }
+
+
+class LLMPool:
+    """
+    Pool of OpenAI-compatible endpoints/keys with least-loaded routing
+
+    Each request goes to the available member (circuit not open) with the
+    lowest weighted load, (in_flight + 1) / weight, ties going to the lower
+    latency. Before sending, the member's rate limiter is charged and its
+    breaker consulted; an outage, throttling or a rejected key fails the
+    request over to the next member at once, and only when every member
+    has failed is the last error raised (for RetryPolicy to back off).
+
+    Members come from LLM_POOL_MEMBERS; without it the pool is the single
+    GROQ_* endpoint, using the existing Groq limiter and LLM breaker.
+    """
+
+    def __init__(self, members: List[PoolMember], name: str = "llm"):
+        if not members:
+            raise ValueError("LLM pool needs at least one member")
+        names = [member.name for member in members]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            # Failover tracks members by name and their Redis keys are llm:<name>
+            raise ValueError(f"Duplicate LLM pool member names: {', '.join(duplicates)}")
+        self.members = members
+        self.name = name
+        self.failovers = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "LLMPool":
+        specs = json.loads(settings.LLM_POOL_MEMBERS) if settings.LLM_POOL_MEMBERS.strip() else []
+        if not specs:
+            return cls([PoolMember(
+                "groq",
+                settings.GROQ_API_URL,
+                settings.GROQ_API_KEY,
+                settings.GROQ_MODEL,
+                limiter=groq_rate_limiter,
+                breaker=llm_breaker
+            )])
+
+        members = []
+        for index, spec in enumerate(specs):
+            name = spec.get('name') or f"member{index + 1}"
+            url = spec.get('url', settings.GROQ_API_URL)
+            key = spec.get('key')
+            if not key:
+                # Never send the Groq key to another endpoint
+                if url != settings.GROQ_API_URL:
+                    raise ValueError(f"LLM pool member {name} sets its own url, so it needs its own key")
+                key = settings.GROQ_API_KEY
+            members.append(PoolMember(
+                name,
+                url,
+                key,
+                spec.get('model', settings.GROQ_MODEL),
+                weight=spec.get('weight', 1.0),
+                limiter=TokenBucketLimiter(
+                    f"llm:{name}",
+                    int(spec.get('rpm', settings.GROQ_RPM_LIMIT)),
+                    int(spec.get('tpm', settings.GROQ_TPM_LIMIT))
+                )
+            ))
+        print(f"[LLMPool] {len(members)} members: {', '.join(member.name for member in members)}")
+        return cls(members)
+
+    @property
+    def primary(self) -> PoolMember:
+        return self.members[0]
+
+    @property
+    def model_version(self) -> str:
+        """The members' models, so a cache keyed on it changes with the pool's models"""
+        return ",".join(sorted({member.model for member in self.members}))
+
+    def _shared_states(self) -> Dict[str, float]:
+        """Every member's shared breaker opening, read with one MGET (blocking)"""
+        if not settings.LLM_BREAKER_ENABLED:
+            return {}
+        values = shared_open_until([member.breaker for member in self.members])
+        return {member.name: value for member, value in zip(self.members, values)}
+
+    def _pick(self, tried: set, shared: Dict[str, float]) -> Optional[PoolMember]:
+        candidates = [
+            member for member in self.members
+            if member.name not in tried and member.available(shared.get(member.name))
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda member: (member.load(), member.latency_ewma_ms))
+
+    def is_open(self) -> bool:
+        """True while no member can take a request (every circuit open); blocking"""
+        shared = self._shared_states()
+        return settings.LLM_BREAKER_ENABLED and not any(
+            member.available(shared.get(member.name)) for member in self.members
+        )
+
+    def retry_after(self) -> float:
+        """Seconds until the first member lets a trial call through"""
+        return min(member.breaker.retry_after() for member in self.members)
+
+    async def call(
+        self,
+        send: Callable[[PoolMember], Awaitable[Tuple[T, int]]],
+        prompt_tokens: int,
+        max_tokens: int
+    ) -> T:
+        """
+        Send one request, failing over between members
+
+        Args:
+            send: Performs the request against a member; returns
+                (result, completion tokens used)
+            prompt_tokens: Estimated prompt size, charged to the member's quota
+            max_tokens: Completion budget, reserved and partly refunded
+
+        Raises:
+            The last member's error, or CircuitOpenError if no member was available
+        """
+        tried: set = set()
+        last_error: Optional[Exception] = None
+        # Breaker states shared through Redis, read once per call off the event loop
+        shared = await asyncio.to_thread(self._shared_states)
+
+        while True:
+            member = self._pick(tried, shared)
+            if member is None:
+                break
+            tried.add(member.name)
+
+            if settings.LLM_BREAKER_ENABLED:
+                try:
+                    member.breaker.before_call(shared.get(member.name))
+                except CircuitOpenError:
+                    continue  # half-open with its trial call already running
+
+            # Reserve the worst case (full completion budget), refund what was not used
+            try:
+                await member.limiter.acquire(prompt_tokens + max_tokens)
+            except BaseException:
+                if settings.LLM_BREAKER_ENABLED:
+                    member.breaker.release()
+                raise
+
+            with self._lock:
+                member.in_flight += 1
+                member.requests += 1
+            completion_tokens = 0
+            failed = False
+            started = time.perf_counter()
+            try:
+                result, completion_tokens = await send(member)
+            except BaseException as e:
+                failed = is_member_failure(e)
+                member.record_error(e)
+                if not isinstance(e, Exception) or not should_fail_over(e):
+                    raise
+                last_error = e
+                if len(tried) < len(self.members):
+                    self.failovers += 1
+                    print(f"[LLMPool] {member.name} failed ({type(e).__name__}), failing over")
+                continue
+            finally:
+                duration = time.perf_counter() - started
+                with self._lock:
+                    member.in_flight -= 1
+                if settings.LLM_BREAKER_ENABLED:
+                    member.breaker.record(failed, duration)
+                await asyncio.to_thread(member.limiter.refund, max_tokens - completion_tokens)
+
+            member.record_success(duration)
+            return result
+
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(self.name, self.retry_after())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'open': self.is_open(),
+            'failovers': self.failovers,
+            'members': {member.name: member.stats() for member in self.members}
+        }
+
+
+# Pool built from LLM_POOL_MEMBERS (or the single GROQ_* endpoint)
+llm_pool = LLMPool.from_settings()
@@ -0,0 +1,132 @@
+from typing import Dict, List, Hashable, Iterable, Set
+import numpy as np
+import re
+import zlib
+
+
+MERSENNE_PRIME = (1 << 31) - 1
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles
+
+    The Jaccard similarity of two texts' shingle sets is estimated by the
+    fraction of equal signature positions.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.version = f"minhash-v1-{num_perm}x{shingle_size}"
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct 31-bit hashes of the word n-grams of a text"""
+        words = TOKEN_PATTERN.findall(text.lower())
+        size = min(self.shingle_size, len(words))
+        if size == 0:
+            return np.zeros(0, dtype=np.uint64)
+
+        grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = [zlib.crc32(gram.encode('utf-8')) & MERSENNE_PRIME for gram in grams]
+        return np.array(hashes, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text
+
+        Returns:
+            uint32 array of length num_perm (empty if the text has no words)
+        """
+        shingles = self.shingles(text)
+        if shingles.size == 0:
+            return np.zeros(0, dtype=np.uint32)
+
+        # (a * x + b) mod p for every permutation/shingle pair; a * x < 2^62 fits in uint64
+        hashed = (np.outer(self._a, shingles) + self._b[:, None]) % MERSENNE_PRIME
+        return hashed.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def jaccard(signature1: np.ndarray, signature2: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        if signature1.size == 0 or signature1.shape != signature2.shape:
+            return 0.0
+        return float(np.mean(signature1 == signature2))
+
+
+class LSHIndex:
+    """
+    Banded locality-sensitive hashing over MinHash signatures
+
+    Signatures are split into `bands` bands of num_perm / bands rows. Two
+    items become candidates when any band matches exactly, so lookups cost
+    one dict probe per band instead of a scan. With 128 permutations and
+    32 bands, pairs above roughly 0.4 Jaccard are very likely to collide.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.signatures: Dict[Hashable, np.ndarray] = {}
+        self._buckets: Dict[tuple, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[tuple]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def insert(self, key: Hashable, signature: np.ndarray):
+        """Add or replace the signature stored under key"""
+        if signature.size != self.num_perm:
+            return
+        if key in self.signatures:
+            self.remove(key)
+
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def candidates(self, signature: np.ndarray) -> Set[Hashable]:
+        """Keys sharing at least one band with the signature"""
+        if signature.size != self.num_perm:
+            return set()
+
+        found: Set[Hashable] = set()
+        for band_key in self._band_keys(signature):
+            found |= self._buckets.get(band_key, set())
+        return found
+
+    def query(self, signature: np.ndarray, top_k: int = 5) -> List[tuple]:
+        """
+        Candidates ranked by estimated Jaccard similarity
+
+        Returns:
+            (key, jaccard) tuples, best first
+        """
+        scored = [
+            (key, MinHasher.jaccard(signature, self.signatures[key]))
+            for key in self.candidates(signature)
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:top_k]
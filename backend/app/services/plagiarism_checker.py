@@ -1,78 +1,681 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
 from app.services.embeddings_simple import embedding_service
+from app.services.ann_index import create_index
+from app.services.minhash_lsh import MinHasher, LSHIndex
+from app.services.code_fingerprint import CodeFingerprinter
+from app.services.generation_cache import cache_variant
+from app.core.config import settings
+from app.core.database import iter_keyset
+from app.core.metrics import current_rss_mb, peak_rss_mb
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import numpy as np
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+
+# Long-form sections compared chapter by chapter with MinHash
+SIGNED_SECTIONS = ("introduction", "system_study", "methodology", "conclusion")
+
+# Fingerprint columns a check can be scoped by
+PARTITION_FIELDS = ("college_id", "subject", "semester")
+
+# (field, value) pairs identifying a partition; () is the global index
+Partition = Tuple[Tuple[str, Any], ...]
 
 
 class PlagiarismChecker:
     """Basic plagiarism detection using embeddings"""
-    
+
+    def __init__(self):
+        # One ANN index per (embedding model, partition), refreshed incrementally
+        self._indexes: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._watermarks: Dict[tuple, datetime] = {}
+        self._last_saved: Dict[str, float] = {}
+        # Fingerprints updated since this time are checked for partition moves
+        self._moves_watermark = datetime.utcnow()
+
+        # One LSH index per section, refreshed incrementally
+        self.minhasher = MinHasher()
+        self._section_indexes: Dict[str, LSHIndex] = {}
+        self._section_titles: Dict[str, Optional[str]] = {}
+        self._section_watermark: Optional[datetime] = None
+
+        self.code_fingerprinter = CodeFingerprinter()
+        self._lock = threading.RLock()
+
+    def _index_path(self, embedding_model: str) -> str:
+        safe_model = re.sub(r'[^\w.-]', '_', embedding_model)
+        return os.path.join(
+            settings.PLAGIARISM_INDEX_DIR,
+            f"{safe_model}.{settings.PLAGIARISM_INDEX_BACKEND}.npz"
+        )
+
+    def _new_index(self):
+        return create_index(
+            settings.PLAGIARISM_INDEX_BACKEND,
+            nprobe=settings.PLAGIARISM_INDEX_NPROBE,
+            n_lists=settings.PLAGIARISM_INDEX_LISTS,
+            ef_search=settings.PLAGIARISM_INDEX_EF_SEARCH,
+            quantization=settings.PLAGIARISM_INDEX_QUANTIZATION,
+            rescore_factor=settings.PLAGIARISM_INDEX_RESCORE_FACTOR
+        )
+
+    def _exact_embeddings(self, db: Session, project_ids: List[str], dimensions: int) -> np.ndarray:
+        """
+        Stored float32 embeddings used to re-score quantized index hits
+
+        Ids without a stored row (deleted since indexing) get a zero vector,
+        so they score 0 instead of failing the check.
+        """
+        from app.models.project_fingerprint import ProjectFingerprint
+
+        if not project_ids:
+            return np.zeros((0, dimensions), dtype=np.float32)
+
+        rows = db.query(ProjectFingerprint.project_id, ProjectFingerprint.embedding).filter(
+            ProjectFingerprint.project_id.in_(project_ids)
+        ).all()
+        stored = {row.project_id: np.frombuffer(row.embedding, dtype=np.float32) for row in rows}
+
+        return np.stack([
+            stored.get(project_id, np.zeros(dimensions, dtype=np.float32))
+            for project_id in project_ids
+        ])
+
+    def _get_index(self, embedding_model: str, partition: Partition = ()):
+        """
+        Return the in-memory index for a model and partition
+
+        The global index is loaded from its snapshot if present. Partition
+        indexes are built from the database on first use and the least
+        recently used ones are dropped beyond PLAGIARISM_MAX_PARTITIONS.
+        """
+        key = (embedding_model, partition)
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+            return index
+
+        index = self._new_index()
+
+        path = self._index_path(embedding_model)
+        if not partition and os.path.exists(path):
+            try:
+                metadata = index.load(path)
+                if metadata.get('watermark'):
+                    self._watermarks[key] = datetime.fromisoformat(metadata['watermark'])
+                print(f"[Plagiarism] Loaded {len(index)} vectors from {path}")
+            except Exception as e:
+                print(f"[Plagiarism] Could not load index snapshot {path}: {e}")
+                index = self._new_index()
+                self._watermarks.pop(key, None)
+
+        self._indexes[key] = index
+        if not partition:
+            self._last_saved[embedding_model] = time.monotonic()
+
+        partitions = [k for k in self._indexes if k[1]]
+        for evicted in partitions[:max(len(partitions) - settings.PLAGIARISM_MAX_PARTITIONS, 0)]:
+            del self._indexes[evicted]
+            self._watermarks.pop(evicted, None)
+
+        return index
+
+    @staticmethod
+    def _normalize_subject(subject: Optional[str]) -> Optional[str]:
+        """Partition value of a subject (matches lower(trim(subject)) in SQL)"""
+        if subject is None:
+            return None
+        return subject.strip().lower() or None
+
+    def scope_for(self, project) -> Dict[str, Any]:
+        """Partition fields of a project and its owner"""
+        return {
+            'college_id': project.user.college_id if project.user else None,
+            'subject': self._normalize_subject(project.subject),
+            'semester': project.semester
+        }
+
+    def _partition_key(self, scope: Optional[Dict[str, Any]]) -> Partition:
+        """Partition of a scope, using the fields in PLAGIARISM_PARTITION_KEYS that are set"""
+        if not scope:
+            return ()
+
+        fields = [field.strip() for field in settings.PLAGIARISM_PARTITION_KEYS.split(',')]
+        partition = []
+        for field in PARTITION_FIELDS:
+            value = scope.get(field)
+            if field == 'subject':
+                value = self._normalize_subject(value)
+            if field in fields and value is not None:
+                partition.append((field, value))
+        return tuple(partition)
+
+    def save_index(self, embedding_model: str):
+        """Snapshot an index to disk so restarts only replay newer fingerprints"""
+        index = self._indexes.get((embedding_model, ()))
+        if index is None or len(index) == 0:
+            return
+
+        watermark = self._watermarks.get((embedding_model, ()))
+        index.save(
+            self._index_path(embedding_model),
+            metadata={'watermark': watermark.isoformat() if watermark else None}
+        )
+        self._last_saved[embedding_model] = time.monotonic()
+
+    def refresh_and_save(self, db: Session):
+        """Bring the current model's index up to date and snapshot it"""
+        with self._lock:
+            self._refresh_index(db, embedding_service.model_name)
+            self.save_index(embedding_service.model_name)
+
+    def _refresh_index(self, db: Session, embedding_model: str, partition: Partition = ()) -> int:
+        """
+        Insert fingerprints stored since the last refresh into an index
+
+        Completed projects reach the index here: their fingerprint is newer
+        than the watermark, so each check only reads the rows it has not seen.
+        updated_at is set at flush time but the row only becomes visible when
+        the job commits, possibly after the watermark has passed it, so the
+        scan reaches back PLAGIARISM_REFRESH_OVERLAP seconds behind the
+        watermark; re-reading a row re-adds it idempotently.
+        Rows are streamed in keyset-paginated batches of
+        PLAGIARISM_SCAN_BATCH_SIZE, so a cold start never holds the whole
+        corpus in one result set. Partition indexes only read rows matching
+        their partition columns.
+
+        Returns:
+            Number of rows read
+        """
+        from app.models.project import Project
+        from app.models.project_fingerprint import ProjectFingerprint
+
+        key = (embedding_model, partition)
+        index = self._get_index(embedding_model, partition)
+        watermark = self._watermarks.get(key)
+
+        query = db.query(
+            ProjectFingerprint.project_id,
+            ProjectFingerprint.embedding,
+            ProjectFingerprint.updated_at,
+            Project.title
+        ).join(
+            Project, Project.id == ProjectFingerprint.project_id
+        ).filter(
+            Project.status == "completed",
+            ProjectFingerprint.embedding_model == embedding_model,
+            *[getattr(ProjectFingerprint, field) == value for field, value in partition]
+        )
+        if watermark is not None:
+            overlap = timedelta(seconds=settings.PLAGIARISM_REFRESH_OVERLAP)
+            query = query.filter(ProjectFingerprint.updated_at >= watermark - overlap)
+
+        scanned = 0
+        for rows in iter_keyset(
+            query,
+            [ProjectFingerprint.updated_at, ProjectFingerprint.project_id],
+            settings.PLAGIARISM_SCAN_BATCH_SIZE
+        ):
+            index.add(
+                [row.project_id for row in rows],
+                np.stack([np.frombuffer(row.embedding, dtype=np.float32) for row in rows]),
+                [{'title': row.title} for row in rows]
+            )
+            self._watermarks[key] = rows[-1].updated_at
+            scanned += len(rows)
+
+        if scanned and not partition:
+            elapsed = time.monotonic() - self._last_saved.get(embedding_model, 0.0)
+            if elapsed >= settings.PLAGIARISM_INDEX_SAVE_INTERVAL:
+                try:
+                    self.save_index(embedding_model)
+                except OSError as e:
+                    print(f"[Plagiarism] Could not save index snapshot: {e}")
+
+        return scanned
+
+    def _drop_moved_partitions(self, db: Session) -> int:
+        """
+        Drop cached partition indexes holding a fingerprint that left the partition
+
+        Indexes are only ever added to, so a fingerprint whose partition
+        columns were rewritten (backfill_fingerprints, possibly in another
+        process) stays in its old partition's index. Fingerprints updated
+        since the last call are compared with the partitions of the cached
+        indexes that contain them; an index with a departed member is
+        dropped and rebuilt from the database on next use.
+
+        Returns:
+            Number of rows read
+        """
+        from app.models.project_fingerprint import ProjectFingerprint
+
+        overlap = timedelta(seconds=settings.PLAGIARISM_REFRESH_OVERLAP)
+        query = db.query(
+            ProjectFingerprint.project_id,
+            ProjectFingerprint.embedding_model,
+            ProjectFingerprint.college_id,
+            ProjectFingerprint.subject,
+            ProjectFingerprint.semester,
+            ProjectFingerprint.updated_at
+        ).filter(ProjectFingerprint.updated_at >= self._moves_watermark - overlap)
+
+        scanned = 0
+        for rows in iter_keyset(
+            query,
+            [ProjectFingerprint.updated_at, ProjectFingerprint.project_id],
+            settings.PLAGIARISM_SCAN_BATCH_SIZE
+        ):
+            for row in rows:
+                for key in [k for k in self._indexes if k[1] and k[0] == row.embedding_model]:
+                    moved = any(getattr(row, field) != value for field, value in key[1])
+                    if moved and row.project_id in self._indexes[key]:
+                        print(f"[Plagiarism] {row.project_id} left partition {dict(key[1])}, rebuilding its index")
+                        del self._indexes[key]
+                        self._watermarks.pop(key, None)
+            self._moves_watermark = max(self._moves_watermark, rows[-1].updated_at)
+            scanned += len(rows)
+
+        return scanned
+
+    def _refresh_section_indexes(self, db: Session) -> int:
+        """
+        Insert section signatures stored since the last refresh into the LSH indexes
+
+        Returns:
+            Number of rows read
+        """
+        from app.models.project import Project
+        from app.models.project_section_signature import ProjectSectionSignature
+
+        query = db.query(
+            ProjectSectionSignature.id,
+            ProjectSectionSignature.project_id,
+            ProjectSectionSignature.section,
+            ProjectSectionSignature.signature,
+            ProjectSectionSignature.created_at,
+            Project.title
+        ).join(
+            Project, Project.id == ProjectSectionSignature.project_id
+        ).filter(
+            Project.status == "completed",
+            ProjectSectionSignature.minhash_version == self.minhasher.version
+        )
+        if self._section_watermark is not None:
+            # Same commit-lag overlap as the ANN refresh; LSH inserts replace by key
+            overlap = timedelta(seconds=settings.PLAGIARISM_REFRESH_OVERLAP)
+            query = query.filter(ProjectSectionSignature.created_at >= self._section_watermark - overlap)
+
+        scanned = 0
+        for rows in iter_keyset(
+            query,
+            [ProjectSectionSignature.created_at, ProjectSectionSignature.id],
+            settings.PLAGIARISM_SCAN_BATCH_SIZE
+        ):
+            for row in rows:
+                index = self._section_indexes.setdefault(
+                    row.section, LSHIndex(num_perm=self.minhasher.num_perm)
+                )
+                index.insert(row.project_id, np.frombuffer(row.signature, dtype=np.uint32))
+                self._section_titles[row.project_id] = row.title
+            self._section_watermark = rows[-1].created_at
+            scanned += len(rows)
+
+        return scanned
+
+    def _section_text(self, value: Any) -> str:
+        """Flatten a section (string, dict or list) into plain text"""
+        if isinstance(value, str):
+            return value
+        if isinstance(value, dict):
+            return " ".join(self._section_text(item) for item in value.values())
+        if isinstance(value, list):
+            return " ".join(self._section_text(item) for item in value)
+        return "" if value is None else str(value)
+
+    def build_section_signatures(self, project_data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """MinHash signature of every non-empty signed section"""
+        signatures = {}
+        for section in SIGNED_SECTIONS:
+            signature = self.minhasher.signature(self._section_text(project_data.get(section)))
+            if signature.size:
+                signatures[section] = signature
+        return signatures
+
+    def _check_sections(
+        self,
+        signatures: Dict[str, np.ndarray],
+        db: Session,
+        members=None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Estimated Jaccard similarity of each section against LSH candidates
+
+        Args:
+            members: Container of project ids to restrict matches to (None = all)
+        """
+        report = {}
+
+        for section, signature in signatures.items():
+            index = self._section_indexes.get(section)
+            if index is None:
+                matches = []
+            elif members is None:
+                matches = index.query(signature, top_k=3)
+            else:
+                matches = [
+                    match for match in index.query(signature, top_k=len(index))
+                    if match[0] in members
+                ][:3]
+            report[section] = {
+                'max_jaccard': matches[0][1] if matches else 0.0,
+                'matches': [
+                    {
+                        'project_id': project_id,
+                        'title': self._section_titles.get(project_id),
+                        'jaccard': jaccard
+                    }
+                    for project_id, jaccard in matches
+                    if jaccard >= 0.3
+                ]
+            }
+
+        return report
+
+    def build_code_fingerprints(self, project_data: Dict[str, Any]) -> Dict[str, List[int]]:
+        """Winnowed fingerprints of each generated code file"""
+        fingerprints = {}
+        for filename, content in self.code_fingerprinter.code_files(project_data).items():
+            hashes = self.code_fingerprinter.fingerprint(content)
+            if hashes:
+                fingerprints[filename] = sorted(hashes)
+        return fingerprints
+
+    def _check_code(
+        self,
+        code_fingerprints: Dict[str, List[int]],
+        db: Session,
+        partition: Partition = ()
+    ) -> List[Dict[str, Any]]:
+        """
+        Match each code file against the fingerprint inverted index
+
+        Only the postings of this project's own fingerprints are read, so the
+        cost follows the size of the new project rather than the corpus.
+        """
+        from app.models.project import Project
+        from app.models.project_fingerprint import ProjectFingerprint
+        from app.models.code_fingerprint import CodeFingerprint
+
+        all_hashes = sorted({h for hashes in code_fingerprints.values() for h in hashes})
+        if not all_hashes:
+            return []
+
+        postings: Dict[int, set] = {}
+        titles: Dict[str, Optional[str]] = {}
+        chunk_size = 500
+        for start in range(0, len(all_hashes), chunk_size):
+            query = db.query(
+                CodeFingerprint.hash,
+                CodeFingerprint.project_id,
+                CodeFingerprint.filename,
+                Project.title
+            ).join(
+                Project, Project.id == CodeFingerprint.project_id
+            ).filter(
+                CodeFingerprint.hash.in_(all_hashes[start:start + chunk_size]),
+                Project.status == "completed"
+            )
+            if partition:
+                query = query.join(
+                    ProjectFingerprint, ProjectFingerprint.project_id == CodeFingerprint.project_id
+                ).filter(
+                    *[getattr(ProjectFingerprint, field) == value for field, value in partition]
+                )
+            rows = query.all()
+
+            for row in rows:
+                postings.setdefault(row.hash, set()).add((row.project_id, row.filename))
+                titles[row.project_id] = row.title
+
+        # Boilerplate shared by many projects (imports, main guards) is not evidence of copying
+        max_df = settings.CODE_FINGERPRINT_MAX_DF
+        for h in list(postings):
+            if len({project_id for project_id, _ in postings[h]}) > max_df:
+                del postings[h]
+
+        report = []
+        for filename, hashes in code_fingerprints.items():
+            shared: Dict[tuple, int] = {}
+            matched = 0
+            for h in hashes:
+                files = postings.get(h)
+                if not files:
+                    continue
+                matched += 1
+                for key in files:
+                    shared[key] = shared.get(key, 0) + 1
+
+            best = max(shared.items(), key=lambda item: item[1]) if shared else None
+            report.append({
+                'filename': filename,
+                'fingerprints': len(hashes),
+                'match_percent': round(100.0 * matched / len(hashes), 1),
+                'best_match': {
+                    'project_id': best[0][0],
+                    'title': titles.get(best[0][0]),
+                    'filename': best[0][1],
+                    'match_percent': round(100.0 * best[1] / len(hashes), 1)
+                } if best else None
+            })
+
+        return sorted(report, key=lambda item: item['match_percent'], reverse=True)
+
+    def _ensure_dict(self, data: Any) -> Optional[Dict[str, Any]]:
+        """Return project JSON as a dict, parsing it if stored as a string"""
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError:
+                return None
+        return data if isinstance(data, dict) else None
+
+    def _fingerprint_text(self, project_data: Dict[str, Any]) -> str:
+        """Text that is embedded for comparison (title + abstract)"""
+        return f"{project_data.get('title', '')} {project_data.get('abstract', '')}"
+
+    def build_fingerprint(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Embed a project's comparison text once
+
+        Returns:
+            Dict with text_hash, embedding_model, a float32 embedding,
+            per-section MinHash signatures and per-file code fingerprints
+        """
+        text = self._fingerprint_text(project_data)
+        embedding = np.asarray(embedding_service.embed_text(text), dtype=np.float32)
+
+        return {
+            'text_hash': hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            'embedding_model': embedding_service.model_name,
+            'embedding': embedding,
+            'minhash_version': self.minhasher.version,
+            'sections': self.build_section_signatures(project_data),
+            'winnow_version': self.code_fingerprinter.version,
+            'code': self.build_code_fingerprints(project_data),
+            'cache_variant': cache_variant(project_data)
+        }
+
+    def save_fingerprint(
+        self,
+        project_id: str,
+        fingerprint: Dict[str, Any],
+        db: Session
+    ):
+        """
+        Add or update the stored fingerprint of a project
+
+        The caller commits, so the fingerprint lands in the same transaction
+        that marks the project as completed. Projects served from the
+        generation cache are not stored: they are copies of a project that
+        is already indexed, and would match every later copy.
+        """
+        from app.models.project import Project
+        from app.models.user import User
+        from app.models.project_fingerprint import ProjectFingerprint
+        from app.models.project_section_signature import ProjectSectionSignature
+        from app.models.code_fingerprint import CodeFingerprint
+
+        if fingerprint.get('cache_variant') is not None:
+            return None
+
+        embedding = fingerprint['embedding']
+        record = db.query(ProjectFingerprint).filter(
+            ProjectFingerprint.project_id == project_id
+        ).first()
+
+        if record is None:
+            record = ProjectFingerprint(id=str(uuid.uuid4()), project_id=project_id)
+            db.add(record)
+
+        record.text_hash = fingerprint['text_hash']
+        record.embedding_model = fingerprint['embedding_model']
+        record.dimensions = int(embedding.shape[0])
+        record.embedding = embedding.tobytes()
+        record.minhash_version = fingerprint['minhash_version']
+
+        # Partition keys
+        owner = db.query(Project.subject, Project.semester, User.college_id).join(
+            User, User.id == Project.user_id
+        ).filter(Project.id == project_id).first()
+        if owner is not None:
+            record.college_id = owner.college_id
+            record.subject = self._normalize_subject(owner.subject)
+            record.semester = owner.semester
+
+        # Replace section signatures
+        db.query(ProjectSectionSignature).filter(
+            ProjectSectionSignature.project_id == project_id
+        ).delete(synchronize_session=False)
+        for section, signature in fingerprint['sections'].items():
+            db.add(ProjectSectionSignature(
+                id=str(uuid.uuid4()),
+                project_id=project_id,
+                section=section,
+                minhash_version=fingerprint['minhash_version'],
+                signature=signature.tobytes()
+            ))
+
+        # Replace code fingerprint postings
+        record.winnow_version = fingerprint['winnow_version']
+        db.query(CodeFingerprint).filter(
+            CodeFingerprint.project_id == project_id
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(CodeFingerprint, [
+            {'hash': h, 'project_id': project_id, 'filename': filename}
+            for filename, hashes in fingerprint['code'].items()
+            for h in hashes
+        ])
+        return record
+
     async def check_plagiarism(
         self,
         project_data: Dict[str, Any],
-        db: Session
+        db: Session,
+        fingerprint: Optional[Dict[str, Any]] = None,
+        scope: Optional[Dict[str, Any]] = None,
+        fallback_global: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Check for plagiarism against existing projects
-        
+
         Args:
             project_data: Generated project JSON
             db: Database session
-            
+            fingerprint: Precomputed fingerprint of project_data (optional)
+            scope: Partition fields (see scope_for); None compares against all projects
+            fallback_global: Search all projects when the partition finds nothing
+                similar (defaults to PLAGIARISM_FALLBACK_GLOBAL)
+
         Returns:
             Plagiarism report with score and warnings
         """
-        from app.models.project import Project
-        
-        # Extract key content for comparison
-        content_to_check = f"{project_data.get('title', '')} {project_data.get('abstract', '')}"
-        
-        # Generate embedding
-        query_embedding = embedding_service.embed_text(content_to_check)
-        
-        # Get all existing projects
-        existing_projects = db.query(Project).filter(
-            Project.status == "completed",
-            Project.json_data.isnot(None)
-        ).all()
-        
-        max_similarity = 0.0
-        similar_projects = []
-        
-        for existing in existing_projects:
-            if not existing.json_data:
-                continue
-            
-            # Handle json_data that might be a string or dict
-            json_data = existing.json_data
-            if isinstance(json_data, str):
-                try:
-                    import json
-                    json_data = json.loads(json_data)
-                except json.JSONDecodeError:
-                    continue
-            
-            if not isinstance(json_data, dict):
-                continue
-            
-            # Extract content from existing project
-            existing_content = f"{json_data.get('title', '')} {json_data.get('abstract', '')}"
-            
-            # Generate embedding
-            existing_embedding = embedding_service.embed_text(existing_content)
-            
-            # Calculate similarity
-            similarity = embedding_service.cosine_similarity(query_embedding, existing_embedding)
-            
-            if similarity > 0.75:  # Threshold for concern (raised from 0.7)
-                similar_projects.append({
-                    'project_id': existing.id,
-                    'title': existing.title,
-                    'similarity': similarity
-                })
-            
-            if similarity > max_similarity:
-                max_similarity = similarity
-        
+        started = time.perf_counter()
+        rss_start = current_rss_mb()
+
+        variant = cache_variant(project_data)
+        if variant is not None:
+            # Reused from the generation cache: the system served this project
+            # to earlier students too, so a match would not be evidence of copying
+            return {
+                'plagiarism_score': 0.0,
+                'warnings': [],
+                'similar_projects': [],
+                'section_similarity': {},
+                'code_matches': [],
+                'skipped': 'cache_variant',
+                'cache_variant': variant,
+                'scope': {'searched': [], 'partition_size': 0},
+                'metrics': {
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                    'rows_scanned': 0
+                }
+            }
+
+        if fingerprint is None:
+            fingerprint = self.build_fingerprint(project_data)
+
+        # Bring in-memory indexes up to date and query them; jobs run in
+        # parallel threads, so refreshes are serialized
+        partition = self._partition_key(scope)
+        if fallback_global is None:
+            fallback_global = settings.PLAGIARISM_FALLBACK_GLOBAL
+        searched = []
+
+        with self._lock:
+            # Query the ANN index of the partition for the closest stored projects
+            rows_scanned = self._drop_moved_partitions(db) if partition else 0
+            rows_scanned += self._refresh_index(db, fingerprint['embedding_model'], partition)
+            index = self._get_index(fingerprint['embedding_model'], partition)
+            dimensions = int(fingerprint['embedding'].shape[0])
+            rescore = lambda project_ids: self._exact_embeddings(db, project_ids, dimensions)
+            top_matches = index.search(fingerprint['embedding'], top_k=5, rescore=rescore)
+            searched.append(dict(partition) if partition else 'global')
+            partition_size = len(index)
+
+            if partition and fallback_global and not any(score > 0.75 for _, score, _ in top_matches):
+                partition = ()
+                rows_scanned += self._refresh_index(db, fingerprint['embedding_model'])
+                index = self._get_index(fingerprint['embedding_model'])
+                top_matches = index.search(fingerprint['embedding'], top_k=5, rescore=rescore)
+                searched.append('global')
+
+            # Section-level near-duplicates via MinHash/LSH
+            rows_scanned += self._refresh_section_indexes(db)
+            section_similarity = self._check_sections(
+                fingerprint.get('sections', {}), db, members=index if partition else None
+            )
+
+        max_similarity = max(top_matches[0][1], 0.0) if top_matches else 0.0
+        similar_projects = [
+            {
+                'project_id': project_id,
+                'title': payload.get('title'),
+                'similarity': similarity
+            }
+            for project_id, similarity, payload in top_matches
+            if similarity > 0.75  # Threshold for concern (raised from 0.7)
+        ]
+
         # Generate warnings - adjusted thresholds to be less aggressive
         warnings = []
         if max_similarity > 0.90:
@@ -82,13 +685,114 @@ class PlagiarismChecker:
         elif max_similarity > 0.70:
             # Just informational, not a warning
             pass
-        
+
+        for section, report in section_similarity.items():
+            if report['max_jaccard'] >= 0.5:
+                warnings.append(
+                    f"The {section.replace('_', ' ')} section overlaps about "
+                    f"{report['max_jaccard']:.0%} with an existing project."
+                )
+
+        # Code clones via winnowed fingerprints
+        code_matches = self._check_code(fingerprint.get('code', {}), db, partition)
+        for file_report in code_matches:
+            best = file_report['best_match']
+            if best and best['match_percent'] >= 50:
+                warnings.append(
+                    f"Code file {file_report['filename']} matches {best['match_percent']:.0f}% "
+                    f"of an existing project's {best['filename']}."
+                )
+
         return {
             'plagiarism_score': max_similarity,
             'warnings': warnings,
-            'similar_projects': sorted(similar_projects, key=lambda x: x['similarity'], reverse=True)[:5]
+            'similar_projects': similar_projects,
+            'section_similarity': section_similarity,
+            'code_matches': code_matches,
+            'scope': {
+                'searched': searched,
+                'partition_size': partition_size
+            },
+            'metrics': {
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                'rows_scanned': rows_scanned,
+                'scan_batch_size': settings.PLAGIARISM_SCAN_BATCH_SIZE,
+                'rss_start_mb': round(rss_start, 1),
+                'peak_rss_mb': round(peak_rss_mb(), 1),
+                'index_memory': index.memory_stats()
+            }
         }
 
+    def backfill_fingerprints(self, db: Session, batch_size: Optional[int] = None) -> int:
+        """
+        Compute fingerprints for completed projects that have none, or whose
+        fingerprint was produced by a different embedding model, MinHash or
+        winnowing configuration, then sync the partition columns of
+        fingerprints whose project or owner changed
+
+        Returns:
+            Number of fingerprints written or updated
+        """
+        from app.models.project import Project
+        from app.models.user import User
+        from app.models.project_fingerprint import ProjectFingerprint
+
+        query = db.query(Project.id, Project.json_data).outerjoin(
+            ProjectFingerprint, ProjectFingerprint.project_id == Project.id
+        ).filter(
+            Project.status == "completed",
+            Project.json_data.isnot(None),
+            (ProjectFingerprint.id.is_(None)) |
+            (ProjectFingerprint.embedding_model != embedding_service.model_name) |
+            (ProjectFingerprint.minhash_version.is_(None)) |
+            (ProjectFingerprint.minhash_version != self.minhasher.version) |
+            (ProjectFingerprint.winnow_version.is_(None)) |
+            (ProjectFingerprint.winnow_version != self.code_fingerprinter.version)
+        )
+
+        batch_size = batch_size or settings.PLAGIARISM_SCAN_BATCH_SIZE
+        written = 0
+        for batch in iter_keyset(query, [Project.id], batch_size):
+            for project_id, json_data in batch:
+                project_data = self._ensure_dict(json_data)
+                if project_data is not None and cache_variant(project_data) is None:
+                    self.save_fingerprint(project_id, self.build_fingerprint(project_data), db)
+                    written += 1
+
+            db.commit()
+
+        subject = func.nullif(func.lower(func.trim(Project.subject)), '')
+        stale = db.query(
+            ProjectFingerprint.id,
+            User.college_id,
+            subject.label('subject'),
+            Project.semester
+        ).join(
+            Project, Project.id == ProjectFingerprint.project_id
+        ).join(
+            User, User.id == Project.user_id
+        ).filter(
+            ProjectFingerprint.college_id.is_distinct_from(User.college_id) |
+            ProjectFingerprint.subject.is_distinct_from(subject) |
+            ProjectFingerprint.semester.is_distinct_from(Project.semester)
+        )
+
+        for batch in iter_keyset(stale, [ProjectFingerprint.id], batch_size):
+            db.bulk_update_mappings(ProjectFingerprint, [
+                {
+                    'id': row.id,
+                    'college_id': row.college_id,
+                    'subject': row.subject,
+                    'semester': row.semester,
+                    'updated_at': datetime.utcnow()
+                }
+                for row in batch
+            ])
+            db.commit()
+            written += len(batch)
+
+        return written
+
 
 # Singleton instance
 plagiarism_checker = PlagiarismChecker()
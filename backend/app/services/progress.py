@@ -0,0 +1,78 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.redis_client import RedisConnection
+import json
+import threading
+import time
+
+
+TERMINAL_STAGES = ("completed", "failed")
+
+
+class ProgressTracker:
+    """
+    Per-job progress events for live generation previews
+
+    Events are appended to a Redis list per job (progress:<job_id>, expiring
+    after PROGRESS_TTL), so any API worker can serve the progress of a job
+    generated by another process. Without Redis, events are kept in this
+    process, which covers the in-process BackgroundTasks path.
+    """
+
+    def __init__(self, connection: RedisConnection = None, max_jobs: int = 256):
+        self.connection = connection or RedisConnection()
+        self.max_jobs = max_jobs
+        self._events: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"progress:{job_id}"
+
+    def publish(self, job_id: str, stage: str, **data: Any):
+        """Append an event; stage is e.g. retrieving, generating, section, completed"""
+        event = {'stage': stage, 'ts': round(time.time(), 3), **data}
+
+        client = self.connection.client()
+        if client is not None:
+            try:
+                pipeline = client.pipeline(transaction=False)
+                pipeline.rpush(self._key(job_id), json.dumps(event, default=str))
+                pipeline.expire(self._key(job_id), settings.PROGRESS_TTL)
+                pipeline.execute()
+                return
+            except Exception as e:
+                self.connection.failed(e, "Progress")
+
+        with self._lock:
+            self._events.setdefault(job_id, []).append(event)
+            self._events.move_to_end(job_id)
+            while len(self._events) > self.max_jobs:
+                self._events.popitem(last=False)
+
+    def section(self, job_id: str, name: str, value: Any):
+        """A top-level section of the project JSON finished streaming"""
+        self.publish(job_id, "section", section=name, data=value)
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Events from index `after` on, each tagged with its index as `id`"""
+        events: Optional[List[Dict[str, Any]]] = None
+
+        client = self.connection.client()
+        if client is not None:
+            try:
+                raw = client.lrange(self._key(job_id), after, -1)
+                events = [json.loads(item) for item in raw]
+            except Exception as e:
+                self.connection.failed(e, "Progress")
+
+        if not events:
+            with self._lock:
+                events = list(self._events.get(job_id, [])[after:])
+
+        return [{'id': after + i, **event} for i, event in enumerate(events)]
+
+
+# Singleton instance
+progress_tracker = ProgressTracker()
@@ -0,0 +1,84 @@
+from typing import Tuple
+import numpy as np
+
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+
+class ScalarQuantizer:
+    """
+    Scalar quantization of L2-normalized embedding rows
+
+    none keeps float32 (4 bytes/dim), float16 halves that, and int8 stores
+    each row as int8 codes with one float32 scale (max |x| / 127), about a
+    quarter of float32. Scores computed on codes are approximate; callers
+    re-score the best candidates against exact vectors.
+    """
+
+    def __init__(self, mode: str = "none"):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.mode = mode
+        self.dtype = {"none": np.float32, "float16": np.float16, "int8": np.int8}[mode]
+
+    @property
+    def is_exact(self) -> bool:
+        return self.mode == "none"
+
+    def bytes_per_vector(self, dimensions: int) -> int:
+        """Storage per row, including the int8 scale"""
+        return dimensions * np.dtype(self.dtype).itemsize + (4 if self.mode == "int8" else 0)
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantize rows
+
+        Returns:
+            (codes, scales) where scales is float32 per row (ones unless int8)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.ones(vectors.shape[0], dtype=np.float32)
+
+        if self.mode == "int8":
+            peaks = np.abs(vectors).max(axis=1)
+            scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+            codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            return codes, scales
+
+        return vectors.astype(self.dtype), scales
+
+    def decode(self, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Approximate float32 rows"""
+        vectors = np.asarray(codes, dtype=np.float32)
+        if self.mode == "int8":
+            vectors = vectors * scales[:, None]
+        return vectors
+
+    def scores(
+        self,
+        codes: np.ndarray,
+        scales: np.ndarray,
+        query: np.ndarray,
+        chunk_size: int = 1024
+    ) -> np.ndarray:
+        """
+        Approximate dot products of a float32 query with quantized rows
+
+        Rows are widened into a reused float32 buffer chunk by chunk, which
+        keeps the working set cache-sized. NumPy widens float16 slowly, so
+        float16 saves memory but scans slower than int8.
+        """
+        if self.mode == "none":
+            return codes @ query
+
+        count = codes.shape[0]
+        scores = np.empty(count, dtype=np.float32)
+        buffer = np.empty((min(chunk_size, count), codes.shape[1]), dtype=np.float32)
+        for start in range(0, count, chunk_size):
+            chunk = codes[start:start + chunk_size]
+            widened = buffer[:chunk.shape[0]]
+            np.copyto(widened, chunk, casting='unsafe')
+            scores[start:start + chunk.shape[0]] = widened @ query
+        if self.mode == "int8":
+            scores *= scales[:count]
+        return scores
@@ -1,9 +1,15 @@
 from typing import Dict, Any
-from app.services.vector_store_simple import vector_store
+from app.services.retriever import vector_store
 from app.services.groq_client import groq_client
+from app.services.progress import progress_tracker
+from app.services.generation_cache import generation_cache
 from app.core.config import settings
 
 
+# Bump when the user query template below changes (invalidates the generation cache)
+QUERY_TEMPLATE_VERSION = 1
+
+
 class RAGPipeline:
     """RAG pipeline for project generation"""
     
@@ -25,7 +31,30 @@ class RAGPipeline:
         2. Retrieve relevant context from vector store
         3. Call Groq API with context
         4. Return structured project JSON
+        
+        Requests without additional requirements may be served from the
+        generation cache (GENERATION_CACHE_ENABLED), skipping steps 2-3.
         """
+        cache_key = None
+        if generation_cache.is_cacheable(additional_requirements):
+            cache_key = generation_cache.key(
+                subject, semester, difficulty, language,
+                f"{QUERY_TEMPLATE_VERSION}:{groq_client.prompt_version}"
+            )
+            cached = generation_cache.get(cache_key)
+            if cached is not None:
+                project_data, variant = cached
+                project_data.setdefault("metadata", {}).update({
+                    "user_id": user_id,
+                    "job_id": job_id,
+                    # Marks a reused project, see plagiarism_checker.check_plagiarism
+                    "cache_variant": variant
+                })
+                for name, value in project_data.items():
+                    if name != "metadata":
+                        progress_tracker.section(job_id, name, value)
+                print(f"[RAG] Served cached project variant {variant} for {subject} / semester {semester}")
+                return project_data
         
         # Step 1: Construct detailed query with Indian university context
         difficulty_expectations = {
@@ -59,20 +88,31 @@ EXPECTED DELIVERABLES:
 
 Generate a complete, ready-to-submit project that meets all academic requirements."""
         
-        # Step 2: Retrieve RAG context
-        rag_context = vector_store.search(
-            query=f"{subject} {difficulty}",
-            top_k=settings.RAG_TOP_K
-        )
+        # Step 2: Retrieve RAG context, relaxing metadata filters until templates match
+        progress_tracker.publish(job_id, "retrieving")
+        rag_context = []
+        for filters in ({'subject': subject, 'difficulty': difficulty}, {'subject': subject}, None):
+            rag_context = vector_store.search(
+                query=f"{subject} {difficulty}",
+                top_k=settings.RAG_TOP_K,
+                filters=filters
+            )
+            if rag_context:
+                break
         
-        # Step 3: Generate with Groq
+        # Step 3: Generate with Groq, publishing sections as they stream in
+        progress_tracker.publish(job_id, "generating")
         project_data = await groq_client.generate_project(
             user_prompt=user_query,
             rag_context=rag_context,
             user_id=user_id,
-            job_id=job_id
+            job_id=job_id,
+            on_section=lambda name, value: progress_tracker.section(job_id, name, value)
         )
         
+        if cache_key is not None:
+            generation_cache.put(cache_key, project_data)
+        
         return project_data
 
 
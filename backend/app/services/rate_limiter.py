@@ -0,0 +1,161 @@
+from typing import Dict, Any
+from app.core.config import settings
+from app.core.redis_client import RedisConnection
+import asyncio
+import random
+import threading
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English JSON)"""
+    return max(1, len(text) // 4)
+
+
+# Two token buckets (requests and tokens per minute) refilled continuously and
+# checked/charged atomically. ARGV: rpm, tpm, requests, tokens (negative to
+# refund). Returns 0 when charged, else the milliseconds until both buckets
+# can cover the request. A limit of 0 disables that bucket.
+TOKEN_BUCKET_SCRIPT = """
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local want_requests = tonumber(ARGV[3])
+local want_tokens = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+requests = math.min(rpm, requests + elapsed * rpm / 60000)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60000)
+local wait = 0
+if rpm > 0 and requests < want_requests then
+    wait = math.max(wait, (want_requests - requests) * 60000 / rpm)
+end
+if tpm > 0 and tokens < want_tokens then
+    wait = math.max(wait, (want_tokens - tokens) * 60000 / tpm)
+end
+if wait == 0 then
+    requests = requests - want_requests
+    tokens = math.min(tpm, tokens - want_tokens)
+end
+redis.call('HSET', KEYS[1], 'requests', tostring(requests), 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute limiter
+
+    Buckets live in Redis (one hash per limiter, updated by a Lua script) so
+    every API and Celery worker draws from the same account quota. While
+    Redis is unavailable each process falls back to its own buckets. Callers
+    reserve their estimated tokens up front, wait until both buckets have
+    capacity instead of spending attempts on 429s, and refund the unused
+    part of the reservation afterwards.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, connection: RedisConnection = None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.connection = connection or RedisConnection()
+        self._script = None
+        self._lock = threading.Lock()
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    def _take_local(self, requests: int, tokens: int) -> float:
+        """Same algorithm as TOKEN_BUCKET_SCRIPT on this process's buckets (seconds to wait)"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+            wait = 0.0
+            if self.rpm > 0 and self._requests < requests:
+                wait = max(wait, (requests - self._requests) * 60 / self.rpm)
+            if self.tpm > 0 and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+            if wait == 0:
+                self._requests -= requests
+                self._tokens = min(self.tpm, self._tokens - tokens)
+            return wait
+
+    def _take(self, requests: int, tokens: int) -> float:
+        client = self.connection.client()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+                wait_ms = self._script(keys=[f"ratelimit:{self.name}"], args=[self.rpm, self.tpm, requests, tokens])
+                return int(wait_ms) / 1000
+            except Exception as e:
+                self.connection.failed(e, "RateLimiter")
+        return self._take_local(requests, tokens)
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait until one request of `tokens` estimated tokens fits the quota
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+
+        if self.tpm > 0:
+            tokens = min(tokens, self.tpm)  # a larger request could never fit
+        started = time.monotonic()
+        while True:
+            # The Redis script call is a blocking round trip; keep it off the event loop
+            wait = await asyncio.to_thread(self._take, 1, tokens)
+            if wait <= 0:
+                break
+            # Re-check shortly rather than sleeping the full estimate; other
+            # processes may refund tokens in the meantime
+            await asyncio.sleep(min(wait, 1.0) + random.uniform(0, 0.05))
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        if waited > 0.01:
+            self.waited += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            print(f"[RateLimiter] {self.name} waited {waited:.2f}s for capacity")
+        return waited
+
+    def refund(self, tokens: int):
+        """Return reserved tokens that the request did not use"""
+        if self.tpm > 0 and tokens > 0:
+            self._take(0, -tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rpm': self.rpm,
+            'tpm': self.tpm,
+            'acquired': self.acquired,
+            'waited': self.waited,
+            'wait_seconds': round(self.wait_seconds, 2),
+            'mean_wait_seconds': round(self.wait_seconds / self.waited, 3) if self.waited else 0.0,
+            'max_wait_seconds': round(self.max_wait_seconds, 2),
+            'backend': 'redis' if self.connection.available else 'local'
+        }
+
+
+# Limiter for the configured Groq account
+groq_rate_limiter = TokenBucketLimiter("groq", settings.GROQ_RPM_LIMIT, settings.GROQ_TPM_LIMIT)
@@ -0,0 +1,257 @@
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from app.services.vector_store_simple import VectorStore as LexicalStore
+from app.services.similarity_engine import SimilarityEngine
+from app.core.config import settings
+import numpy as np
+import os
+import re
+import threading
+import time
+
+
+def load_dense_embedder():
+    """Dense embedding model for RAG_DENSE_EMBEDDINGS, falling back to feature hashing"""
+    if settings.RAG_DENSE_EMBEDDINGS == "sentence-transformers":
+        try:
+            from app.services.embeddings import embedding_service
+            return embedding_service
+        except ImportError as e:
+            print(f"[RAG] sentence-transformers unavailable ({e}), using feature hashing")
+
+    from app.services.embeddings_simple import embedding_service
+    return embedding_service
+
+
+class HybridRetriever:
+    """
+    BM25 and dense retrieval fused with reciprocal-rank fusion
+
+    Both retrievers run concurrently over the same documents and return
+    RAG_CANDIDATES hits each. The fused list is optionally reranked with a
+    cross-encoder (RAG_RERANK_MODEL), which only ever scores the top
+    RAG_RERANK_CANDIDATES documents. Exposes the same add_documents /
+    search / seed_templates interface as the other stores.
+    """
+
+    def __init__(self, rrf_k: int = 60):
+        self.lexical = LexicalStore()
+        self.dense = SimilarityEngine(quantization=settings.RAG_QUANTIZATION)
+        self.collection_name = self.lexical.collection_name
+        self.rrf_k = rrf_k
+        self.embedder = None
+        self.reranker = None
+        self._reranker_failed = False
+        self.last_timings: Dict[str, float] = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="retriever")
+        self._sync_lock = threading.Lock()
+
+    def _load_embedder(self):
+        if self.embedder is None:
+            self.embedder = load_dense_embedder()
+        return self.embedder
+
+    def _load_reranker(self):
+        """Optional cross-encoder used to rerank fused candidates"""
+        if self.reranker is None and settings.RAG_RERANK_MODEL and not self._reranker_failed:
+            try:
+                from sentence_transformers import CrossEncoder
+                self.reranker = CrossEncoder(settings.RAG_RERANK_MODEL)
+            except Exception as e:
+                print(f"[RAG] Could not load reranker {settings.RAG_RERANK_MODEL}: {e}")
+                self._reranker_failed = True
+        return self.reranker
+
+    def _sync_dense(self):
+        """Embed documents added to the lexical store since the last sync"""
+        with self._sync_lock:
+            start = len(self.dense)
+            documents = self.lexical.documents[start:]
+            if documents:
+                embeddings = np.asarray(
+                    self._load_embedder().embed_batch([doc['text'] for doc in documents]),
+                    dtype=np.float32
+                )
+                self.dense.add([str(start + i) for i in range(len(documents))], embeddings)
+
+    def _vectors_path(self) -> Optional[str]:
+        """Vectors file of the current template snapshot for the dense model"""
+        if self.lexical.snapshot_path is None:
+            return None
+        safe_model = re.sub(r'[^\w.-]', '_', self._load_embedder().model_name)
+        return os.path.join(self.lexical.snapshot_path, f"vectors-{safe_model}.npy")
+
+    def initialize(self):
+        if not self.lexical.documents:
+            self.seed_templates()
+        self._sync_dense()
+
+    def add_documents(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None
+    ):
+        """Add documents to both the lexical and dense indexes"""
+        self.lexical.add_documents(texts, metadatas, ids)
+        self._sync_dense()
+
+    def seed_templates(self):
+        """
+        Seed the lexical store from its snapshot, then memory-map the
+        template vectors saved next to it (embedding them only on a miss)
+        """
+        self.lexical.seed_templates()
+        path = self._vectors_path()
+
+        with self._sync_lock:
+            if path and len(self.dense) == 0 and not os.path.exists(path) and self.lexical.documents:
+                vectors = self.dense.normalize(
+                    self._load_embedder().embed_batch([doc['text'] for doc in self.lexical.documents])
+                )
+                try:
+                    with open(f"{path}.tmp", 'wb') as f:
+                        np.save(f, vectors)
+                    os.replace(f"{path}.tmp", path)
+                except OSError as e:
+                    print(f"[RAG] Could not write template vectors {path}: {e}")
+                    self.dense.add([str(i) for i in range(len(vectors))], vectors)
+
+            if path and len(self.dense) == 0 and os.path.exists(path):
+                try:
+                    vectors = np.load(path, mmap_mode='r')
+                    if vectors.shape[0] == len(self.lexical.documents):
+                        self.dense.adopt([str(i) for i in range(vectors.shape[0])], vectors)
+                        print(f"[RAG] Memory-mapped {vectors.shape[0]} template vectors from {path}")
+                except (OSError, ValueError) as e:
+                    print(f"[RAG] Could not load template vectors {path}: {e}")
+
+        self._sync_dense()
+
+    def _lexical_ranking(self, query: str, k: int, filters: Optional[Dict[str, Any]]) -> List[int]:
+        """Document positions ranked by BM25"""
+        return [position for position, _ in self.lexical.rank(query, k, filters)]
+
+    def _exact_vectors(self, ids: List[str]) -> np.ndarray:
+        """
+        Full-precision vectors for re-scoring quantized hits: rows of the
+        memory-mapped snapshot, or re-embedded text for documents added later
+        """
+        exact = self.dense.exact
+        positions = [int(item_id) for item_id in ids]
+        missing = [p for p in positions if exact is None or p >= exact.shape[0]]
+        embedded = {}
+        if missing:
+            vectors = self._load_embedder().embed_batch([self.lexical.documents[p]['text'] for p in missing])
+            embedded = dict(zip(missing, np.asarray(vectors, dtype=np.float32)))
+        return np.stack([
+            embedded[p] if p in embedded else np.asarray(exact[p], dtype=np.float32)
+            for p in positions
+        ])
+
+    def _dense_ranking(self, query: str, k: int, filters: Optional[Dict[str, Any]]) -> List[int]:
+        """Document positions ranked by cosine similarity"""
+        query_embedding = np.asarray(self._load_embedder().embed_text(query), dtype=np.float32)
+
+        rows = None
+        if filters:
+            rows = np.fromiter(self.lexical.filter_candidates(filters), dtype=np.int64)
+
+        hits = self.dense.search(query_embedding, top_k=k, rescore=self._exact_vectors, rows=rows)
+        return [int(item_id) for item_id, _, _ in hits]
+
+    def _fuse(self, rankings: List[List[int]]) -> List[Tuple[int, float]]:
+        """Reciprocal-rank fusion: sum of 1 / (rrf_k + rank) over the rankings"""
+        scores: Dict[int, float] = {}
+        for ranking in rankings:
+            for rank, position in enumerate(ranking, 1):
+                scores[position] = scores.get(position, 0.0) + 1.0 / (self.rrf_k + rank)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Hybrid search
+
+        Per-stage latency of the call is kept in last_timings (milliseconds).
+        """
+        if top_k is None:
+            top_k = settings.RAG_TOP_K
+
+        started = time.perf_counter()
+        self.initialize()
+        candidates = max(settings.RAG_CANDIDATES, top_k)
+
+        def timed(func):
+            stage_start = time.perf_counter()
+            return func(query, candidates, filters), (time.perf_counter() - stage_start) * 1000
+
+        lexical_future = self._executor.submit(timed, self._lexical_ranking)
+        dense_future = self._executor.submit(timed, self._dense_ranking)
+        lexical, lexical_ms = lexical_future.result()
+        dense, dense_ms = dense_future.result()
+
+        stage_start = time.perf_counter()
+        fused = self._fuse([lexical, dense])
+        fusion_ms = (time.perf_counter() - stage_start) * 1000
+
+        stage_start = time.perf_counter()
+        reranker = self._load_reranker()
+        if reranker is not None and fused:
+            head = fused[:settings.RAG_RERANK_CANDIDATES]
+            scores = reranker.predict([(query, self.lexical.documents[position]['text']) for position, _ in head])
+            fused = sorted(
+                zip([position for position, _ in head], [float(score) for score in scores]),
+                key=lambda item: item[1],
+                reverse=True
+            )
+        rerank_ms = (time.perf_counter() - stage_start) * 1000
+
+        self.last_timings = {
+            'lexical_ms': round(lexical_ms, 2),
+            'dense_ms': round(dense_ms, 2),
+            'fusion_ms': round(fusion_ms, 2),
+            'rerank_ms': round(rerank_ms, 2),
+            'total_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+        print(f"[RAG] Hybrid retrieval timings: {self.last_timings}")
+
+        return [
+            {
+                'id': self.lexical.documents[position]['id'],
+                'text': self.lexical.documents[position]['text'],
+                'score': score,
+                'metadata': self.lexical.documents[position]['metadata']
+            }
+            for position, score in fused[:top_k]
+        ]
+
+
+def create_vector_store(store_type: str = None):
+    """
+    Build the retrieval store selected by VECTOR_STORE_TYPE
+
+    simple: in-memory BM25, chroma: dense ChromaDB, hybrid: BM25 + dense with RRF,
+    pgvector: dense search inside Postgres
+    """
+    store_type = (store_type or settings.VECTOR_STORE_TYPE).lower()
+
+    if store_type == "pgvector":
+        from app.services.vector_store_pgvector import VectorStore as PgVectorStore
+        return PgVectorStore()
+    if store_type == "hybrid":
+        return HybridRetriever()
+    if store_type == "chroma":
+        from app.services.vector_store import VectorStore as ChromaStore
+        return ChromaStore()
+    if store_type != "simple":
+        print(f"[RAG] Unknown VECTOR_STORE_TYPE {store_type!r}, using simple")
+    return LexicalStore()
+
+
+# Singleton instance
+vector_store = create_vector_store()
@@ -0,0 +1,171 @@
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple, TypeVar
+from collections import Counter, deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import json
+import random
+import re
+import time
+import httpx
+
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+RATE_LIMIT_RESET_HEADERS = ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Seconds in a Groq/OpenAI reset header, e.g. "7.66s", "2m59.56s", "120ms" """
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def retry_after(response: Optional[httpx.Response]) -> Optional[float]:
+    """
+    Server-requested wait in seconds
+
+    Retry-After (seconds or an HTTP date) wins; otherwise the longest of the
+    rate-limit reset headers, which only matter when the quota is spent.
+    """
+    if response is None:
+        return None
+
+    header = response.headers.get("retry-after")
+    if header:
+        seconds = parse_duration(header)
+        if seconds is not None:
+            return max(0.0, seconds)
+        try:
+            return max(0.0, (parsedate_to_datetime(header) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+
+    if response.status_code == 429:
+        resets = [parse_duration(response.headers[name]) for name in RATE_LIMIT_RESET_HEADERS if name in response.headers]
+        resets = [seconds for seconds in resets if seconds is not None]
+        if resets:
+            return max(resets)
+    return None
+
+
+def classify(error: BaseException) -> Tuple[bool, str]:
+    """(retryable, reason) for an exception raised by an attempt"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status == 429:
+            return True, "rate_limited"
+        return status in RETRYABLE_STATUS, f"http_{status}"
+    if isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError)):
+        return True, "timeout"
+    if isinstance(error, httpx.ConnectError):
+        return True, "connect_error"
+    if isinstance(error, (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError)):
+        return True, "connection_dropped"
+    if isinstance(error, (json.JSONDecodeError, KeyError, IndexError)):
+        # Malformed or truncated model output; a new sample usually parses
+        return True, "invalid_response"
+    return False, type(error).__name__
+
+
+class RetryPolicy:
+    """
+    Retries with decorrelated-jitter backoff inside a total deadline
+
+    Each wait is uniform(base_delay, 3 * previous wait), capped at
+    max_delay, unless the server asked for a specific wait (Retry-After or
+    rate-limit reset headers), which is honored with a little jitter. Only
+    retryable errors (see classify) are retried, and a retry whose wait
+    would overrun the deadline is not attempted; the last error is raised.
+    Every attempt is recorded in the policy's metrics.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        deadline: float = 300.0,
+        name: str = "LLM"
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.name = name
+        self.outcomes: Counter = Counter()
+        self.calls = 0
+        self.retries = 0
+        self.slept_seconds = 0.0
+        self.recent_attempts: deque = deque(maxlen=100)
+
+    def next_delay(self, previous: float, requested: Optional[float]) -> float:
+        if requested is not None:
+            return requested + random.uniform(0, self.base_delay)
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+    async def run(self, attempt: Callable[[int], Awaitable[T]]) -> T:
+        """
+        Call attempt(attempt_number) until it succeeds or retrying stops
+
+        Each attempt is also cut off when the deadline runs out.
+        """
+        self.calls += 1
+        started = time.monotonic()
+        delay = self.base_delay
+
+        for number in range(1, self.max_attempts + 1):
+            attempt_started = time.monotonic()
+            remaining = self.deadline - (attempt_started - started)
+            try:
+                result = await asyncio.wait_for(attempt(number), timeout=remaining)
+                self._record(number, "success", attempt_started)
+                return result
+            except Exception as error:
+                retryable, reason = classify(error)
+                response = getattr(error, "response", None)
+                requested = retry_after(response) if isinstance(response, httpx.Response) else None
+                delay = self.next_delay(delay, requested)
+                elapsed = time.monotonic() - started
+
+                gives_up = not retryable or number == self.max_attempts or elapsed + delay >= self.deadline
+                self._record(number, reason, attempt_started, None if gives_up else delay)
+                print(
+                    f"[{self.name}] Attempt {number} failed ({reason}): {error}"
+                    + ("" if gives_up else f"; retrying in {delay:.1f}s")
+                )
+                if gives_up:
+                    raise
+
+                self.retries += 1
+                self.slept_seconds += delay
+                await asyncio.sleep(delay)
+
+    def _record(self, number: int, outcome: str, started: float, delay: Optional[float] = None):
+        self.outcomes[outcome] += 1
+        self.recent_attempts.append({
+            'attempt': number,
+            'outcome': outcome,
+            'duration_ms': round((time.monotonic() - started) * 1000, 2),
+            'retry_in_s': round(delay, 2) if delay is not None else None,
+            'at': round(time.time(), 3)
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'slept_seconds': round(self.slept_seconds, 2),
+            'outcomes': dict(self.outcomes),
+            'recent_attempts': list(self.recent_attempts)[-20:]
+        }
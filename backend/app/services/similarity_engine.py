@@ -0,0 +1,225 @@
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from app.services.quantization import ScalarQuantizer
+import numpy as np
+
+
+class SimilarityEngine:
+    """
+    Batched cosine similarity over a pre-normalized matrix
+
+    With quantization="float16" or "int8" rows are stored quantized and
+    scored approximately; the best top_k * rescore_factor candidates are
+    then re-scored exactly, against vectors supplied by the caller's
+    rescore function or against an adopted float32 matrix. Rows added or
+    replaced after adoption have no exact vector there and keep their
+    approximate score.
+    """
+
+    def __init__(
+        self,
+        dimensions: Optional[int] = None,
+        initial_capacity: int = 1024,
+        quantization: str = "none",
+        rescore_factor: int = 4
+    ):
+        self.dimensions = dimensions
+        self.matrix = None
+        self.scales = None
+        self.exact = None
+        self._exact_valid = None
+        self.quantizer = ScalarQuantizer(quantization)
+        self.rescore_factor = rescore_factor
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._initial_capacity = initial_capacity
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._positions
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Bytes used by the stored rows, against the float32 equivalent"""
+        count = len(self.ids)
+        dimensions = self.dimensions or 0
+        return {
+            'quantization': self.quantizer.mode,
+            'vectors': count,
+            'bytes': count * self.quantizer.bytes_per_vector(dimensions),
+            'float32_bytes': count * dimensions * 4
+        }
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows, leaving zero vectors as zeros"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, rows: int):
+        """Grow the backing matrix geometrically so appends stay amortized O(1)"""
+        if self.matrix is None:
+            capacity = max(self._initial_capacity, rows)
+            self.matrix = np.zeros((capacity, self.dimensions), dtype=self.quantizer.dtype)
+            self.scales = np.ones(capacity, dtype=np.float32)
+        elif rows > self.matrix.shape[0] or not self.matrix.flags.writeable:
+            # Adopted read-only matrices (memory maps) are copied on first write
+            capacity = max(rows, self.matrix.shape[0] * 2)
+            count = len(self.ids)
+            grown = np.zeros((capacity, self.dimensions), dtype=self.quantizer.dtype)
+            grown[:count] = self.matrix[:count]
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:count] = self.scales[:count]
+            self.matrix, self.scales = grown, scales
+
+    def add(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Add or replace vectors
+
+        Args:
+            ids: Unique identifier per vector
+            vectors: Array of shape (len(ids), dimensions)
+            payloads: Extra data returned with search hits (e.g. title)
+        """
+        if not ids:
+            return
+
+        vectors = self.normalize(np.atleast_2d(vectors))
+        if self.dimensions is None:
+            self.dimensions = vectors.shape[1]
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions} dimensions, got {vectors.shape[1]}")
+
+        if payloads is None:
+            payloads = [{} for _ in ids]
+
+        self._reserve(len(self.ids) + len(ids))
+        codes, scales = self.quantizer.encode(vectors)
+
+        for item_id, code, scale, payload in zip(ids, codes, scales, payloads):
+            position = self._positions.get(item_id)
+            if position is None:
+                position = len(self.ids)
+                self._positions[item_id] = position
+                self.ids.append(item_id)
+                self.payloads.append(payload)
+            else:
+                self.payloads[position] = payload
+            self.matrix[position] = code
+            self.scales[position] = scale
+            if self._exact_valid is not None and position < self._exact_valid.size:
+                # The adopted row now holds a stale vector
+                self._exact_valid[position] = False
+
+    def vectors(self, positions) -> np.ndarray:
+        """Stored rows as float32 (approximate when quantized)"""
+        return self.quantizer.decode(self.matrix[positions], self.scales[positions])
+
+    def adopt(
+        self,
+        ids: List[str],
+        matrix: np.ndarray,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Use an L2-normalized matrix as the corpus without copying it
+
+        Lets a read-only memory map (e.g. np.load(..., mmap_mode='r')) serve
+        searches directly; pages are read on demand. When quantized, codes
+        are built in memory and the matrix is kept as the exact source for
+        re-scoring.
+        """
+        if self.quantizer.is_exact:
+            self.matrix = matrix
+            self.scales = np.ones(matrix.shape[0], dtype=np.float32)
+            self.exact, self._exact_valid = None, None
+        else:
+            self.matrix, self.scales = self.quantizer.encode(matrix)
+            self.exact = matrix
+            self._exact_valid = np.ones(matrix.shape[0], dtype=bool)
+        self.dimensions = matrix.shape[1]
+        self.ids = list(ids)
+        self.payloads = payloads if payloads is not None else [{} for _ in ids]
+        self._positions = {item_id: i for i, item_id in enumerate(self.ids)}
+
+    def _rank(
+        self,
+        candidates: Optional[np.ndarray],
+        query: np.ndarray,
+        top_k: int,
+        rescore: Optional[Callable[[List[str]], np.ndarray]] = None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Top-k of candidate positions (None = every row) for a normalized query
+
+        Quantized scores only shortlist top_k * rescore_factor candidates,
+        which are then re-scored exactly: all of them through rescore, or
+        each one that still has a valid row in the adopted exact matrix.
+        """
+        if candidates is None:
+            count = len(self.ids)
+            scores = self.quantizer.scores(self.matrix[:count], self.scales[:count], query)
+            candidates = np.arange(count)
+        else:
+            scores = self.quantizer.scores(self.matrix[candidates], self.scales[candidates], query)
+
+        shortlist = top_k if self.quantizer.is_exact else top_k * self.rescore_factor
+        if shortlist < candidates.size:
+            best = np.argpartition(-scores, shortlist - 1)[:shortlist]
+            candidates, scores = candidates[best], scores[best]
+
+        if not self.quantizer.is_exact:
+            if rescore is not None:
+                exact = rescore([self.ids[i] for i in candidates])
+                scores = self.normalize(exact) @ query
+            elif self.exact is not None:
+                has_exact = candidates < self._exact_valid.size
+                has_exact[has_exact] = self._exact_valid[candidates[has_exact]]
+                if has_exact.any():
+                    scores = np.array(scores, dtype=np.float32)
+                    scores[has_exact] = np.asarray(self.exact[candidates[has_exact]], dtype=np.float32) @ query
+
+        ranked = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            (self.ids[candidates[i]], float(scores[i]), self.payloads[candidates[i]])
+            for i in ranked
+        ]
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 5,
+        rescore: Optional[Callable[[List[str]], np.ndarray]] = None,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Score a query against the whole corpus with one matrix-vector product
+
+        Args:
+            query: Query vector
+            top_k: Number of results
+            rescore: Returns exact vectors for a list of ids (quantized storage only)
+            rows: Restrict the search to these row positions
+
+        Returns:
+            (id, cosine similarity, payload) tuples, best first
+        """
+        count = len(self.ids)
+        if count == 0 or top_k <= 0:
+            return []
+
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            if rows.size == 0:
+                return []
+
+        query = self.normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        return self._rank(rows, query, top_k, rescore)
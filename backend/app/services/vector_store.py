@@ -3,6 +3,7 @@ from chromadb.config import Settings
 from typing import List, Dict, Any, Optional
 from app.core.config import settings
 from app.services.embeddings import embedding_service
+from app.services.vector_store_simple import templates_hash
 import uuid
 
 
@@ -43,8 +44,8 @@ class VectorStore:
         if metadatas is None:
             metadatas = [{} for _ in texts]
         
-        # Generate embeddings
-        embeddings = embedding_service.embed_batch(texts)
+        # Generate embeddings (Chroma takes plain lists)
+        embeddings = embedding_service.embed_batch(texts).tolist()
         
         # Add to collection
         self.collection.add(
@@ -54,12 +55,29 @@ class VectorStore:
             ids=ids
         )
     
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Chroma `where` clause for metadata filters (lists match any value)"""
+        clauses = [
+            {field: {"$in": list(value)}} if isinstance(value, (list, tuple, set)) else {field: value}
+            for field, value in filters.items()
+        ]
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
     def search(
         self,
         query: str,
-        top_k: int = None
+        top_k: int = None,
+        filters: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+        """
+        Search for similar documents
+
+        Args:
+            query: Search text
+            top_k: Number of results
+            filters: Metadata values to match, applied by Chroma before ranking
+        """
         self.initialize()
         
         if top_k is None:
@@ -70,8 +88,9 @@ class VectorStore:
         
         # Search
         results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
+            query_embeddings=[query_embedding.tolist()],
+            n_results=top_k,
+            where=self._where(filters) if filters else None
         )
         
         # Format results
@@ -88,13 +107,14 @@ class VectorStore:
         return formatted_results
     
     def seed_templates(self):
-        """Seed initial project templates for RAG"""
+        """
+        Seed initial project templates for RAG
+
+        The persisted collection records the content hash of the templates
+        it was built from, so restarts only re-embed when templates change.
+        """
         self.initialize()
         
-        # Check if already seeded
-        if self.collection.count() > 0:
-            return
-        
         # Sample templates for Indian college projects
         templates = [
             {
@@ -147,10 +167,21 @@ class VectorStore:
             }
         ]
         
+        content_hash = templates_hash(templates)
+        metadata = self.collection.metadata or {}
+
+        # Check if already seeded with the same templates
+        if self.collection.count() > 0:
+            if metadata.get("templates_hash") == content_hash:
+                return
+            print("[RAG] Templates changed, re-embedding the Chroma collection")
+            self.collection.delete(ids=self.collection.get(include=[])['ids'])
+        
         texts = [t["text"] for t in templates]
         metadatas = [t["metadata"] for t in templates]
         
         self.add_documents(texts, metadatas)
+        self.collection.modify(metadata={**metadata, "templates_hash": content_hash})
 
 
 # Singleton instance
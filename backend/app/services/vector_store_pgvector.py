@@ -0,0 +1,299 @@
+from typing import List, Dict, Any, Optional
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import engine
+from app.services.vector_store_simple import VectorStore as TemplateSource, templates_hash, facet_value
+import numpy as np
+import csv
+import hashlib
+import io
+import json
+import threading
+import uuid
+
+
+# Bumped when the stored row layout changes, so seeded collections reload
+STORE_FORMAT = 2
+
+
+class VectorStore:
+    """
+    Vector store backed by Postgres with the pgvector extension
+
+    Documents of every collection live in one `rag_documents` table with a
+    jsonb metadata column and an HNSW (or IVFFlat) cosine index on the
+    embedding. Inserts are streamed with COPY, metadata filters are jsonb
+    containment predicates on a normalized `facets` column (GIN indexed)
+    evaluated next to the vector scan, and results use the same
+    {id, text, score, metadata} shape as the other stores.
+
+    Only RAG collections live here; plagiarism lookups keep their own ANN
+    index over project fingerprints.
+    """
+
+    def __init__(self, collection_name: str = "project_templates"):
+        self.collection_name = collection_name
+        self.embedder = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _load_embedder(self):
+        if self.embedder is None:
+            from app.services.retriever import load_dense_embedder
+            self.embedder = load_dense_embedder()
+        return self.embedder
+
+    @staticmethod
+    def _vector_literal(vector) -> str:
+        """pgvector text representation, e.g. [0.1,0.2]"""
+        return "[" + ",".join(f"{value:.7g}" for value in np.asarray(vector, dtype=np.float32).tolist()) + "]"
+
+    def initialize(self):
+        """Create the extension, tables and indexes if missing"""
+        with self._lock:
+            if self._initialized:
+                return
+
+            dimensions = len(self._load_embedder().embed_text("dimension probe"))
+
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+                conn.execute(text(f"""
+                    CREATE TABLE IF NOT EXISTS rag_documents (
+                        collection TEXT NOT NULL,
+                        id TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        metadata JSONB NOT NULL DEFAULT '{{}}',
+                        facets JSONB NOT NULL DEFAULT '{{}}',
+                        embedding vector({dimensions}) NOT NULL,
+                        PRIMARY KEY (collection, id)
+                    )
+                """))
+                conn.execute(text(
+                    "ALTER TABLE rag_documents ADD COLUMN IF NOT EXISTS facets JSONB NOT NULL DEFAULT '{}'"
+                ))
+                # IVFFlat centroids are trained from existing rows, so that
+                # index is built by _build_vector_index after a COPY load
+                if settings.PGVECTOR_INDEX != "ivfflat":
+                    conn.execute(text(
+                        "CREATE INDEX IF NOT EXISTS ix_rag_documents_embedding_hnsw ON rag_documents "
+                        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+                    ))
+                conn.execute(text("DROP INDEX IF EXISTS ix_rag_documents_metadata"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_rag_documents_facets "
+                    "ON rag_documents USING gin (facets jsonb_path_ops)"
+                ))
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS rag_collections (
+                        name TEXT PRIMARY KEY,
+                        content_hash TEXT NOT NULL
+                    )
+                """))
+
+            self._initialized = True
+
+    def add_documents(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None
+    ):
+        """Embed and insert documents with COPY in batches of PGVECTOR_COPY_BATCH_SIZE"""
+        self.initialize()
+
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            self._copy_documents(cursor, texts, metadatas, ids)
+            self._build_vector_index(cursor)
+            connection.commit()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _facets(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Scalar metadata values normalized the way filters compare them"""
+        return {
+            field: facet_value(value)
+            for field, value in (metadata or {}).items()
+            if isinstance(value, (str, int, float, bool))
+        }
+
+    @staticmethod
+    def _build_vector_index(cursor):
+        """
+        (Re)build the IVFFlat index after a bulk load so its centroids come
+        from the stored vectors; lists follow pgvector's rows / 1000 guidance.
+        HNSW is maintained incrementally and needs nothing here.
+        """
+        if settings.PGVECTOR_INDEX != "ivfflat":
+            return
+
+        cursor.execute("SELECT count(*) FROM rag_documents")
+        lists = max(1, cursor.fetchone()[0] // 1000)
+        cursor.execute("DROP INDEX IF EXISTS ix_rag_documents_embedding_ivfflat")
+        cursor.execute(
+            "CREATE INDEX ix_rag_documents_embedding_ivfflat ON rag_documents "
+            f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {int(lists)})"
+        )
+
+    def _copy_documents(self, cursor, texts: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
+        """COPY documents through a cursor; the caller owns the transaction"""
+        batch_size = settings.PGVECTOR_COPY_BATCH_SIZE
+        for start in range(0, len(texts), batch_size):
+            batch_texts = texts[start:start + batch_size]
+            embeddings = self._load_embedder().embed_batch(batch_texts)
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for doc_id, doc_text, metadata, embedding in zip(
+                ids[start:start + batch_size],
+                batch_texts,
+                metadatas[start:start + batch_size],
+                embeddings
+            ):
+                writer.writerow([
+                    self.collection_name,
+                    doc_id,
+                    doc_text,
+                    json.dumps(metadata or {}),
+                    json.dumps(self._facets(metadata)),
+                    self._vector_literal(embedding)
+                ])
+            buffer.seek(0)
+
+            cursor.copy_expert(
+                "COPY rag_documents (collection, id, content, metadata, facets, embedding) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+
+    def _filter_sql(self, filters: Dict[str, Any]):
+        """
+        SQL predicates and bind parameters for metadata filters
+
+        Each accepted value is a jsonb containment test on the facets column,
+        so the GIN index serves it; strings compare case-insensitively and
+        lists match any value.
+        """
+        clauses, params = [], {}
+        for i, (field, accepted) in enumerate(filters.items()):
+            if not isinstance(accepted, (list, tuple, set)):
+                accepted = [accepted]
+            options = []
+            for j, value in enumerate(accepted):
+                params[f"facet_{i}_{j}"] = json.dumps({field: facet_value(value)})
+                options.append(f"facets @> CAST(:facet_{i}_{j} AS jsonb)")
+            clauses.append("(" + " OR ".join(options or ["false"]) + ")")
+        return clauses, params
+
+    def search(
+        self,
+        query: str,
+        top_k: int = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cosine search with optional metadata filters
+
+        Args:
+            query: Search text
+            top_k: Number of results
+            filters: Metadata values to match, applied in the SQL query
+        """
+        self.initialize()
+
+        if top_k is None:
+            top_k = settings.RAG_TOP_K
+
+        clauses, params = self._filter_sql(filters) if filters else ([], {})
+        where = " AND ".join(["collection = :collection"] + clauses)
+        statement = text(f"""
+            SELECT id, content, metadata, 1 - (embedding <=> CAST(:query AS vector)) AS score
+            FROM rag_documents
+            WHERE {where}
+            ORDER BY embedding <=> CAST(:query AS vector)
+            LIMIT :top_k
+        """)
+
+        with engine.begin() as conn:
+            if settings.PGVECTOR_INDEX == "ivfflat":
+                conn.execute(text(f"SET LOCAL ivfflat.probes = {int(settings.PGVECTOR_PROBES)}"))
+            else:
+                conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.PGVECTOR_EF_SEARCH)}"))
+
+            rows = conn.execute(statement, {
+                'collection': self.collection_name,
+                'query': self._vector_literal(self._load_embedder().embed_text(query)),
+                'top_k': top_k,
+                **params
+            }).fetchall()
+
+        return [
+            {
+                'id': row.id,
+                'text': row.content,
+                'score': float(row.score),
+                'metadata': row.metadata or {}
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _template_id(template: Dict[str, Any]) -> str:
+        """Deterministic document id of a template (same template, same id in every worker)"""
+        payload = json.dumps([template["text"], template["metadata"]], sort_keys=True, ensure_ascii=False)
+        return "tpl-" + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def seed_templates(self):
+        """
+        Load the project templates unless this collection already holds the
+        same template content embedded by the same model (tracked by hash
+        in rag_collections)
+
+        The check, delete, insert and hash update run in one transaction
+        under an advisory lock, so workers starting together load the
+        templates once; the others wait and then find the hash current.
+        """
+        self.initialize()
+
+        templates = TemplateSource().template_documents()
+        content_hash = hashlib.sha256(
+            f"{templates_hash(templates)}:{self._load_embedder().model_name}:{STORE_FORMAT}".encode('utf-8')
+        ).hexdigest()
+
+        documents = {self._template_id(t): t for t in templates}
+
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"rag_seed:{self.collection_name}",))
+            cursor.execute("SELECT content_hash FROM rag_collections WHERE name = %s", (self.collection_name,))
+            stored = cursor.fetchone()
+            if stored is not None and stored[0] == content_hash:
+                connection.rollback()
+                return
+
+            cursor.execute("DELETE FROM rag_documents WHERE collection = %s", (self.collection_name,))
+            self._copy_documents(
+                cursor,
+                [t["text"] for t in documents.values()],
+                [t["metadata"] for t in documents.values()],
+                list(documents)
+            )
+            self._build_vector_index(cursor)
+            cursor.execute("""
+                INSERT INTO rag_collections (name, content_hash) VALUES (%s, %s)
+                ON CONFLICT (name) DO UPDATE SET content_hash = EXCLUDED.content_hash
+            """, (self.collection_name, content_hash))
+            connection.commit()
+        finally:
+            connection.close()
+        print(f"[RAG] Loaded {len(documents)} templates into pgvector")
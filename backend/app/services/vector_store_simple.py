@@ -1,13 +1,72 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
+from collections import Counter
+from app.core.config import settings
+import numpy as np
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import shutil
 import uuid
 
 
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Bump whenever tokenization or the snapshot layout changes
+SNAPSHOT_FORMAT = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def facet_value(value: Any) -> Any:
+    """Normalized metadata value used as a facet key (strings compare case-insensitively)"""
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def templates_hash(templates: List[Dict[str, Any]]) -> str:
+    """Content hash of a template set, used to version its snapshot"""
+    payload = json.dumps(
+        {'format': SNAPSHOT_FORMAT, 'templates': templates},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
 class VectorStore:
-    """Simple mock vector store for basic functionality"""
+    """
+    In-memory template store ranked with BM25
+
+    Documents are tokenized once in add_documents into an inverted index
+    (term -> [(doc, term frequency)]) with per-document lengths, so a
+    query only touches the postings of its own terms. Metadata fields are
+    indexed as facets (field -> value -> doc set) so filters narrow the
+    candidates before scoring.
+    """
     
-    def __init__(self):
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
         self.documents = []
         self.collection_name = "project_templates"
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[tuple]] = {}
+        self._doc_lengths: List[int] = []
+        self._total_length = 0
+        self._idf: Dict[str, float] = {}
+        self._facets: Dict[str, Dict[Any, Set[int]]] = {}
+
+        # Postings loaded from a snapshot, kept memory-mapped in CSR form
+        # (term -> slice of postings_docs / postings_tfs) until first used
+        self._snapshot_terms: Dict[str, int] = {}
+        self._snapshot_offsets = None
+        self._snapshot_docs = None
+        self._snapshot_tfs = None
+        self.snapshot_path: Optional[str] = None
     
     def initialize(self):
         """Initialize mock vector store"""
@@ -20,7 +79,7 @@ class VectorStore:
         metadatas: Optional[List[Dict[str, Any]]] = None,
         ids: Optional[List[str]] = None
     ):
-        """Add documents to mock vector store"""
+        """Add documents to the store and its inverted index"""
         if ids is None:
             ids = [str(uuid.uuid4()) for _ in texts]
         
@@ -28,47 +87,258 @@ class VectorStore:
             metadatas = [{} for _ in texts]
         
         for i, text in enumerate(texts):
+            position = len(self.documents)
             self.documents.append({
                 'id': ids[i],
                 'text': text,
                 'metadata': metadatas[i]
             })
+
+            tokens = tokenize(text)
+            for term, frequency in Counter(tokens).items():
+                postings = self._term_postings(term)
+                if postings is None:
+                    postings = self._postings[term] = []
+                postings.append((position, frequency))
+            self._doc_lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            self._index_facets(position, metadatas[i])
+
+        # IDF depends on the corpus size, so it is recomputed lazily
+        self._idf = {}
+
+    def _index_facets(self, position: int, metadata: Optional[Dict[str, Any]]):
+        for field, value in (metadata or {}).items():
+            facet = self._facets.setdefault(field, {})
+            facet.setdefault(facet_value(value), set()).add(position)
+
+    def _term_postings(self, term: str) -> Optional[List[tuple]]:
+        """Postings of a term, materializing them from the snapshot on first use"""
+        postings = self._postings.get(term)
+        if postings is None:
+            row = self._snapshot_terms.get(term)
+            if row is not None:
+                start, end = int(self._snapshot_offsets[row]), int(self._snapshot_offsets[row + 1])
+                postings = list(zip(
+                    self._snapshot_docs[start:end].tolist(),
+                    self._snapshot_tfs[start:end].tolist()
+                ))
+                self._postings[term] = postings
+        return postings
+
+    def save_snapshot(self, path: str, content_hash: str):
+        """
+        Write documents and postings to a snapshot directory
+
+        Postings are stored in CSR form: terms.json lists the terms, and
+        offsets.npy delimits each term's slice of postings_docs.npy and
+        postings_tfs.npy. The directory is built under a temporary name and
+        renamed into place, so readers never see a partial snapshot.
+        """
+        terms = sorted(set(self._postings) | set(self._snapshot_terms))
+        all_postings = [self._term_postings(term) for term in terms]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings) for postings in all_postings])
+        flat = [entry for postings in all_postings for entry in postings]
+
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        with open(os.path.join(tmp_path, "documents.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.documents, f, ensure_ascii=False)
+        with open(os.path.join(tmp_path, "terms.json"), 'w', encoding='utf-8') as f:
+            json.dump(terms, f, ensure_ascii=False)
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, "postings_docs.npy"), np.array([doc for doc, _ in flat], dtype=np.int32))
+        np.save(os.path.join(tmp_path, "postings_tfs.npy"), np.array([tf for _, tf in flat], dtype=np.int32))
+        np.save(os.path.join(tmp_path, "doc_lengths.npy"), np.array(self._doc_lengths, dtype=np.int32))
+        with open(os.path.join(tmp_path, "manifest.json"), 'w') as f:
+            json.dump({
+                'format': SNAPSHOT_FORMAT,
+                'content_hash': content_hash,
+                'documents': len(self.documents),
+                'terms': len(terms)
+            }, f)
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another process published the same snapshot first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.snapshot_path = path
+
+    def load_snapshot(self, path: str, content_hash: str):
+        """
+        Load a snapshot written by save_snapshot into an empty store
+
+        Postings arrays are memory-mapped and only decoded per query term.
+
+        Raises:
+            ValueError: If the snapshot is for other content or format
+        """
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != SNAPSHOT_FORMAT or manifest.get('content_hash') != content_hash:
+            raise ValueError(f"Snapshot at {path} does not match the current templates")
+
+        with open(os.path.join(path, "documents.json"), encoding='utf-8') as f:
+            documents = json.load(f)
+        with open(os.path.join(path, "terms.json"), encoding='utf-8') as f:
+            terms = json.load(f)
+
+        offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode='r')
+        postings_docs = np.load(os.path.join(path, "postings_docs.npy"), mmap_mode='r')
+        postings_tfs = np.load(os.path.join(path, "postings_tfs.npy"), mmap_mode='r')
+        doc_lengths = np.load(os.path.join(path, "doc_lengths.npy")).tolist()
+        if len(doc_lengths) != len(documents) or len(offsets) != len(terms) + 1:
+            raise ValueError(f"Snapshot at {path} is inconsistent")
+
+        self._snapshot_offsets = offsets
+        self._snapshot_docs = postings_docs
+        self._snapshot_tfs = postings_tfs
+        self._snapshot_terms = {term: row for row, term in enumerate(terms)}
+        self._doc_lengths = doc_lengths
+        self._total_length = sum(doc_lengths)
+        self._postings = {}
+        self._idf = {}
+
+        self.documents = documents
+        for position, doc in enumerate(documents):
+            self._index_facets(position, doc['metadata'])
+        self.snapshot_path = path
+
+    def _term_idf(self, term: str) -> float:
+        """BM25 IDF (non-negative variant)"""
+        idf = self._idf.get(term)
+        if idf is None:
+            n = len(self._doc_lengths)
+            df = len(self._term_postings(term) or ())
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            self._idf[term] = idf
+        return idf
     
-    def search(
+    def filter_candidates(self, filters: Dict[str, Any]) -> Set[int]:
+        """
+        Documents matching every filter
+
+        A filter value may be a single value or a list of accepted values.
+        """
+        candidates = None
+        for field, accepted in filters.items():
+            if not isinstance(accepted, (list, tuple, set)):
+                accepted = [accepted]
+
+            facet = self._facets.get(field, {})
+            matches = set()
+            for value in accepted:
+                matches |= facet.get(facet_value(value), set())
+
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return set()
+        return candidates
+
+    def rank(
         self,
         query: str,
-        top_k: int = 6
-    ) -> List[Dict[str, Any]]:
-        """Simple keyword-based search"""
+        top_k: int = 6,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
+        """
+        BM25 ranking
+
+        Returns:
+            (document position, score) tuples, best first
+        """
         self.initialize()
         
-        # Simple keyword matching
-        query_words = query.lower().split()
-        results = []
-        
-        for doc in self.documents:
-            score = 0
-            text_lower = doc['text'].lower()
-            
-            # Count matching words
-            for word in query_words:
-                if word in text_lower:
-                    score += 1
-            
-            if score > 0:
-                results.append({
-                    'id': doc['id'],
-                    'text': doc['text'],
-                    'score': score / len(query_words),
-                    'metadata': doc['metadata']
-                })
-        
-        # Sort by score and return top_k
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return results[:top_k]
+        query_terms = set(tokenize(query))
+        if not query_terms or not self._doc_lengths:
+            return []
+
+        candidates = self.filter_candidates(filters) if filters else None
+        if candidates is not None and not candidates:
+            return []
+
+        avg_length = self._total_length / len(self._doc_lengths) or 1.0
+        scores: Dict[int, float] = {}
+
+        for term in query_terms:
+            postings = self._term_postings(term)
+            if not postings:
+                continue
+
+            idf = self._term_idf(term)
+            for position, frequency in postings:
+                if candidates is not None and position not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[position] / avg_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 6,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25 keyword search
+
+        Args:
+            query: Search text
+            top_k: Number of results
+            filters: Metadata values to match, e.g. {"subject": "IoT", "difficulty": ["Beginner", "Intermediate"]}
+        """
+        return [
+            {
+                'id': self.documents[position]['id'],
+                'text': self.documents[position]['text'],
+                'score': score,
+                'metadata': self.documents[position]['metadata']
+            }
+            for position, score in self.rank(query, top_k, filters)
+        ]
     
     def seed_templates(self):
-        """Seed comprehensive Indian engineering project templates following GTU, VTU, AICTE standards"""
+        """
+        Load the templates, reusing the on-disk snapshot for their content hash
+
+        The index is only rebuilt (and a new snapshot written) when the
+        templates change, so restarts skip tokenizing and indexing.
+        """
+        templates = self.template_documents()
+        content_hash = templates_hash(templates)
+        path = os.path.join(settings.RAG_SNAPSHOT_DIR, content_hash[:16])
+
+        if self.snapshot_path == path:
+            return
+        if self.documents:
+            print("[RAG] Store already holds documents, not seeding templates")
+            return
+
+        if os.path.exists(os.path.join(path, "manifest.json")):
+            try:
+                self.load_snapshot(path, content_hash)
+                print(f"[RAG] Loaded {len(self.documents)} templates from snapshot {path}")
+                return
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[RAG] Could not load snapshot {path}: {e}")
+
+        self.add_documents(
+            [t["text"] for t in templates],
+            [t["metadata"] for t in templates]
+        )
+        try:
+            self.save_snapshot(path, content_hash)
+            print(f"[RAG] Indexed {len(self.documents)} templates, snapshot written to {path}")
+        except OSError as e:
+            print(f"[RAG] Could not write snapshot {path}: {e}")
+
+    def template_documents(self) -> List[Dict[str, Any]]:
+        """Comprehensive Indian engineering project templates following GTU, VTU, AICTE standards"""
         templates = [
             # ============ COMPUTER SCIENCE / IT PROJECTS ============
             {
@@ -646,10 +916,7 @@ class VectorStore:
             }
         ]
         
-        texts = [t["text"] for t in templates]
-        metadatas = [t["metadata"] for t in templates]
-        
-        self.add_documents(texts, metadatas)
+        return templates
 
 
 # Singleton instance
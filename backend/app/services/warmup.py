@@ -0,0 +1,80 @@
+from typing import Dict, Any
+from app.core.config import settings
+import gc
+import os
+import threading
+import time
+
+
+# Filled in by warm_up(); inherited by forked workers
+startup_metrics: Dict[str, Any] = {}
+
+_ready = threading.Event()
+_lock = threading.Lock()
+
+
+def uses_sentence_transformers() -> bool:
+    """Whether the configured retrieval store embeds with sentence-transformers"""
+    store_type = settings.VECTOR_STORE_TYPE.lower()
+    if store_type == "chroma":
+        return True
+    return store_type in ("hybrid", "pgvector") and settings.RAG_DENSE_EMBEDDINGS == "sentence-transformers"
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Load the embedding model once, ahead of the first request
+
+    Called in the gunicorn master and the Celery parent before they fork, so
+    workers inherit the loaded weights copy-on-write instead of each loading
+    their own copy. Safe to call repeatedly; only the first call loads.
+    """
+    with _lock:
+        if _ready.is_set() or not settings.EMBEDDING_PREWARM:
+            _ready.set()
+            return startup_metrics
+
+        started = time.perf_counter()
+        startup_metrics['model'] = None
+        try:
+            if uses_sentence_transformers():
+                from app.services.embeddings import embedding_service
+                embedding_service.load_model()
+                startup_metrics['model'] = embedding_service.model_name
+        except ImportError as e:
+            # Retrieval falls back to feature hashing, which needs no model
+            print(f"[Startup] sentence-transformers unavailable ({e}), nothing to warm up")
+        except Exception as e:
+            startup_metrics['error'] = str(e)
+            print(f"[Startup] Embedding model warm-up failed: {e}")
+            return startup_metrics
+
+        startup_metrics['model_load_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        startup_metrics['pid'] = os.getpid()
+        startup_metrics.pop('error', None)
+        _ready.set()
+        print(f"[Startup] Warm-up finished in {startup_metrics['model_load_ms']} ms (model: {startup_metrics['model']})")
+        return startup_metrics
+
+
+def prepare_for_fork():
+    """
+    Warm up, then move everything allocated so far out of the garbage
+    collector's reach, so collections in the children don't touch (and
+    copy) the shared pages
+    """
+    # Tokenizer thread pools do not survive fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    warm_up()
+    gc.freeze()
+
+
+def warm_up_in_background() -> threading.Thread:
+    """Warm up without blocking startup; readiness reports false until done"""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
@@ -3,6 +3,7 @@ import os
 import json
 from typing import Dict, Any
 from io import BytesIO
+from app.services.code_fingerprint import CodeFingerprinter
 
 
 class ZIPBundler:
@@ -66,19 +67,10 @@ class ZIPBundler:
             # Add slides.pptx
             zip_file.writestr('slides.pptx', pptx_bytes)
             
-            # Add code files
-            code_snippets = project_data.get('code_snippets', [])
-            if code_snippets:
-                for snippet in code_snippets:
-                    filename = snippet.get('filename', 'code.txt')
-                    content = snippet.get('content', '')
-                    
-                    # Remove markdown code fences if present
-                    if content.startswith('```'):
-                        lines = content.split('\n')
-                        content = '\n'.join(lines[1:-1]) if len(lines) > 2 else content
-                    
-                    zip_file.writestr(f'code/{filename}', content)
+            # Add code files (code_snippets/content or the Groq schema's
+            # code_samples/code, extracted as the plagiarism checker reads them)
+            for filename, content in CodeFingerprinter.code_snippets(project_data):
+                zip_file.writestr(f'code/{filename or "code.txt"}', content)
             
             # Add file structure info
             impl = self._ensure_dict(project_data.get('implementation', {}))
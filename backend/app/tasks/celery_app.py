@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from app.core.config import settings
 
 # Create Celery app
@@ -20,5 +21,27 @@ celery_app.conf.update(
     task_soft_time_limit=540,  # 9 minutes soft limit
 )
 
+@worker_init.connect
+def prewarm_models(**kwargs):
+    """Load the embedding model in the parent process so pool children share it"""
+    from app.services.warmup import prepare_for_fork
+    prepare_for_fork()
+
+
+@worker_process_init.connect
+def open_http_client(**kwargs):
+    """Open the pooled LLM HTTP client on this worker's event loop"""
+    from app.core.event_loop import run_sync
+    from app.services.http_client import http_client_pool
+    run_sync(http_client_pool.startup())
+
+
+@worker_process_shutdown.connect
+def close_http_client(**kwargs):
+    from app.core.event_loop import run_sync
+    from app.services.http_client import http_client_pool
+    run_sync(http_client_pool.aclose())
+
+
 # Auto-discover tasks
 celery_app.autodiscover_tasks(['app.tasks'])
@@ -1,12 +1,18 @@
 from app.tasks.celery_app import celery_app
 from app.core.database import SessionLocal
 from app.models.project import Project
+from app.models.user import User
 from app.services.rag_pipeline import rag_pipeline
 from app.services.docx_generator import docx_generator
 from app.services.pptx_generator import pptx_generator
 from app.services.zip_bundler import zip_bundler
 from app.services.minio_client import minio_client
 from app.services.plagiarism_checker import plagiarism_checker
+from app.services.progress import progress_tracker
+from app.services.circuit_breaker import circuit_open_cause, CircuitOpenError
+from app.services.llm_pool import llm_pool
+from app.core.config import settings
+from app.core.event_loop import run_sync
 from datetime import datetime
 import uuid
 
@@ -38,6 +44,7 @@ def generate_project_task(
     10. Update database
     """
     db = SessionLocal()
+    project = None
     
     try:
         # Step 1: Update status
@@ -45,14 +52,18 @@ def generate_project_task(
         if not project:
             raise Exception(f"Project not found: {job_id}")
         
+        # LLM circuit open: fail (credit refunded) or, in queue mode, requeue
+        # until it recovers (about LLM_QUEUE_MAX_WAIT)
+        if llm_pool.is_open():
+            raise CircuitOpenError(llm_pool.name, llm_pool.retry_after())
+        
         project.status = "processing"
         db.commit()
         
         # Step 2-3: Run RAG pipeline and generate with Groq
         self.update_state(state='PROGRESS', meta={'step': 'Generating project with AI'})
         
-        import asyncio
-        project_data = asyncio.run(
+        project_data = run_sync(
             rag_pipeline.generate_project(
                 subject=subject,
                 semester=semester,
@@ -78,6 +89,7 @@ def generate_project_task(
         
         # Step 5: Generate DOCX
         self.update_state(state='PROGRESS', meta={'step': 'Creating report document'})
+        progress_tracker.publish(job_id, "rendering")
         docx_bytes = docx_generator.generate_report(project_data)
         
         # Step 6: Generate PPTX
@@ -90,8 +102,15 @@ def generate_project_task(
         
         # Step 8: Plagiarism check
         self.update_state(state='PROGRESS', meta={'step': 'Running plagiarism check'})
-        plagiarism_result = asyncio.run(
-            plagiarism_checker.check_plagiarism(project_data, db)
+        progress_tracker.publish(job_id, "plagiarism")
+        fingerprint = plagiarism_checker.build_fingerprint(project_data)
+        plagiarism_result = run_sync(
+            plagiarism_checker.check_plagiarism(
+                project_data,
+                db,
+                fingerprint=fingerprint,
+                scope=plagiarism_checker.scope_for(project)
+            )
         )
         
         project.plagiarism_score = plagiarism_result['plagiarism_score']
@@ -100,6 +119,7 @@ def generate_project_task(
         
         # Step 9: Upload to MinIO
         self.update_state(state='PROGRESS', meta={'step': 'Uploading files'})
+        progress_tracker.publish(job_id, "uploading")
         
         zip_filename = f"projects/{user_id}/{job_id}/bundle.zip"
         minio_client.upload_bytes(zip_bytes, zip_filename, "application/zip")
@@ -115,7 +135,11 @@ def generate_project_task(
         project.zip_url = zip_url
         project.status = "completed"
         project.completed_at = datetime.utcnow()
+        
+        # Store the fingerprint with the completion so later checks reuse it
+        plagiarism_checker.save_fingerprint(project.id, fingerprint, db)
         db.commit()
+        progress_tracker.publish(job_id, "completed", title=project.title)
         
         return {
             'status': 'completed',
@@ -125,11 +149,27 @@ def generate_project_task(
         }
         
     except Exception as e:
+        open_error = circuit_open_cause(e)
+        if open_error and project and settings.LLM_BREAKER_OPEN_MODE == "queue":
+            countdown = max(5, int(open_error.retry_after) + 1)
+            if countdown * (self.request.retries + 1) <= settings.LLM_QUEUE_MAX_WAIT:
+                project.status = "pending"
+                db.commit()
+                progress_tracker.publish(job_id, "queued", retry_after=countdown)
+                raise self.retry(exc=e, countdown=countdown, max_retries=None)
+        
         # Handle errors
         if project:
             project.status = "failed"
             project.error_message = str(e)
+            # Failed because the LLM was unavailable (circuit open), not
+            # because of the request, so the credit is given back
+            if open_error:
+                user = db.query(User).filter(User.id == user_id).first()
+                if user:
+                    user.credits += 1
             db.commit()
+        progress_tracker.publish(job_id, "failed", error=str(e))
         
         raise e
         
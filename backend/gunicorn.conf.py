@@ -0,0 +1,19 @@
+"""
+Gunicorn settings for the API
+
+The app is imported in the master (preload_app) and the embedding model is
+loaded there before workers fork, so every worker shares one copy of the
+weights and starts ready.
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def on_starting(server):
+    from app.services.warmup import prepare_for_fork
+    prepare_for_fork()
@@ -136,3 +136,25 @@ def test_readme_generation(sample_project_data):
     assert "Test Project" in readme_content
     assert "Abstract" in readme_content
     assert "Modules" in readme_content
+
+
+def test_zip_bundle_exports_groq_code_samples(sample_project_data):
+    """Code from the Groq schema (code_samples/code) is exported, fences removed"""
+    project_data = {
+        **{key: value for key, value in sample_project_data.items() if key != "code_snippets"},
+        "code_samples": [{"filename": "app.py", "code": "```python\nprint('hi')\n```"}]
+    }
+    zip_bytes = zip_bundler.create_bundle(project_data, b"docx", b"pptx")
+
+    zip_file = zipfile.ZipFile(BytesIO(zip_bytes))
+    assert zip_file.read('code/app.py').decode('utf-8') == "print('hi')"
+
+
+def test_zip_bundle_keeps_empty_and_unnamed_code_files(sample_project_data):
+    """Empty snippets are still exported and unnamed ones keep the code.txt default"""
+    project_data = {**sample_project_data, "code_snippets": [{"filename": "empty.py", "content": ""}, {"content": "x = 1"}]}
+    zip_bytes = zip_bundler.create_bundle(project_data, b"docx", b"pptx")
+
+    zip_file = zipfile.ZipFile(BytesIO(zip_bytes))
+    assert zip_file.read('code/empty.py') == b""
+    assert zip_file.read('code/code.txt').decode('utf-8') == "x = 1"
@@ -0,0 +1,110 @@
+"""
+Test suite for embedding services
+"""
+import os
+import subprocess
+import sys
+import numpy as np
+from app.services.embeddings_simple import EmbeddingService
+from app.services.embedding_cache import EmbeddingCache, CachedEmbeddingService, DiskTier
+from app.services.embedding_batcher import BatchedEmbeddingService
+from app.services import warmup
+from app.core.config import settings
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+SAMPLE_TEXT = "Library Management System with barcode based book issue and return"
+
+
+def test_simple_embeddings_stable_across_processes():
+    """Feature-hash embeddings do not depend on the per-process hash seed"""
+    script = (
+        "from app.services.embeddings_simple import embedding_service;"
+        f"print(embedding_service.embed_text({SAMPLE_TEXT!r}).tobytes().hex())"
+    )
+    outputs = set()
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed, EMBEDDING_CACHE_BACKEND="memory")
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True, text=True, env=env, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        outputs.add(result.stdout.strip())
+
+    local = EmbeddingService().embed_text(SAMPLE_TEXT).tobytes().hex()
+    assert outputs == {local}
+
+
+def test_simple_embeddings_batch_shape_and_similarity():
+    """Batch output is normalized float32 and related texts score higher"""
+    service = EmbeddingService()
+    embeddings = service.embed_batch([
+        SAMPLE_TEXT,
+        "Library management system for issuing and returning books",
+        "IoT based smart irrigation using soil moisture sensors",
+        ""
+    ])
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (4, service.dimensions)
+    assert np.allclose(np.linalg.norm(embeddings[:3], axis=1), 1.0, atol=1e-5)
+    assert not embeddings[3].any()
+
+    related = service.cosine_similarity(embeddings[0], embeddings[1])
+    unrelated = service.cosine_similarity(embeddings[0], embeddings[2])
+    assert related > unrelated
+
+
+def test_cached_embeddings_only_embed_misses(tmp_path, monkeypatch):
+    """Batches send only unseen texts to the model; the disk tier survives a new cache"""
+    service = EmbeddingService()
+    calls = []
+    embed_batch = service.embed_batch
+    monkeypatch.setattr(service, "embed_batch", lambda texts: calls.append(list(texts)) or embed_batch(texts))
+
+    cached = CachedEmbeddingService(service, EmbeddingCache(max_items=2, tier=DiskTier(str(tmp_path))))
+    first = cached.embed_batch([SAMPLE_TEXT, "IoT irrigation", SAMPLE_TEXT])
+    second = cached.embed_batch(["IoT irrigation", "Smart parking"])
+
+    assert calls == [[SAMPLE_TEXT, "IoT irrigation"], ["Smart parking"]]
+    assert np.array_equal(first, embed_batch([SAMPLE_TEXT, "IoT irrigation", SAMPLE_TEXT]))
+    assert np.array_equal(second[0], first[1])
+
+    restarted = CachedEmbeddingService(service, EmbeddingCache(tier=DiskTier(str(tmp_path))))
+    assert np.array_equal(restarted.embed_text(SAMPLE_TEXT), first[0])
+    assert len(calls) == 2
+    assert restarted.cache.stats()["tier_hits"] == 1
+
+
+def test_batcher_merges_concurrent_requests(monkeypatch):
+    """Concurrent single-text calls share model calls and get their own rows back"""
+    service = EmbeddingService()
+    calls = []
+    embed_batch = service.embed_batch
+    monkeypatch.setattr(service, "embed_batch", lambda texts: calls.append(len(texts)) or embed_batch(texts))
+    batched = BatchedEmbeddingService(service, max_wait_ms=50, max_items=64)
+
+    texts = [f"project idea number {i}" for i in range(16)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        vectors = list(pool.map(batched.embed_text, texts))
+
+    assert all(np.array_equal(vector, embed_batch([text])[0]) for vector, text in zip(vectors, texts))
+    assert len(calls) < len(texts)
+    stats = batched.batcher.stats()
+    assert stats["items"] == 16 and stats["queue_depth"] == 0
+    assert sum(stats["batch_size_histogram"].values()) == stats["batches"] == len(calls)
+
+
+def test_warm_up_gates_readiness(monkeypatch):
+    """Readiness flips once warm-up ran, and the load time is recorded"""
+    monkeypatch.setattr(warmup, "_ready", threading.Event())
+    monkeypatch.setattr(warmup, "startup_metrics", {})
+    monkeypatch.setattr(settings, "VECTOR_STORE_TYPE", "simple")
+
+    assert not warmup.is_ready()
+    metrics = warmup.warm_up()
+
+    assert warmup.is_ready()
+    assert metrics["model"] is None and metrics["model_load_ms"] >= 0
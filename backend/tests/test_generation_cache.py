@@ -0,0 +1,60 @@
+"""
+Test suite for the generation cache
+"""
+from app.core.config import settings
+from app.core.redis_client import RedisConnection
+from app.services.generation_cache import GenerationCache
+from app.services.llm_pool import LLMPool, PoolMember
+
+
+def test_variant_pool_fills_then_rotates(monkeypatch):
+    """Requests generate until the pool is full, then get variants round-robin"""
+    monkeypatch.setattr(settings, "GENERATION_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "GENERATION_CACHE_VARIANTS", 2)
+    cache = GenerationCache(RedisConnection("redis://127.0.0.1:1/0"))
+    key = cache.key(" Internet of  Things", 5, "Intermediate", "English", "v1")
+
+    assert key == cache.key("internet of things", 5, "intermediate ", "english", "v1")
+    assert key != cache.key("internet of things", 5, "intermediate", "english", "v2")
+    assert cache.is_cacheable("  ") and not cache.is_cacheable("Use Arduino")
+
+    assert cache.get(key) is None
+    cache.put(key, {"title": "Smart Parking", "metadata": {"user_id": "a", "job_id": "1"}})
+    assert cache.get(key) is None
+    cache.put(key, {"title": "Smart Irrigation", "metadata": {"user_id": "b", "job_id": "2"}})
+    cache.put(key, {"title": "Ignored, pool is full"})
+
+    served = [cache.get(key) for _ in range(3)]
+    assert [(project["title"], variant) for project, variant in served] == [
+        ("Smart Parking", 0), ("Smart Irrigation", 1), ("Smart Parking", 0)
+    ]
+    assert "user_id" not in served[0][0]["metadata"]
+
+    served[0][0]["title"] = "mutated"
+    assert cache.get(key)[0]["title"] == "Smart Irrigation"
+
+    stats = cache.stats()
+    assert stats["hits"] == 4 and stats["misses"] == 2 and stats["stores"] == 2
+    assert stats["tokens_saved"] > 0
+
+
+def test_redis_failure_state_is_per_feature():
+    """One feature backing off from Redis does not disable it for the others"""
+    cache = RedisConnection("redis://127.0.0.1:1/0")
+    progress = RedisConnection("redis://127.0.0.1:1/0")
+    assert cache.client() is progress.client()  # one client and pool per URL
+
+    cache.failed(ConnectionError("refused"), "GenerationCache")
+    assert cache.client() is None and not cache.available
+    assert progress.client() is not None and progress.available
+
+
+def test_key_follows_pool_models():
+    """Changing or adding a pool member's model changes the key"""
+    def pool(*models):
+        return LLMPool([PoolMember(f"m{i}", "https://llm.test/v1", "key", model) for i, model in enumerate(models)])
+
+    key = GenerationCache.key("IoT", 5, "intermediate", "english", "v1", pool=pool("model-a"))
+    assert key == GenerationCache.key("IoT", 5, "intermediate", "english", "v1", pool=pool("model-a", "model-a"))
+    assert key != GenerationCache.key("IoT", 5, "intermediate", "english", "v1", pool=pool("model-b"))
+    assert key != GenerationCache.key("IoT", 5, "intermediate", "english", "v1", pool=pool("model-a", "model-b"))
@@ -2,8 +2,37 @@
 Test suite for Groq API integration
 """
 import pytest
-from app.services.groq_client import groq_client
+import httpx
+from app.services.groq_client import groq_client, GroqClient
+from app.services.json_stream import IncrementalJSONParser
+from app.services.progress import ProgressTracker
+from app.core.redis_client import RedisConnection
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm_pool import LLMPool, PoolMember
+from app.services.rate_limiter import TokenBucketLimiter
+from app.core.config import settings
+import app.services.groq_client as groq_module
+import asyncio
 import json
+import re
+
+
+def make_member(name, weight=1.0):
+    offline = RedisConnection("redis://127.0.0.1:1/0")
+    return PoolMember(
+        name, f"https://{name}.test/v1/chat/completions", f"key-{name}", f"model-{name}", weight=weight,
+        limiter=TokenBucketLimiter(name, 0, 0, connection=offline),
+        breaker=CircuitBreaker(name, min_calls=2, connection=offline)
+    )
+
+
+@pytest.fixture(autouse=True)
+def isolated_pool(monkeypatch):
+    """Fresh single-member LLM pool per test, so one test's failures cannot open its breaker for the next"""
+    pool = LLMPool([make_member("groq")])
+    monkeypatch.setattr(groq_module, "llm_pool", pool)
+    monkeypatch.setattr(groq_client, "pool", pool)
+    return pool
 
 
 @pytest.mark.asyncio
@@ -80,3 +109,176 @@ def test_json_schema_validation():
     required_fields = ["title", "abstract", "modules", "metadata"]
     for field in required_fields:
         assert field in sample_json
+
+
+def test_incremental_parser_emits_sections_as_they_close():
+    """Top-level members are decoded once their closing delimiter arrives, whatever the chunking"""
+    document = json.dumps({
+        "title": "Smart \\\"Parking\\\", {v2}",
+        "modules": [{"name": "Sensors", "weeks": 2}, {"name": "App"}],
+        "timeline_days": 45
+    })
+    parser = IncrementalJSONParser()
+    emitted = []
+    for i in range(0, len(document), 7):
+        emitted.append([name for name, _ in parser.feed(document[i:i + 7])])
+
+    assert [name for names in emitted for name in names] == ["title", "modules", "timeline_days"]
+    assert parser.done and parser.result == json.loads(document)
+    assert any(names == ["title"] for names in emitted)  # before the rest of the document
+
+
+@pytest.mark.asyncio
+async def test_streaming_generation_publishes_sections(monkeypatch):
+    """Streamed completions publish sections in order, once each across retries"""
+    monkeypatch.setattr(settings, "GROQ_STREAMING", True)
+    content = json.dumps({"title": "Smart Parking", "abstract": "IoT sensors", "modules": []})
+    lines = [
+        "data: " + json.dumps({"created": 1700000000, "choices": [{"delta": {"content": content[i:i + 10]}}]})
+        for i in range(0, len(content), 10)
+    ]
+    body = "\n\n".join(lines + ["data: [DONE]"]) + "\n\n"
+    truncated = "\n\n".join(lines[:4]) + "\n\n"  # title, then the stream ends early
+    requests = []
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        requests.append(request)
+        text = truncated if len(requests) == 1 else body
+        return httpx.Response(200, text=text, headers={"Content-Type": "text/event-stream"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(groq_module.http_client_pool, "get", lambda: client)
+    progress = ProgressTracker(RedisConnection("redis://127.0.0.1:1/0"))
+    groq = GroqClient()
+    groq.retry_policy.base_delay = 0.01
+
+    result = await groq.generate_project(
+        "IoT project",
+        job_id="job-1",
+        on_section=lambda name, value: progress.section("job-1", name, value)
+    )
+    await client.aclose()
+
+    assert len(requests) == 2
+    assert result["title"] == "Smart Parking"
+    assert result["metadata"]["generated_at"] == 1700000000
+    events = progress.events("job-1")
+    assert [event["section"] for event in events] == ["title", "abstract", "modules"]
+    assert [event["id"] for event in progress.events("job-1", after=1)] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_buffered_generation_publishes_sections(monkeypatch):
+    """Without streaming, sections are published once the response is parsed"""
+    monkeypatch.setattr(settings, "GROQ_STREAMING", False)
+    content = json.dumps({"title": "Smart Parking", "abstract": "IoT sensors"})
+
+    def handler(request):
+        assert "stream" not in json.loads(request.content)
+        return httpx.Response(200, json={"created": 1, "choices": [{"message": {"content": content}}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(groq_module.http_client_pool, "get", lambda: client)
+    progress = ProgressTracker(RedisConnection("redis://127.0.0.1:1/0"))
+
+    await GroqClient().generate_project(
+        "IoT project",
+        job_id="job-3",
+        on_section=lambda name, value: progress.section("job-3", name, value)
+    )
+    await client.aclose()
+
+    assert [event["section"] for event in progress.events("job-3")] == ["title", "abstract"]
+
+
+@pytest.mark.asyncio
+async def test_fanout_generation_merges_concurrent_sections(monkeypatch):
+    """Fan-out mode generates the outline, then section groups concurrently within the limit"""
+    monkeypatch.setattr(settings, "GROQ_GENERATION_MODE", "fanout")
+    monkeypatch.setattr(settings, "GROQ_FANOUT_CONCURRENCY", 3)
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        prompt = json.loads(request.content)["messages"][1]["content"]
+        keys = re.search(r"these keys of the schema: ([\w, ]+)\.", prompt).group(1).split(", ")
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        content = {key: f"{key} text" for key in keys}
+        content["unrequested"] = "dropped"
+        return httpx.Response(200, json={"created": 1, "choices": [{"message": {"content": json.dumps(content)}}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(groq_module.http_client_pool, "get", lambda: client)
+
+    result = await GroqClient().generate_project("IoT project", job_id="job-2")
+    await client.aclose()
+
+    expected = set(groq_module.OUTLINE_SECTIONS).union(*groq_module.SECTION_GROUPS)
+    assert set(result) == expected | {"metadata"}
+    assert result["viva_questions"] == "viva_questions text"
+    assert 1 < peak <= 3
+    assert result["metadata"]["job_id"] == "job-2"
+    assert len(result["metadata"]["generation"]["sections_ms"]) == len(groq_module.SECTION_GROUPS)
+
+
+@pytest.mark.asyncio
+async def test_pool_routes_least_loaded_and_fails_over(monkeypatch):
+    """Requests spread by weighted load; a failing member is skipped, then opened"""
+    pool = LLMPool([make_member("down"), make_member("up", weight=2.0)])
+    monkeypatch.setattr(groq_client, "pool", pool)
+    hosts = []
+
+    async def handler(request):
+        hosts.append(request.url.host)
+        if request.url.host == "down.test":
+            return httpx.Response(503, json={"error": "overloaded"})
+        assert json.loads(request.content)["model"] == "model-up"
+        assert request.headers["authorization"] == "Bearer key-up"
+        return httpx.Response(200, json={"created": 1, "choices": [{"message": {"content": '{"title": "Pooled"}'}}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(groq_module.http_client_pool, "get", lambda: client)
+
+    for _ in range(3):
+        data, _ = await groq_client._request_json("Generate", max_tokens=100)
+        assert data == {"title": "Pooled"}
+    await client.aclose()
+
+    # "up" has the lower weighted load while idle, so "down" is never tried
+    assert hosts == ["up.test", "up.test", "up.test"]
+
+    pool.members[1].in_flight = 3  # busy: (3 + 1) / 2 > (0 + 1) / 1
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(groq_module.http_client_pool, "get", lambda: client)
+    hosts.clear()
+    for _ in range(2):
+        await groq_client._request_json("Generate", max_tokens=100)
+    await client.aclose()
+    pool.members[1].in_flight = 0
+
+    assert hosts == ["down.test", "up.test", "down.test", "up.test"]
+    assert pool.failovers == 2
+    stats = pool.stats()["members"]
+    assert stats["down"]["errors"] == {"http_503": 2}
+    assert stats["down"]["breaker"]["state"] == "open"  # min_calls=2, both failed
+    assert stats["up"]["successes"] == 5 and stats["up"]["latency_p50_ms"] > 0
+    assert pool.is_open() is False
+
+
+def test_pool_settings_reject_foreign_url_without_key_and_duplicate_names(monkeypatch):
+    """The Groq key only defaults for the Groq URL, and member names must be unique"""
+    monkeypatch.setattr(settings, "LLM_POOL_MEMBERS", json.dumps([{"name": "other", "url": "https://other.test/v1"}]))
+    with pytest.raises(ValueError, match="own key"):
+        LLMPool.from_settings()
+
+    monkeypatch.setattr(settings, "LLM_POOL_MEMBERS", json.dumps([{"name": "groq"}, {"name": "groq", "key": "k2"}]))
+    with pytest.raises(ValueError, match="Duplicate"):
+        LLMPool.from_settings()
+
+    monkeypatch.setattr(settings, "LLM_POOL_MEMBERS", json.dumps([{"name": "a"}, {"name": "b", "url": "https://b.test/v1", "key": "kb"}]))
+    pool = LLMPool.from_settings()
+    assert [member.api_key for member in pool.members] == [settings.GROQ_API_KEY, "kb"]
@@ -0,0 +1,46 @@
+"""
+Test suite for the pooled LLM HTTP client
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.core.event_loop import run_sync
+from app.services.http_client import HTTPClientPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_connections_are_reused_across_calls():
+    """Sequential sync calls on one thread share a client and its keep-alive connection"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    pool = HTTPClientPool()
+
+    async def call():
+        response = await pool.get().post(url, json={"n": 1})
+        return response.json()
+
+    try:
+        assert [run_sync(call()) for _ in range(3)] == [{"ok": True}] * 3
+        run_sync(pool.aclose())
+    finally:
+        server.shutdown()
+
+    metrics = pool.metrics()
+    assert metrics["requests"] == 3
+    assert metrics["new_connections"] == 1 and metrics["reused_connections"] == 2
+    assert metrics["clients_created"] == 1 and metrics["open_clients"] == 0
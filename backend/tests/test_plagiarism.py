@@ -0,0 +1,396 @@
+"""
+Test suite for plagiarism checking
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base, iter_keyset
+from app.models.user import User
+from app.models.project import Project
+from app.models.project_fingerprint import ProjectFingerprint
+from app.services.plagiarism_checker import PlagiarismChecker
+from app.services.similarity_engine import SimilarityEngine
+from app.services.ann_index import ExactIndex, IVFIndex
+from app.services.minhash_lsh import MinHasher, LSHIndex
+from app.services import plagiarism_checker as plagiarism_module
+import numpy as np
+from datetime import timedelta
+
+
+@pytest.fixture
+def db():
+    """In-memory database with a single user"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id="user-1", email="student@example.com", hashed_password="x"))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def plagiarism_checker():
+    """Fresh checker so in-memory indexes do not leak between tests"""
+    return PlagiarismChecker()
+
+
+def add_completed_project(
+    plagiarism_checker, db, project_id, project_data, with_fingerprint=True, user_id="user-1", subject=None
+):
+    """Insert a completed project, optionally with its fingerprint"""
+    db.add(Project(
+        id=project_id,
+        user_id=user_id,
+        job_id=f"job-{project_id}",
+        title=project_data["title"],
+        subject=subject,
+        status="completed",
+        json_data=project_data
+    ))
+    if with_fingerprint:
+        plagiarism_checker.save_fingerprint(
+            project_id, plagiarism_checker.build_fingerprint(project_data), db
+        )
+    db.commit()
+
+
+@pytest.mark.asyncio
+async def test_check_uses_stored_fingerprints(plagiarism_checker, db, monkeypatch):
+    """Existing projects are compared through stored vectors only"""
+    project_data = {"title": "Library Management System", "abstract": "Manage books"}
+    add_completed_project(plagiarism_checker, db, "p1", project_data)
+
+    calls = []
+    original = plagiarism_module.embedding_service.embed_text
+    monkeypatch.setattr(
+        plagiarism_module.embedding_service,
+        "embed_text",
+        lambda text: calls.append(text) or original(text)
+    )
+
+    result = await plagiarism_checker.check_plagiarism(project_data, db)
+
+    assert len(calls) == 1  # only the query is embedded
+    assert result["plagiarism_score"] == pytest.approx(1.0, abs=1e-5)
+    assert result["similar_projects"][0]["project_id"] == "p1"
+    assert result["warnings"]
+
+
+def test_backfill_fingerprints(plagiarism_checker, db):
+    """Backfill fills missing fingerprints and is idempotent"""
+    add_completed_project(plagiarism_checker, db, "p1", {"title": "A", "abstract": "B"}, with_fingerprint=False)
+    add_completed_project(plagiarism_checker, db, "p2", {"title": "C", "abstract": "D"}, with_fingerprint=False)
+
+    assert plagiarism_checker.backfill_fingerprints(db, batch_size=1) == 2
+    assert db.query(ProjectFingerprint).count() == 2
+    assert plagiarism_checker.backfill_fingerprints(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_check_picks_up_new_fingerprints(plagiarism_checker, db):
+    """Fingerprints stored after the first check are found by the next one"""
+    first = {"title": "Smart Parking System", "abstract": "IoT sensors"}
+    second = {"title": "Hospital Queue Manager", "abstract": "Token display"}
+    add_completed_project(plagiarism_checker, db, "p1", first)
+    await plagiarism_checker.check_plagiarism(second, db)
+
+    add_completed_project(plagiarism_checker, db, "p2", second)
+    result = await plagiarism_checker.check_plagiarism(second, db)
+
+    assert result["similar_projects"][0]["project_id"] == "p2"
+
+
+@pytest.mark.asyncio
+async def test_late_committed_fingerprint_is_indexed(plagiarism_checker, db):
+    """A fingerprint committed after the watermark passed its timestamp is still found"""
+    first = {"title": "Smart Parking System", "abstract": "IoT sensors"}
+    late = {"title": "Hospital Queue Manager", "abstract": "Token display"}
+    add_completed_project(plagiarism_checker, db, "p1", first)
+    await plagiarism_checker.check_plagiarism(first, db)
+
+    add_completed_project(plagiarism_checker, db, "p2", late)
+    watermark = db.query(ProjectFingerprint).filter_by(project_id="p1").one().updated_at
+    db.query(ProjectFingerprint).filter_by(project_id="p2").update(
+        {"updated_at": watermark - timedelta(seconds=30)}
+    )
+    db.commit()
+
+    result = await plagiarism_checker.check_plagiarism(late, db)
+    assert result["similar_projects"][0]["project_id"] == "p2"
+
+    assert plagiarism_checker._exact_embeddings(db, [], 8).shape == (0, 8)
+    missing = plagiarism_checker._exact_embeddings(db, ["deleted"], 8)
+    assert missing.shape == (1, 8) and not missing.any()
+
+
+@pytest.mark.asyncio
+async def test_cache_served_projects_are_not_flagged(plagiarism_checker, db):
+    """Copies served from the generation cache neither match the original nor each other"""
+    original = {
+        "title": "Smart Parking System",
+        "abstract": "IoT sensors report free slots",
+        "introduction": "Parking in cities wastes time and fuel " * 20,
+        "metadata": {}
+    }
+    add_completed_project(plagiarism_checker, db, "p1", original)
+
+    for project_id in ("p2", "p3"):
+        served = {**original, "metadata": {"cache_variant": 0, "job_id": f"job-{project_id}"}}
+        result = await plagiarism_checker.check_plagiarism(served, db)
+        assert result["plagiarism_score"] == 0.0 and not result["warnings"]
+        assert result["skipped"] == "cache_variant"
+        add_completed_project(plagiarism_checker, db, project_id, served)
+
+    assert db.query(ProjectFingerprint).count() == 1
+    assert plagiarism_checker.backfill_fingerprints(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_check_streams_corpus_in_batches(plagiarism_checker, db, monkeypatch):
+    """Corpus scans page through every row and report their metrics"""
+    monkeypatch.setattr(plagiarism_module.settings, "PLAGIARISM_SCAN_BATCH_SIZE", 2)
+    for i in range(5):
+        add_completed_project(plagiarism_checker, db, f"p{i}", {"title": f"Project {i}", "abstract": f"Topic {i}"})
+
+    batches = list(iter_keyset(db.query(Project.id), [Project.id], batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [row.id for batch in batches for row in batch] == [f"p{i}" for i in range(5)]
+
+    result = await plagiarism_checker.check_plagiarism({"title": "Project 3", "abstract": "Topic 3"}, db)
+
+    assert len(plagiarism_checker._get_index(plagiarism_module.embedding_service.model_name)) == 5
+    assert result["similar_projects"][0]["project_id"] == "p3"
+    assert result["metrics"]["rows_scanned"] >= 5
+    assert result["metrics"]["peak_rss_mb"] > 0
+
+
+@pytest.mark.asyncio
+async def test_scoped_check_searches_partition_then_global(plagiarism_checker, db):
+    """Scoped checks only see their college unless global fallback is requested"""
+    db.add(User(id="user-2", email="other@example.com", hashed_password="x", college_id="c2"))
+    db.query(User).filter(User.id == "user-1").update({"college_id": "c1"})
+    db.commit()
+
+    project_data = {"title": "Smart Irrigation", "abstract": "Soil moisture sensors"}
+    add_completed_project(plagiarism_checker, db, "p1", project_data, subject=" IoT ")
+    add_completed_project(
+        plagiarism_checker, db, "p2", {"title": "Canteen App", "abstract": "Orders"},
+        user_id="user-2", subject="IoT"
+    )
+    assert db.query(ProjectFingerprint).filter_by(project_id="p1").one().subject == "iot"
+
+    scope = {"college_id": "c2", "subject": "IoT"}
+    scoped = await plagiarism_checker.check_plagiarism(project_data, db, scope=scope, fallback_global=False)
+    assert scoped["similar_projects"] == []
+    assert scoped["scope"] == {"searched": [{"college_id": "c2", "subject": "iot"}], "partition_size": 1}
+
+    fallback = await plagiarism_checker.check_plagiarism(project_data, db, scope=scope, fallback_global=True)
+    assert fallback["similar_projects"][0]["project_id"] == "p1"
+    assert fallback["scope"]["searched"][-1] == "global"
+
+    old_scope = {"college_id": "c1", "subject": "IoT"}
+    before = await plagiarism_checker.check_plagiarism(project_data, db, scope=old_scope, fallback_global=False)
+    assert before["similar_projects"][0]["project_id"] == "p1"
+
+    # Moving the owner to another college is picked up by the backfill, and
+    # the project leaves its old partition's index
+    db.query(User).filter(User.id == "user-1").update({"college_id": "c2"})
+    db.commit()
+    assert plagiarism_checker.backfill_fingerprints(db) == 1
+    moved = await plagiarism_checker.check_plagiarism(project_data, db, scope=scope, fallback_global=False)
+    assert moved["similar_projects"][0]["project_id"] == "p1"
+    left = await plagiarism_checker.check_plagiarism(project_data, db, scope=old_scope, fallback_global=False)
+    assert left["similar_projects"] == [] and left["scope"]["partition_size"] == 0
+
+
+def test_similarity_engine_matches_brute_force():
+    """Top-k from the engine equals a full sort of cosine similarities"""
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    query = rng.normal(size=32).astype(np.float32)
+
+    engine = SimilarityEngine()
+    engine.add([str(i) for i in range(200)], vectors)
+    hits = engine.search(query, top_k=10)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:10]
+    assert [hit[0] for hit in hits] == [str(i) for i in expected]
+    assert hits[0][1] == pytest.approx(float(max(normalized @ (query / np.linalg.norm(query)))), abs=1e-5)
+
+
+def test_ivf_index_full_probe_is_exact_and_persists(tmp_path):
+    """IVF with every cluster probed matches exact search, before and after reload"""
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    ids = [str(i) for i in range(300)]
+    query = rng.normal(size=16).astype(np.float32)
+
+    exact = ExactIndex()
+    exact.add(ids, vectors)
+    ivf = IVFIndex(n_lists=10, nprobe=10, min_train_size=100)
+    ivf.add(ids[:150], vectors[:150])
+    ivf.add(ids[150:], vectors[150:])  # incremental insert after training
+
+    assert ivf.is_trained
+    expected = [hit[0] for hit in exact.search(query, top_k=5)]
+    assert [hit[0] for hit in ivf.search(query, top_k=5)] == expected
+
+    path = str(tmp_path / "index.npz")
+    ivf.save(path, metadata={"watermark": "2024-01-01T00:00:00"})
+    restored = IVFIndex(nprobe=10)
+    assert restored.load(path) == {"watermark": "2024-01-01T00:00:00"}
+    assert [hit[0] for hit in restored.search(query, top_k=5)] == expected
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_quantized_index_rescores_exactly(mode, tmp_path):
+    """Quantized storage shrinks memory and exact re-scoring restores the exact ranking"""
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(500, 64)).astype(np.float32)
+    ids = [str(i) for i in range(500)]
+    query = vectors[42] + rng.normal(scale=0.05, size=64).astype(np.float32)
+    rescore = lambda item_ids: vectors[[int(item_id) for item_id in item_ids]]
+
+    exact = ExactIndex()
+    exact.add(ids, vectors)
+    quantized = ExactIndex(quantization=mode)
+    quantized.add(ids, vectors)
+
+    expected = exact.search(query, top_k=5)
+    hits = quantized.search(query, top_k=5, rescore=rescore)
+    assert [hit[0] for hit in hits] == [hit[0] for hit in expected]
+    assert hits[0][1] == pytest.approx(expected[0][1], abs=1e-5)
+    assert quantized.memory_stats()["bytes"] <= exact.memory_stats()["bytes"] / 2
+
+    path = str(tmp_path / "index.npz")
+    quantized.save(path)
+    restored = ExactIndex(quantization=mode)
+    restored.load(path)
+    assert restored.matrix.dtype == quantized.matrix.dtype
+    assert [hit[0] for hit in restored.search(query, top_k=5, rescore=rescore)] == [hit[0] for hit in expected]
+
+
+def test_adopted_quantized_rows_rescore_only_with_current_vectors():
+    """Rows replaced or added after adoption are never re-scored against the adopted matrix"""
+    rng = np.random.default_rng(5)
+    vectors = SimilarityEngine.normalize(rng.normal(size=(50, 32)))
+    engine = SimilarityEngine(quantization="int8", initial_capacity=8)
+    engine.adopt([str(i) for i in range(50)], vectors)
+
+    query = vectors[7]
+    assert engine.search(query, top_k=1)[0][0] == "7"
+    assert engine.search(query, top_k=1)[0][1] == pytest.approx(1.0, abs=1e-6)
+
+    # Replacing "7" must not keep scoring the stale adopted row
+    engine.add(["7"], -vectors[7])
+    assert engine.search(query, top_k=1)[0][0] != "7"
+    assert "7" not in [hit[0] for hit in engine.search(query, top_k=5)]
+
+    # A new row past the adopted matrix keeps its approximate score; the rest are still exact
+    engine.add(["new"], vectors[3])
+    hits = dict((item_id, score) for item_id, score, _ in engine.search(vectors[3], top_k=2))
+    assert hits["3"] == pytest.approx(1.0, abs=1e-6)
+    assert hits["new"] == pytest.approx(1.0, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_duplicated_section_is_reported(plagiarism_checker, db):
+    """A copied chapter is flagged even when title and abstract differ"""
+    methodology = {
+        "approach": "The project follows an iterative waterfall model with requirement "
+                    "gathering, design of the database schema, implementation of the REST "
+                    "API in Flask and unit testing of every module before integration.",
+        "tools_used": ["Flask", "MySQL", "Postman"]
+    }
+    add_completed_project(plagiarism_checker, db, "p1", {
+        "title": "Hostel Management", "abstract": "Rooms and fees", "methodology": methodology
+    })
+
+    result = await plagiarism_checker.check_plagiarism({
+        "title": "Canteen Ordering App",
+        "abstract": "Food orders",
+        "methodology": methodology,
+        "conclusion": "Completely new conclusion text for this project."
+    }, db)
+
+    report = result["section_similarity"]
+    assert report["methodology"]["max_jaccard"] == 1.0
+    assert report["methodology"]["matches"][0]["project_id"] == "p1"
+    assert report["conclusion"]["matches"] == []
+    assert any("methodology" in warning for warning in result["warnings"])
+
+
+def test_minhash_estimates_jaccard():
+    """Signature agreement tracks the true shingle Jaccard"""
+    hasher = MinHasher(num_perm=256, shingle_size=3)
+    words = [f"w{i}" for i in range(200)]
+    a = " ".join(words[:150])
+    b = " ".join(words[50:])
+
+    true_jaccard = 98 / 198  # shared vs. total 3-word shingles
+    estimate = MinHasher.jaccard(hasher.signature(a), hasher.signature(b))
+    assert abs(estimate - true_jaccard) < 0.1
+
+    index = LSHIndex(num_perm=256, bands=64)
+    index.insert("a", hasher.signature(a))
+    assert "a" in index.candidates(hasher.signature(b))
+
+
+@pytest.mark.asyncio
+async def test_renamed_code_clone_is_reported(plagiarism_checker, db):
+    """Code copied with renamed identifiers and new comments still matches"""
+    original = '''
+def calculate_fine(days_late, rate):
+    # Fine for late book return
+    if days_late <= 0:
+        return 0
+    total = days_late * rate
+    if total > 500:
+        total = 500
+    return total
+'''
+    renamed = '''
+def compute_penalty(delay, per_day):
+    """Penalty for overdue items"""
+    if delay <= 0:
+        return 0
+    amount = delay * per_day
+    if amount > 500:
+        amount = 500
+    return amount
+'''
+    add_completed_project(plagiarism_checker, db, "p1", {
+        "title": "Library", "abstract": "Books",
+        "code_snippets": [{"filename": "fine.py", "content": original}]
+    })
+
+    result = await plagiarism_checker.check_plagiarism({
+        "title": "Rental", "abstract": "Bikes",
+        "code_samples": [
+            {"filename": "penalty.py", "code": renamed},
+            {"filename": "app.js", "code": "const express = require('express'); app.listen(3000);"}
+        ]
+    }, db)
+
+    matches = {item["filename"]: item for item in result["code_matches"]}
+    assert matches["penalty.py"]["best_match"]["filename"] == "fine.py"
+    assert matches["penalty.py"]["match_percent"] >= 50
+    assert matches["app.js"]["best_match"] is None
+
+
+def test_comment_markers_inside_strings_are_code():
+    """Strings containing //, # or <!-- and C preprocessor lines survive normalization"""
+    fingerprinter = plagiarism_module.CodeFingerprinter()
+    tokens = fingerprinter.normalize(
+        'url = "http://example.com" # comment\n'
+        'color = "#fff"  // trailing\n'
+        '#include <stdio.h>\n'
+        '/* block */ done = 1'
+    )
+    assert tokens == [
+        "V", "=", "S", "V", "=", "S",
+        "#", "include", "<", "V", ".", "V", ">",
+        "V", "=", "N"
+    ]
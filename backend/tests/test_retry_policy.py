@@ -0,0 +1,117 @@
+"""
+Test suite for the LLM retry policy, rate limiter and circuit breaker
+"""
+import pytest
+import time
+import httpx
+from app.services.retry_policy import RetryPolicy, parse_duration, retry_after
+from app.services.rate_limiter import TokenBucketLimiter
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_open_cause, CLOSED, OPEN, HALF_OPEN
+from app.core.redis_client import RedisConnection
+
+
+def make_response(status, headers=None):
+    return httpx.Response(status, headers=headers or {}, request=httpx.Request("POST", "https://llm.test"))
+
+
+def test_server_requested_waits():
+    """Retry-After wins; rate-limit reset headers apply to 429s"""
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("soon") is None
+
+    assert retry_after(make_response(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(make_response(429, {"x-ratelimit-reset-requests": "1.5s", "x-ratelimit-reset-tokens": "7.66s"})) == pytest.approx(7.66)
+    assert retry_after(make_response(503, {"x-ratelimit-reset-tokens": "7.66s"})) is None
+    assert retry_after(make_response(200)) is None
+
+
+@pytest.mark.asyncio
+async def test_retries_rate_limits_but_not_client_errors():
+    """429s are retried after the requested wait; a 400 fails on the first attempt"""
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01, deadline=5)
+    statuses = iter([429, 503, 200])
+
+    async def flaky(number):
+        response = make_response(next(statuses), {"retry-after": "0.01"})
+        response.raise_for_status()
+        return number
+
+    assert await policy.run(flaky) == 3
+
+    async def bad_request(number):
+        make_response(400).raise_for_status()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await policy.run(bad_request)
+
+    stats = policy.stats()
+    assert stats["outcomes"] == {"rate_limited": 1, "http_503": 1, "success": 1, "http_400": 1}
+    assert stats["retries"] == 2 and stats["calls"] == 2
+    assert [a["retry_in_s"] is not None for a in stats["recent_attempts"]] == [True, True, False, False]
+
+
+@pytest.mark.asyncio
+async def test_deadline_stops_retries():
+    """A retry whose wait would overrun the deadline is not attempted"""
+    policy = RetryPolicy(max_attempts=5, base_delay=0.001, deadline=1)
+    calls = []
+
+    async def throttled(number):
+        calls.append(number)
+        make_response(429, {"retry-after": "30"}).raise_for_status()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await policy.run(throttled)
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_capacity_and_refunds():
+    """Requests wait for token capacity; refunded tokens are available immediately"""
+    limiter = TokenBucketLimiter("test", rpm=0, tpm=600, connection=RedisConnection("redis://127.0.0.1:1/0"))
+
+    assert await limiter.acquire(600) < 0.05
+    waited = await limiter.acquire(5)
+    assert 0.3 < waited < 2.0  # 600 tokens/minute refill 10 per second
+
+    limiter.refund(500)
+    assert await limiter.acquire(450) < 0.05
+
+    stats = limiter.stats()
+    assert stats["acquired"] == 3 and stats["waited"] == 1
+    assert stats["max_wait_seconds"] == pytest.approx(waited, abs=0.01)
+    assert stats["backend"] == "local"
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers():
+    """Error rate opens the circuit; one half-open trial closes it again"""
+    breaker = CircuitBreaker(
+        "test", window=60, min_calls=4, error_rate=0.5, open_seconds=0.2,
+        connection=RedisConnection("redis://127.0.0.1:1/0")
+    )
+
+    for failed in (False, True, False):
+        breaker.before_call()
+        breaker.record(failed, 0.1)
+    assert breaker.state() == CLOSED  # below min_calls
+
+    breaker.before_call()
+    breaker.record(True, 0.1)  # 2 of 4 failed
+    assert breaker.state() == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert 0 < error.value.retry_after <= 0.2
+
+    wrapped = Exception("AI service is temporarily unavailable")
+    wrapped.__cause__ = error.value
+    assert circuit_open_cause(wrapped) is error.value
+
+    time.sleep(0.25)
+    assert breaker.state() == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial at a time
+    breaker.record(False, 0.1)
+    assert breaker.state() == CLOSED
+    assert [event["to"] for event in breaker.stats()["recent_events"]] == [OPEN, HALF_OPEN, CLOSED]
@@ -0,0 +1,119 @@
+"""
+Test suite for the in-memory template store
+"""
+from app.core.config import settings
+from app.services.vector_store_simple import VectorStore
+from app.services.retriever import HybridRetriever
+
+
+def make_store():
+    store = VectorStore()
+    store.add_documents(
+        [
+            "Library management system with book issue and fine calculation",
+            "IoT smart irrigation using soil moisture sensors and ESP32",
+            "Smart parking using IoT sensors, IoT gateway and a mobile app",
+        ],
+        metadatas=[{"subject": "DBMS"}, {"subject": "IoT"}, {"subject": "IoT"}],
+        ids=["library", "irrigation", "parking"]
+    )
+    return store
+
+
+def test_bm25_ranks_by_term_weight():
+    """Documents with more (and rarer) query terms rank first"""
+    results = make_store().search("IoT parking", top_k=2)
+
+    assert [result["id"] for result in results] == ["parking", "irrigation"]
+    assert results[0]["score"] > results[1]["score"] > 0
+    assert set(results[0]) == {"id", "text", "score", "metadata"}
+    assert results[0]["metadata"] == {"subject": "IoT"}
+
+
+def test_search_ignores_unknown_terms():
+    """Terms missing from the index contribute nothing"""
+    store = make_store()
+
+    assert store.search("blockchain") == []
+    assert [result["id"] for result in store.search("library blockchain")] == ["library"]
+
+
+def test_filters_restrict_candidates():
+    """Facet filters are case-insensitive and accept lists of values"""
+    store = make_store()
+
+    assert {result["id"] for result in store.search("sensors", filters={"subject": "iot"})} == {"parking", "irrigation"}
+    assert store.search("library", filters={"subject": "IoT"}) == []
+    assert [result["id"] for result in store.search("library", filters={"subject": ["IoT", "DBMS"]})] == ["library"]
+    assert store.search("library", filters={"semester": 5}) == []
+
+
+def test_hybrid_retriever_fuses_rankings(monkeypatch):
+    """Hybrid search returns fused results in the store result shape, with stage timings"""
+    monkeypatch.setattr(settings, "RAG_DENSE_EMBEDDINGS", "feature-hash")
+    monkeypatch.setattr(settings, "RAG_RERANK_MODEL", "")
+    retriever = HybridRetriever()
+    store = make_store()
+    retriever.add_documents(
+        [doc["text"] for doc in store.documents],
+        [doc["metadata"] for doc in store.documents],
+        [doc["id"] for doc in store.documents]
+    )
+
+    results = retriever.search("IoT parking gateway", top_k=2)
+    assert results[0]["id"] == "parking"
+    assert set(results[0]) == {"id", "text", "score", "metadata"}
+    assert set(retriever.last_timings) == {"lexical_ms", "dense_ms", "fusion_ms", "rerank_ms", "total_ms"}
+
+    filtered = retriever.search("IoT parking gateway", top_k=3, filters={"subject": "DBMS"})
+    assert [result["id"] for result in filtered] == ["library"]
+
+
+def test_templates_load_from_snapshot(tmp_path, monkeypatch):
+    """A second store reuses the snapshot and ranks identically"""
+    monkeypatch.setattr(settings, "RAG_SNAPSHOT_DIR", str(tmp_path))
+    built = VectorStore()
+    built.seed_templates()
+
+    loaded = VectorStore()
+    monkeypatch.setattr(loaded, "add_documents", None)  # must not re-index
+    loaded.seed_templates()
+
+    assert loaded.snapshot_path == built.snapshot_path
+    assert loaded._postings == {}  # postings are decoded per query term
+    assert loaded.search("IoT sensors", top_k=3) == built.search("IoT sensors", top_k=3)
+    assert loaded.search("web", filters={"difficulty": "beginner"}) == built.search("web", filters={"difficulty": "beginner"})
+
+
+def test_hybrid_retriever_memory_maps_vectors(tmp_path, monkeypatch):
+    """Template vectors are saved once and memory-mapped on the next start"""
+    monkeypatch.setattr(settings, "RAG_SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "RAG_DENSE_EMBEDDINGS", "feature-hash")
+    HybridRetriever().seed_templates()
+
+    retriever = HybridRetriever()
+    retriever.seed_templates()
+    assert not retriever.dense.matrix.flags.writeable
+
+    retriever.add_documents(["Smart parking using IoT sensors"], ids=["extra"])
+    assert retriever.search("smart parking IoT sensors", top_k=1)[0]["id"] == "extra"
+
+
+def test_pgvector_filters_compile_to_sql():
+    """pgvector filters become bound jsonb containment tests on the normalized facets"""
+    from app.services.vector_store_pgvector import VectorStore as PgVectorStore
+
+    clauses, params = PgVectorStore()._filter_sql({"subject": "IoT", "semester": [5, 6]})
+
+    assert clauses == [
+        "(facets @> CAST(:facet_0_0 AS jsonb))",
+        "(facets @> CAST(:facet_1_0 AS jsonb) OR facets @> CAST(:facet_1_1 AS jsonb))"
+    ]
+    assert params == {"facet_0_0": '{"subject": "iot"}', "facet_1_0": '{"semester": 5}', "facet_1_1": '{"semester": 6}'}
+    assert PgVectorStore._facets({"subject": " IoT ", "semester": 5, "tags": ["a"]}) == {"subject": "iot", "semester": 5}
+    assert PgVectorStore._vector_literal([0.5, -1.0]) == "[0.5,-1]"
+
+    # Seeded templates get content-derived ids, so concurrent seeds collide on the primary key
+    template = {"text": "Smart parking", "metadata": {"subject": "IoT"}}
+    assert PgVectorStore._template_id(template) == PgVectorStore._template_id(dict(template))
+    assert PgVectorStore._template_id(template) != PgVectorStore._template_id({**template, "text": "Smart irrigation"})